@@ -1,7 +1,8 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, send_from_directory, send_file, has_request_context, g
+from werkzeug.utils import safe_join
 from supabase import create_client, Client
 import os
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone
 from dotenv import load_dotenv
 import json
 from functools import lru_cache, wraps
@@ -9,6 +10,38 @@ import time
 import jwt
 import pytz
 import openai
+import httpx
+import gzip
+import zlib
+import mimetypes
+import hashlib
+import hmac
+import threading
+import re
+import unicodedata
+import uuid
+import queue
+import atexit
+import math
+import contextvars
+from collections import deque, Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : on se limite alors à gzip
+    brotli = None
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken est optionnel : le nombre de tokens est alors estimé
+    tiktoken = None
+
+try:
+    from PIL import Image, features as pil_features
+except ImportError:  # Pillow est optionnel : les images sont alors servies telles quelles
+    Image = None
 
 # Fonction utilitaire pour parser les dates
 def parse_date(date_string):
@@ -44,21 +77,52 @@ supabase_url = os.getenv('SUPABASE_URL')
 supabase_key = os.getenv('SUPABASE_KEY')
 supabase_anon_key = os.getenv('SUPABASE_ANON_KEY')  # Clé anonyme pour l'authentification côté client
 
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL et SUPABASE_KEY doivent être définis dans les variables d'environnement")
+# Backend de données : 'supabase' (projet réel), 'fake' (base en mémoire de fake_supabase.py,
+# pour les tests et benchmarks sans projet Supabase) ou 'replay' (trafic enregistré, supabase_replay.py)
+SUPABASE_BACKEND = os.getenv('SUPABASE_BACKEND', 'supabase')
+
+if SUPABASE_BACKEND == 'fake':
+    from fake_supabase import create_fake_client, load_fake_store
+    supabase: Client = create_fake_client(load_fake_store(os.getenv('SUPABASE_FAKE_DATA') or None),
+                                          latency_ms=float(os.getenv('SUPABASE_FAKE_LATENCY_MS', 0)),
+                                          max_rows=int(os.getenv('SUPABASE_FAKE_MAX_ROWS', 1000)))
+    print(f"🧪 Backend Supabase en mémoire ({sum(supabase.fake_transport.store.counts().values())} lignes)")
+elif SUPABASE_BACKEND == 'replay':
+    from fake_supabase import create_offline_client
+    from supabase_replay import ReplayTransport
+    supabase: Client = create_offline_client(ReplayTransport(
+        os.getenv('SUPABASE_REPLAY_FILE', 'supabase_recording.jsonl'),
+        latency_scale=float(os.getenv('SUPABASE_REPLAY_LATENCY_SCALE', 0))))
+else:
+    if not supabase_url or not supabase_key:
+        raise ValueError("SUPABASE_URL et SUPABASE_KEY doivent être définis dans les variables d'environnement")
+
+    supabase: Client = create_client(supabase_url, supabase_key)
 
-supabase: Client = create_client(supabase_url, supabase_key)
+# Enregistrement du trafic Supabase pour le rejouer hors production (colonnes personnelles
+# pseudonymisées : voir PII_FIELDS dans supabase_replay.py)
+if os.getenv('SUPABASE_RECORD_FILE') and SUPABASE_BACKEND != 'replay':
+    from supabase_replay import record_supabase_traffic
+    record_supabase_traffic(supabase, os.getenv('SUPABASE_RECORD_FILE'))
+    print(f"📼 Enregistrement du trafic Supabase dans {os.getenv('SUPABASE_RECORD_FILE')}")
 
 # Configuration OpenAI
 openai_api_key = os.getenv('OPENAI_API_KEY')
 openai_model = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
 
+# Délai maximal d'un appel OpenAI (en secondes) : un appel bloqué ne doit pas monopoliser un thread
+openai_timeout = float(os.getenv('OPENAI_TIMEOUT', 30))
+
+# Serveur compatible OpenAI à utiliser à la place de l'API (ex: openai_stub.py pour les benchmarks)
+openai_base_url = os.getenv('OPENAI_BASE_URL') or None
+
 # Initialiser le client OpenAI global
 openai_client = None
 if openai_api_key:
     try:
-        openai_client = openai.OpenAI(api_key=openai_api_key)
-        print("✅ Client OpenAI initialisé avec succès")
+        openai_client = openai.OpenAI(api_key=openai_api_key, base_url=openai_base_url,
+                                      timeout=openai_timeout, max_retries=1)
+        print(f"✅ Client OpenAI initialisé avec succès{f' ({openai_base_url})' if openai_base_url else ''}")
     except Exception as e:
         print(f"❌ Erreur initialisation OpenAI: {e}")
         openai_client = None
@@ -82,6 +146,20 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Connexion des benchmarks (bench_chatbot.py, bench_load.py) : uniquement sur les backends
+# hors production, avec des jetons HS256 signés par ce secret partagé
+BENCH_AUTH_SECRET = os.getenv('BENCH_AUTH_SECRET') if SUPABASE_BACKEND in ('fake', 'replay') else None
+BENCH_TOKEN_ISSUER = 'ayora-bench'
+
+def verify_bench_token(token):
+    """Jeton de session de benchmark : signature, émetteur et expiration vérifiés"""
+    try:
+        return jwt.decode(token, BENCH_AUTH_SECRET, algorithms=['HS256'], issuer=BENCH_TOKEN_ISSUER,
+                          options={'require': ['exp', 'iss', 'sub']})
+    except Exception as e:
+        print(f"Erreur de vérification du token de benchmark: {e}")
+        return None
+
 # Fonction pour vérifier et valider le token JWT de Supabase
 def verify_supabase_token(token):
     try:
@@ -92,22 +170,529 @@ def verify_supabase_token(token):
         print(f"Erreur de vérification du token: {e}")
         return None
 
+def utc_now():
+    """Instant courant en UTC (avec fuseau) : à utiliser pour les colonnes timestamptz"""
+    return datetime.now(timezone.utc)
+
+def parse_utc_timestamp(value):
+    """Horodatage ISO lu en base -> datetime UTC avec fuseau (None si absent ou invalide)
+
+    Les valeurs sans fuseau (anciennes écritures) sont considérées comme UTC.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
 def get_cached_data(key, fetch_func, timeout=_cache_timeout):
     """Récupérer des données du cache ou les charger si nécessaire"""
     current_time = time.time()
+    family = cache_key_family(key)
     if key in _cache:
         data, timestamp = _cache[key]
         if current_time - timestamp < timeout:
+            CACHE_REQUESTS.inc(family, 'hit')
             return data
+        CACHE_EVICTIONS.inc(family, 'expired')
+    CACHE_REQUESTS.inc(family, 'miss')
     
     data = fetch_func()
     _cache[key] = (data, current_time)
     return data
 
+# PostgREST plafonne chaque réponse (max-rows, 1000 par défaut sur Supabase) sans
+# signaler d'erreur : les lectures qui peuvent dépasser ce plafond sont paginées.
+SUPABASE_PAGE_SIZE = int(os.getenv('SUPABASE_PAGE_SIZE', 1000))
+
+def fetch_all_rows(build_query, page_size=None):
+    """Lire toutes les lignes d'une requête page par page
+
+    build_query construit une requête neuve à chaque page (range() s'accumule sur
+    un même builder) ; elle doit être triée sur une colonne unique pour que les
+    pages ne se chevauchent pas.
+    """
+    page_size = page_size or SUPABASE_PAGE_SIZE
+    rows, offset = [], 0
+    while True:
+        page = build_query().range(offset, offset + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
 def clear_cache():
     """Vider le cache"""
+    for family, count in Counter(cache_key_family(key) for key in list(_cache)).items():
+        CACHE_EVICTIONS.inc(family, 'cleared', amount=count)
     _cache.clear()
 
+# Compression des réponses (gzip / brotli) - pas de reverse proxy devant l'application
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() != 'false'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 500))  # en octets
+COMPRESSION_LEVEL_GZIP = int(os.getenv('COMPRESSION_LEVEL_GZIP', 6))
+COMPRESSION_LEVEL_BROTLI = int(os.getenv('COMPRESSION_LEVEL_BROTLI', 5))
+COMPRESSION_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/event-stream',
+    'application/javascript', 'application/json', 'image/svg+xml'
+}
+
+def choose_content_encoding():
+    """Choisir l'encodage selon l'en-tête Accept-Encoding (brotli prioritaire)"""
+    offered = ['br', 'gzip'] if brotli else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def compress_stream(chunks, encoding):
+    """Compresser une réponse streamée morceau par morceau (flush après chaque morceau)"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=COMPRESSION_LEVEL_BROTLI)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL_GZIP, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+# Fichiers statiques générés par build_assets.py (minifiés, hashés, précompressés)
+STATIC_DIST_PREFIX = 'dist/'
+STATIC_IMMUTABLE_MAX_AGE = 31536000  # un an
+
+def load_static_manifest():
+    """Charger le manifest des fichiers statiques hashés (vide si le build n'a pas été lancé)"""
+    manifest_path = os.path.join(app.static_folder, 'dist', 'manifest.json')
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+_static_manifest = load_static_manifest()
+
+@app.url_defaults
+def fingerprint_static_url(endpoint, values):
+    """url_for('static', ...) pointe vers la version hashée quand elle existe"""
+    if endpoint != 'static' or app.debug:
+        return
+    filename = values.get('filename')
+    if filename in _static_manifest:
+        values['filename'] = _static_manifest[filename]
+
+@app.before_request
+def serve_precompressed_static():
+    """Servir directement les variantes .br/.gz générées au build pour static/dist/"""
+    if request.endpoint != 'static':
+        return None
+    filename = (request.view_args or {}).get('filename', '')
+    if not filename.startswith(STATIC_DIST_PREFIX):
+        return None
+
+    offered = [enc for enc, ext in (('br', '.br'), ('gzip', '.gz'))
+               if os.path.isfile(os.path.join(app.static_folder, filename + ext))]
+    encoding = request.accept_encodings.best_match(offered) if offered else None
+    if not encoding:
+        return None
+
+    extension = '.br' if encoding == 'br' else '.gz'
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(app.static_folder, filename + extension,
+                                   mimetype=mimetype, max_age=STATIC_IMMUTABLE_MAX_AGE)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.after_request
+def cache_fingerprinted_static(response):
+    """Les fichiers hashés ne changent jamais : cache navigateur permanent"""
+    if request.endpoint == 'static' and (request.view_args or {}).get('filename', '').startswith(STATIC_DIST_PREFIX):
+        response.headers['Cache-Control'] = f'public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compresser les réponses HTML/JSON/CSS/JS si le navigateur l'accepte"""
+    if not COMPRESSION_ENABLED:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSION_MIMETYPES
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+
+    encoding = choose_content_encoding()
+    if not encoding:
+        return response
+
+    if response.is_streamed or response.direct_passthrough:
+        # Réponses streamées (SSE, fichiers) : compression incrémentale
+        # L'itérable d'origine (fichier ouvert par send_file) n'est plus celui que le serveur
+        # fermera : le fermer avec la réponse pour ne pas perdre de descripteur
+        original = response.response
+        response.direct_passthrough = False
+        response.response = compress_stream(original, encoding)
+        if hasattr(original, 'close'):
+            response.call_on_close(original.close)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+        if encoding == 'br':
+            data = brotli.compress(data, quality=COMPRESSION_LEVEL_BROTLI)
+        else:
+            data = gzip.compress(data, compresslevel=COMPRESSION_LEVEL_GZIP)
+        response.set_data(data)
+
+    # Le corps diffère selon l'encodage : l'ETag ne peut plus être fort
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# ===== TRAÇAGE DES REQUÊTES SUPABASE =====
+# Chaque appel PostgREST est relevé (table, forme de la requête sans les valeurs,
+# durée, statut) pour la requête Flask en cours. En mode debug (app.debug ou
+# SUPABASE_QUERY_DEBUG=true), le nombre d'appels est affiché, ajouté à l'en-tête
+# Server-Timing, et les formes répétées (N+1) sont signalées.
+# Pour les tests : capture_supabase_queries() et assert_max_queries() ; une capture ne
+# relève que les appels du thread qui l'a ouverte (et des catégories de contexte
+# qu'il fait récupérer), pas ceux des autres requêtes servies en parallèle.
+
+SUPABASE_QUERY_DEBUG = os.getenv('SUPABASE_QUERY_DEBUG', 'false').lower() == 'true'
+N_PLUS_ONE_THRESHOLD = int(os.getenv('SUPABASE_N_PLUS_ONE_THRESHOLD', 3))  # répétitions d'une même forme
+QUERY_SHAPE_PARAMS = ('select', 'order', 'on_conflict', 'columns')
+
+# Captures actives dans le contexte d'exécution courant (tuple de listes)
+_query_captures = contextvars.ContextVar('supabase_query_captures', default=())
+
+def mask_filter_operand(condition):
+    """'eq.12' -> 'eq.?' ; 'not.is.null' inchangé (la forme dépend de l'opérateur, pas de la valeur)"""
+    prefix = 'not.' if condition.startswith('not.') else ''
+    operator = condition[len(prefix):].partition('.')[0]
+    if operator == 'is':
+        return condition
+    return f"{prefix}{operator}.{'(?)' if operator == 'in' else '?'}"
+
+def query_shape(request_url):
+    """Forme d'une requête PostgREST : colonnes et opérateurs, sans les valeurs"""
+    parts = []
+    for key, value in sorted(request_url.params.multi_items()):
+        if key in QUERY_SHAPE_PARAMS:
+            parts.append(f"{key}={value}")
+        elif key in ('limit', 'offset'):
+            parts.append(f"{key}=?")
+        elif key in ('or', 'and', 'not.or', 'not.and'):
+            masked = re.sub(r'([\w>-]+)\.((?:not\.)?\w+)\.(\([^)]*\)|[^,()]*)',
+                            lambda m: f"{m.group(1)}.{mask_filter_operand(m.group(2) + '.' + m.group(3))}", value)
+            parts.append(f"{key}={masked}")
+        else:
+            parts.append(f"{key}={mask_filter_operand(value)}")
+    return '&'.join(parts)
+
+def record_supabase_query(query):
+    """Rattacher un appel à la requête Flask en cours et aux captures actives"""
+    if has_request_context():
+        g.setdefault('supabase_queries', []).append(query)
+    for capture in _query_captures.get():
+        capture.append(query)
+
+class QueryTracingTransport(httpx.BaseTransport):
+    """Transport httpx du client PostgREST qui mesure chaque appel"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def handle_request(self, request):
+        started = time.perf_counter()
+        status = 0
+        try:
+            response = self.inner.handle_request(request)
+            status = response.status_code
+            response.read()  # durée complète, transfert du corps compris
+            return response
+        finally:
+            duration = time.perf_counter() - started
+            table = request.url.path.rstrip('/').rsplit('/', 1)[-1]
+            SUPABASE_DURATION.observe(duration, table, request.method)
+            SUPABASE_REQUESTS.inc(table, request.method, str(status))
+            record_supabase_query({
+                'method': request.method,
+                'table': table,
+                'shape': query_shape(request.url),
+                'duration_ms': round(duration * 1000, 2),
+                'status': status,
+            })
+
+def find_n_plus_one(queries, threshold=None):
+    """Formes répétées au moins `threshold` fois : [(description, nombre)]"""
+    counts = Counter(f"{q['method']} {q['table']}?{q['shape']}" for q in queries)
+    return [(shape, count) for shape, count in counts.most_common() if count >= (threshold or N_PLUS_ONE_THRESHOLD)]
+
+def get_request_queries():
+    """Appels Supabase de la requête Flask en cours"""
+    return g.get('supabase_queries', []) if has_request_context() else []
+
+@contextmanager
+def capture_supabase_queries():
+    """Capturer les appels Supabase faits par ce thread pendant le bloc (tests, benchmarks)"""
+    captured = []
+    token = _query_captures.set(_query_captures.get() + (captured,))
+    try:
+        yield captured
+    finally:
+        _query_captures.reset(token)
+
+def assert_max_queries(client, path, max_queries, method='GET', **kwargs):
+    """Test : la route ne doit pas dépasser max_queries appels Supabase
+
+    client est un app.test_client() connecté ; la réponse est renvoyée.
+    """
+    with capture_supabase_queries() as queries:
+        response = client.open(path, method=method, **kwargs)
+    if len(queries) > max_queries:
+        details = '\n'.join(f"  {count} × {shape}" for shape, count in find_n_plus_one(queries, threshold=1)[:10])
+        raise AssertionError(f"{method} {path}: {len(queries)} appels Supabase (maximum {max_queries})\n{details}")
+    return response
+
+@app.after_request
+def report_supabase_queries(response):
+    """Mode debug : nombre et durée des appels Supabase, alerte N+1"""
+    queries = get_request_queries()
+    if not queries or not (SUPABASE_QUERY_DEBUG or app.debug):
+        return response
+    total_ms = sum(q['duration_ms'] for q in queries)
+    response.headers.add('Server-Timing', f'supabase;dur={total_ms:.1f};desc="{len(queries)} appels"')
+    print(f"🔎 {request.method} {request.path}: {len(queries)} appel(s) Supabase en {total_ms:.0f} ms")
+    for shape, count in find_n_plus_one(queries):
+        print(f"⚠️ N+1 probable ({count}×): {shape}")
+    return response
+
+def install_query_tracer(client):
+    """Tracer les appels PostgREST d'un client Supabase (réel, en mémoire ou rejoué)"""
+    from fake_supabase import use_postgrest_transport
+    inner = getattr(client, 'postgrest_transport', None) or httpx.HTTPTransport(http2=True)
+    return use_postgrest_transport(client, QueryTracingTransport(inner))
+
+install_query_tracer(supabase)
+
+# ===== MÉTRIQUES (FORMAT PROMETHEUS) =====
+# /metrics expose au format texte Prometheus : latence par route, requêtes en cours,
+# succès/échecs/évictions du cache par famille de clés, latence Supabase par table,
+# latence et tokens OpenAI, occupation de l'assistant. Les compteurs sont tenus en
+# mémoire par processus : le Procfile fixe --workers 1 (un worker à threads) pour
+# qu'un scrape voie tout le trafic de l'instance. Le scrape doit envoyer
+# « Authorization: Bearer <METRICS_TOKEN> » ; sans METRICS_TOKEN, /metrics répond 404.
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+OPENAI_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 10, 20, 30, 60)
+
+def escape_label_value(value):
+    """Échapper une valeur de label (antislash, guillemet, retour à la ligne)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=()):
+    """'{route="/",method="GET"}' ('' sans label)"""
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def format_metric_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricCounter:
+    """Compteur monotone avec labels"""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help_text, self.labels = name, help_text, labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, label_values)} {format_metric_value(value)}")
+        return lines
+
+class MetricHistogram:
+    """Histogramme à seuils cumulés (_bucket, _sum, _count) avec labels"""
+
+    def __init__(self, name, help_text, labels=(), buckets=HTTP_LATENCY_BUCKETS):
+        self.name, self.help_text, self.labels, self.buckets = name, help_text, labels, buckets
+        self.values = {}  # labels -> [compteurs par seuil, somme, nombre]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            entry = self.values.setdefault(label_values, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_values, (counts, total, count) in sorted(self.values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = format_labels(self.labels, label_values, [('le', format_metric_value(float(bound)))])
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, label_values, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{format_labels(self.labels, label_values)} {format_metric_value(total)}")
+                lines.append(f"{self.name}_count{format_labels(self.labels, label_values)} {count}")
+        return lines
+
+def render_gauge(name, help_text, samples, labels=()):
+    """Jauge calculée au moment du scrape : samples = [(valeurs des labels, valeur)]"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{format_labels(labels, label_values)} {format_metric_value(value)}" for label_values, value in samples]
+    return lines
+
+HTTP_REQUESTS = MetricCounter('ayora_http_requests_total', 'Requêtes HTTP traitées', ('route', 'method', 'status'))
+HTTP_DURATION = MetricHistogram('ayora_http_request_duration_seconds', 'Durée des requêtes HTTP', ('route', 'method'))
+CACHE_REQUESTS = MetricCounter('ayora_cache_requests_total', 'Lectures du cache par famille de clés', ('family', 'result'))
+CACHE_EVICTIONS = MetricCounter('ayora_cache_evictions_total', 'Entrées retirées du cache', ('family', 'reason'))
+SUPABASE_REQUESTS = MetricCounter('ayora_supabase_requests_total', 'Appels PostgREST', ('table', 'method', 'status'))
+SUPABASE_DURATION = MetricHistogram('ayora_supabase_request_duration_seconds', 'Durée des appels PostgREST', ('table', 'method'))
+OPENAI_REQUESTS = MetricCounter('ayora_openai_requests_total', 'Appels OpenAI', ('kind', 'status'))
+OPENAI_DURATION = MetricHistogram('ayora_openai_request_duration_seconds', 'Durée des appels OpenAI (flux complet en streaming)',
+                                  ('kind',), OPENAI_LATENCY_BUCKETS)
+OPENAI_TOKENS = MetricCounter('ayora_openai_tokens_total', 'Tokens consommés', ('type',))
+
+_http_in_flight = {'count': 0}
+_http_in_flight_lock = threading.Lock()
+
+# Familles de clés du cache, les préfixes les plus longs d'abord
+CACHE_KEY_FAMILIES = (
+    'chatbot_answer', 'hotel_context_tool', 'hotel_context_fast', 'hotel_context_briefing_data', 'hotel_context',
+    'clients_actuels', 'clients', 'client_reservations', 'client_principal', 'client_secondaire', 'client',
+    'reservations_actuelles', 'reservations_jour', 'reservations', 'reservation',
+    'calendar_range', 'calendar_day', 'dashboard_stats'
+)
+
+def cache_key_family(key):
+    """'client_reservations_42' -> 'client_reservations' (les valeurs ne deviennent pas des labels)"""
+    for family in CACHE_KEY_FAMILIES:
+        if key == family or key.startswith(family + '_'):
+            return family
+    return 'autre'
+
+def evict_cache_entry(key, reason):
+    """Retirer une entrée du cache en comptant l'éviction (expired, invalidated, size)"""
+    if _cache.pop(key, None) is not None:
+        CACHE_EVICTIONS.inc(cache_key_family(key), reason)
+
+def count_openai_tokens(usage):
+    """Cumuler les tokens d'une réponse OpenAI dans les compteurs"""
+    if usage is None:
+        return
+    OPENAI_TOKENS.inc('prompt', amount=usage.prompt_tokens or 0)
+    OPENAI_TOKENS.inc('completion', amount=usage.completion_tokens or 0)
+
+@contextmanager
+def observe_openai_call(kind):
+    """Mesurer un appel OpenAI (chat, tools, stream, briefing) et compter son issue"""
+    started = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        OPENAI_DURATION.observe(time.perf_counter() - started, kind)
+        OPENAI_REQUESTS.inc(kind, status)
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    with _http_in_flight_lock:
+        _http_in_flight['count'] += 1
+
+def finish_request_metrics(started, route, method, status):
+    with _http_in_flight_lock:
+        _http_in_flight['count'] -= 1
+    HTTP_DURATION.observe(time.perf_counter() - started, route, method)
+    HTTP_REQUESTS.inc(route, method, str(status))
+
+def request_metrics_route():
+    """Règle de la route (les valeurs des paramètres ne deviennent pas des labels)"""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@app.after_request
+def defer_streamed_request_metrics(response):
+    """Réponses streamées (SSE) : mesurer jusqu'à la fin de l'envoi du corps
+
+    Les fichiers (direct_passthrough) n'appellent pas call_on_close : mesurés à la fin de la requête.
+    """
+    g.metrics_status = response.status_code
+    if response.is_streamed and not response.direct_passthrough and 'metrics_started' in g:
+        started, route, method = g.pop('metrics_started'), request_metrics_route(), request.method
+        response.call_on_close(lambda: finish_request_metrics(started, route, method, response.status_code))
+    return response
+
+@app.teardown_request
+def record_request_metrics(exc):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        status = 500 if exc is not None else g.get('metrics_status', 500)
+        finish_request_metrics(started, request_metrics_route(), request.method, status)
+
+def render_metrics():
+    """Toutes les métriques au format texte Prometheus 0.0.4"""
+    entries = Counter(cache_key_family(key) for key in list(_cache))
+    with _llm_state_lock:
+        llm = dict(_llm_state)
+    lines = []
+    for metric in (HTTP_REQUESTS, HTTP_DURATION):
+        lines += metric.render()
+    lines += render_gauge('ayora_http_requests_in_flight', 'Requêtes HTTP en cours', [((), _http_in_flight['count'])])
+    for metric in (CACHE_REQUESTS, CACHE_EVICTIONS):
+        lines += metric.render()
+    lines += render_gauge('ayora_cache_entries', 'Entrées présentes dans le cache',
+                          [((family,), count) for family, count in sorted(entries.items())], ('family',))
+    for metric in (SUPABASE_REQUESTS, SUPABASE_DURATION, OPENAI_REQUESTS, OPENAI_DURATION, OPENAI_TOKENS):
+        lines += metric.render()
+    lines += render_gauge('ayora_llm_in_flight', 'Appels OpenAI en cours', [((), llm['in_flight'])])
+    lines += render_gauge('ayora_llm_waiting', 'Questions en attente d\'un emplacement OpenAI', [((), llm['waiting'])])
+    lines += ['# HELP ayora_llm_rejected_total Questions refusées (assistant saturé)',
+              '# TYPE ayora_llm_rejected_total counter', f"ayora_llm_rejected_total {llm['rejected']}"]
+    return '\n'.join(lines) + '\n'
+
+@app.route('/metrics')
+def metrics():
+    """Métriques pour Prometheus (sans session : réservé au porteur de METRICS_TOKEN)"""
+    if not METRICS_TOKEN:
+        return 'Not Found\n', 404
+    authorization = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(authorization.encode('utf-8'), f'Bearer {METRICS_TOKEN}'.encode('utf-8')):
+        return 'Unauthorized\n', 401, {'WWW-Authenticate': 'Bearer'}
+    response = app.response_class(render_metrics(), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 # Système de localisation
 def load_translations(language):
     """Charger les traductions pour une langue donnée"""
@@ -234,6 +819,117 @@ def nl2br(value):
         return ''
     return value.replace('\n', '<br>')
 
+# Images responsives : variantes redimensionnées (AVIF/WebP/PNG) mises en cache sur disque
+IMAGE_SOURCE_DIR = os.path.join(app.static_folder, 'images')
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join(app.root_path, 'cache', 'images'))
+IMAGE_WIDTHS = (64, 128, 256, 384, 512, 768, 1024)
+IMAGE_FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+    'png': ('PNG', 'image/png')
+}
+
+def image_format_supported(fmt):
+    """Vérifier que Pillow sait encoder le format demandé"""
+    if not Image:
+        return False
+    if fmt == 'png':
+        return True
+    try:
+        return bool(pil_features.check(fmt))
+    except Exception:
+        return False
+
+def choose_image_format():
+    """Choisir le format selon le paramètre fmt ou l'en-tête Accept (AVIF > WebP > PNG)"""
+    requested = request.args.get('fmt', '').lower()
+    if requested in IMAGE_FORMATS and image_format_supported(requested):
+        return requested
+    # Seuls les types annoncés explicitement comptent (*/* ne garantit pas le support AVIF)
+    accepted = {mimetype for mimetype, quality in request.accept_mimetypes if quality > 0}
+    for fmt in ('avif', 'webp'):
+        if IMAGE_FORMATS[fmt][1] in accepted and image_format_supported(fmt):
+            return fmt
+    return 'png'
+
+def snap_image_width(width):
+    """Arrondir à la largeur autorisée supérieure (limite le nombre de variantes en cache)"""
+    for allowed in IMAGE_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return IMAGE_WIDTHS[-1]
+
+def get_image_variant(source_path, width, fmt):
+    """Générer (ou relire depuis le cache disque) une variante redimensionnée"""
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    version = int(os.path.getmtime(source_path))
+    variant_path = os.path.join(IMAGE_CACHE_DIR, f"{name}-{width}w-{version}.{fmt}")
+
+    if not os.path.isfile(variant_path):
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        with Image.open(source_path) as source:
+            image = source.copy()
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+
+        # Écriture atomique : plusieurs workers ou threads peuvent générer la même variante,
+        # chaque écriture a donc son propre fichier temporaire
+        tmp_path = f"{variant_path}.{uuid.uuid4().hex}.tmp"
+        pil_format = IMAGE_FORMATS[fmt][0]
+        try:
+            if pil_format == 'PNG':
+                image.save(tmp_path, pil_format, optimize=True)
+            else:
+                image.save(tmp_path, pil_format, quality=80)
+            os.replace(tmp_path, variant_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return variant_path
+
+@app.route('/images/<path:filename>')
+def responsive_image(filename):
+    """Servir une image de static/images/ redimensionnée pour la largeur demandée (?w=)"""
+    source_path = safe_join(IMAGE_SOURCE_DIR, filename)
+    if not source_path or not os.path.isfile(source_path):
+        return jsonify({'error': 'Image non trouvée'}), 404
+
+    if not Image:
+        # Pillow absent : servir l'original
+        return redirect(url_for('static', filename=f'images/{filename}'))
+
+    try:
+        width = snap_image_width(int(request.args.get('w', IMAGE_WIDTHS[-1])))
+    except ValueError:
+        return jsonify({'error': 'Largeur invalide'}), 400
+
+    fmt = choose_image_format()
+    try:
+        variant_path = get_image_variant(source_path, width, fmt)
+    except Exception as e:
+        print(f"Erreur génération image {filename} ({width}px, {fmt}): {e}")
+        return redirect(url_for('static', filename=f'images/{filename}'))
+
+    response = send_file(variant_path, mimetype=IMAGE_FORMATS[fmt][1], max_age=STATIC_IMMUTABLE_MAX_AGE)
+    response.vary.add('Accept')
+    if request.args.get('v'):
+        response.headers['Cache-Control'] = f'public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+@app.template_global()
+def image_url(filename, width):
+    """URL d'une variante d'image (versionnée par la date de modification de la source)"""
+    source_path = os.path.join(IMAGE_SOURCE_DIR, filename)
+    version = int(os.path.getmtime(source_path)) if os.path.isfile(source_path) else 0
+    return url_for('responsive_image', filename=filename, w=width, v=version)
+
+@app.template_global()
+def image_srcset(filename, widths):
+    """Attribut srcset pour une image : le navigateur choisit la largeur adaptée à l'écran"""
+    return ', '.join(f"{image_url(filename, width)} {width}w" for width in widths)
+
 # Route pour changer la langue
 @app.route('/change-language/<language>')
 def change_language(language):
@@ -278,8 +974,11 @@ def auth_login():
         if not access_token:
             return jsonify({'success': False, 'message': 'Token manquant'}), 400
         
-        # Vérifier le token avec Supabase
-        decoded_token = verify_supabase_token(access_token)
+        # Vérifier le token avec Supabase (ou le secret de benchmark hors production)
+        if BENCH_AUTH_SECRET:
+            decoded_token = verify_bench_token(access_token)
+        else:
+            decoded_token = verify_supabase_token(access_token)
         if not decoded_token:
             return jsonify({'success': False, 'message': 'Token invalide'}), 401
         
@@ -584,11 +1283,15 @@ def api_client(client_id):
             result = supabase.table('clients').update(data).eq('id', client_id).execute()
             
             if result.data:
+                # Mettre à jour l'index de recherche si des préférences ont changé
+                if any(field in data for field in PREFERENCE_CLIENT_FIELDS) and _preference_index['built_at']:
+                    index_client_preferences(result.data[0])
+                
                 # Invalider le cache pour ce client
-                cache_keys_to_clear = [f'client_{client_id}', 'clients_*', 'dashboard_stats', 'clients_recents']
+                cache_keys_to_clear = [f'client_{client_id}', 'clients_*', 'dashboard_stats', 'clients_recents', 'hotel_context']
                 for key in list(_cache.keys()):
                     if any(pattern.replace('*', '') in key for pattern in cache_keys_to_clear):
-                        del _cache[key]
+                        evict_cache_entry(key, 'invalidated')
                 
                 return jsonify({'success': True, 'message': 'Client mis à jour avec succès', 'data': result.data})
             else:
@@ -622,11 +1325,16 @@ def api_reservation(resv_name_id):
             result = supabase.table('reservations').update(data).eq('resv_name_id', resv_name_id).execute()
             
             if result.data:
+                # Mettre à jour l'index de recherche si les demandes spéciales ont changé
+                if 'special_requests' in data and _preference_index['built_at']:
+                    existing = _preference_index['docs'].get(('reservation', resv_name_id))
+                    index_reservation_requests(result.data[0], existing['meta']['client_name'] if existing else None)
+                
                 # Invalider le cache pour cette réservation
-                cache_keys_to_clear = [f'reservation_{resv_name_id}', 'reservations_*', 'dashboard_stats', 'reservations_jour', 'chambres_actuelles']
+                cache_keys_to_clear = [f'reservation_{resv_name_id}', 'reservations_*', 'dashboard_stats', 'reservations_jour', 'chambres_actuelles', 'calendar_*', 'hotel_context']
                 for key in list(_cache.keys()):
                     if any(pattern.replace('*', '') in key for pattern in cache_keys_to_clear):
-                        del _cache[key]
+                        evict_cache_entry(key, 'invalidated')
                 
                 return jsonify({'success': True, 'message': 'Réservation mise à jour avec succès'})
             else:
@@ -652,6 +1360,41 @@ def get_calendar_api(year, month):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/calendar/range')
+@login_required
+def get_calendar_range_api():
+    """API heatmap : compteurs arrivées/départs/présents par jour (jusqu'à un an)"""
+    try:
+        start_date = parse_reservation_date(request.args.get('from', ''))
+        end_date = parse_reservation_date(request.args.get('to', ''))
+
+        if not start_date or not end_date:
+            return jsonify({'error': 'Paramètres from et to requis (YYYY-MM-DD)'}), 400
+        if end_date < start_date:
+            return jsonify({'error': 'La date de fin doit être postérieure à la date de début'}), 400
+        if (end_date - start_date).days + 1 > CALENDAR_RANGE_MAX_DAYS:
+            return jsonify({'error': f'Période limitée à {CALENDAR_RANGE_MAX_DAYS} jours'}), 400
+
+        cache_key = f'calendar_range_{start_date.isoformat()}_{end_date.isoformat()}'
+        range_data = get_cached_data(cache_key, lambda: get_calendar_range_counts(start_date, end_date), 60)
+        return jsonify(range_data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/calendar/day/<day>')
+@login_required
+def get_calendar_day_api(day):
+    """API pour charger la liste des clients d'un jour (ouverture du détail)"""
+    try:
+        day_date = parse_reservation_date(day)
+        if not day_date:
+            return jsonify({'error': 'Date invalide (YYYY-MM-DD)'}), 400
+
+        day_data = get_cached_data(f'calendar_day_{day_date.isoformat()}', lambda: get_calendar_day_details(day_date), 30)
+        return jsonify(day_data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/departures/today')
 @login_required
 def get_today_departures():
@@ -668,79 +1411,76 @@ def get_rooms_status():
     try:
         print("DEBUG - Début de get_rooms_status")
         
-        # Récupérer toutes les réservations avec un numéro de chambre
-        response = supabase.table('reservations').select(
+        # Réservations en cours avec un numéro de chambre (lecture paginée)
+        reservations = fetch_all_rows(lambda: supabase.table('reservations').select(
             'resv_name_id, room_no, statut, client_principal_id, client_secondaire_id'
-        ).not_.is_('room_no', 'null').execute()
+        ).eq('statut', 'en_cours').not_.is_('room_no', 'null').order('resv_name_id'))
         
-        if response.data:
-            print(f"DEBUG - Réservations trouvées: {len(response.data)}")
+        if reservations:
+            print(f"DEBUG - Réservations en cours trouvées: {len(reservations)}")
+            
+            # Récupérer tous les clients des chambres par lots (au lieu d'une requête par client)
+            client_ids = list({client_id for reservation in reservations
+                               for client_id in (reservation.get('client_principal_id'),
+                                                 reservation.get('client_secondaire_id'))
+                               if client_id})
+            clients_data = {}
+            for i in range(0, len(client_ids), 100):
+                try:
+                    client_result = supabase.table('clients').select('id, guest_name, vip')\
+                        .in_('id', client_ids[i:i + 100]).execute()
+                    for client in client_result.data:
+                        clients_data[client['id']] = client
+                except Exception as e:
+                    print(f"DEBUG - Erreur clients des chambres: {e}")
             
-            # Filtrer les réservations en cours
             occupied_rooms = []
             
-            for reservation in response.data:
-                # Vérifier si la chambre est occupée (statut = 'en_cours')
-                if reservation.get('statut') == 'en_cours':
-                    print(f"DEBUG - Chambre {reservation['room_no']} en cours d'occupation")
-                    
-                    # Vérifier si la chambre a des clients
-                    has_clients = False
-                    vip_level = "Standard"
-                    client_name = "Client"
-                    
-                    # Vérifier le client principal
+            for reservation in reservations:
+                # Vérifier si la chambre a des clients
+                has_clients = False
+                vip_level = "Standard"
+                client_name = "Client"
+                
+                # Vérifier le client principal
+                client_info = clients_data.get(reservation.get('client_principal_id'))
+                if client_info:
+                    has_clients = True
+                    # Récupérer le nom du client
+                    if client_info.get('guest_name'):
+                        client_name = client_info['guest_name']
+                    # Récupérer le niveau VIP
+                    client_vip = client_info.get('vip', '')
+                    if client_vip and client_vip.strip():
+                        vip_level = client_vip
+                
+                # Vérifier le client secondaire
+                secondary_info = clients_data.get(reservation.get('client_secondaire_id'))
+                if secondary_info:
+                    has_clients = True
+                    # Prendre le niveau VIP le plus élevé
+                    client_vip = secondary_info.get('vip', '')
+                    if client_vip and client_vip.strip():
+                        # Si le client secondaire a un niveau VIP plus élevé, l'utiliser
+                        if client_vip in ['VIP1', 'VIP2', 'VIP3', 'VIP4', 'VIP5', 'VIP6', 'VIP7', 'VIP8']:
+                            if vip_level == "Standard" or client_vip > vip_level:
+                                vip_level = client_vip
+                
+                # N'ajouter que si la chambre a des clients
+                if has_clients:
+                    # Compter le nombre de clients
+                    num_guests = 0
                     if reservation.get('client_principal_id'):
-                        try:
-                            client_response = supabase.table('clients').select('guest_name, vip').eq('id', reservation['client_principal_id']).execute()
-                            if client_response.data:
-                                has_clients = True
-                                client_info = client_response.data[0]
-                                # Récupérer le nom du client
-                                if client_info.get('guest_name'):
-                                    client_name = client_info['guest_name']
-                                # Récupérer le niveau VIP
-                                client_vip = client_info.get('vip', '')
-                                if client_vip and client_vip.strip():
-                                    vip_level = client_vip
-                                    print(f"DEBUG - Chambre {reservation['room_no']}: VIP {vip_level}, Client: {client_name}")
-                        except Exception as e:
-                            print(f"DEBUG - Erreur client principal: {e}")
-                    
-                    # Vérifier le client secondaire
+                        num_guests += 1
                     if reservation.get('client_secondaire_id'):
-                        try:
-                            client_response = supabase.table('clients').select('vip').eq('id', reservation['client_secondaire_id']).execute()
-                            if client_response.data:
-                                has_clients = True
-                                # Prendre le niveau VIP le plus élevé
-                                client_vip = client_response.data[0].get('vip', '')
-                                if client_vip and client_vip.strip():
-                                    # Si le client secondaire a un niveau VIP plus élevé, l'utiliser
-                                    if client_vip in ['VIP1', 'VIP2', 'VIP3', 'VIP4', 'VIP5', 'VIP6', 'VIP7', 'VIP8']:
-                                        if vip_level == "Standard" or client_vip > vip_level:
-                                            vip_level = client_vip
-                                            print(f"DEBUG - Chambre {reservation['room_no']}: VIP mis à jour à {vip_level}")
-                        except Exception as e:
-                            print(f"DEBUG - Erreur client secondaire: {e}")
+                        num_guests += 1
                     
-                    # N'ajouter que si la chambre a des clients
-                    if has_clients:
-                        # Compter le nombre de clients
-                        num_guests = 0
-                        if reservation.get('client_principal_id'):
-                            num_guests += 1
-                        if reservation.get('client_secondaire_id'):
-                            num_guests += 1
-                        
-                        occupied_rooms.append({
-                            'room_no': reservation['room_no'],
-                            'num_guests': num_guests,
-                            'vip_level': vip_level,
-                            'client_name': client_name
-                        })
-                        
-                        print(f"DEBUG - Chambre {reservation['room_no']}: {num_guests} personne(s), {vip_level}, {client_name}")
+                    occupied_rooms.append({
+                        'room_no': reservation['room_no'],
+                        'num_guests': num_guests,
+                        'vip_level': vip_level,
+                        'client_name': client_name
+                    })
             
             # Trier les chambres : VIP d'abord, puis Standard
             def sort_key(room):
@@ -1407,6 +2147,126 @@ def get_calendar_data(year=None, month=None):
         print(f"Erreur get_calendar_data: {str(e)}")
         return {'year': year, 'month': month, 'calendar_data': {}}
 
+# Étendue maximale autorisée pour la heatmap du calendrier (un an)
+CALENDAR_RANGE_MAX_DAYS = 366
+
+def parse_reservation_date(value):
+    """Parser une date de réservation (format 'YYYY-MM-DD' ou ISO avec heure)"""
+    if not value:
+        return None
+    try:
+        if 'T' in value:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return None
+
+def get_calendar_range_counts(start_date, end_date):
+    """Compter arrivées, départs et clients présents par jour sur une période
+
+    Une requête légère (dates uniquement, paginée) et un seul passage sur les
+    réservations : les présences sont cumulées avec un tableau de différences
+    au lieu de parcourir chaque nuit de chaque séjour.
+    """
+    try:
+        reservations = fetch_all_rows(lambda: supabase.table('reservations').select('resv_name_id, arrival, departure')
+                                      .lte('arrival', end_date.isoformat())
+                                      .gte('departure', start_date.isoformat())
+                                      .order('resv_name_id'))
+
+        nb_days = (end_date - start_date).days + 1
+        arrivals = [0] * nb_days
+        departures = [0] * nb_days
+        in_house_delta = [0] * (nb_days + 1)
+
+        for reservation in reservations:
+            arrival = parse_reservation_date(reservation.get('arrival'))
+            departure = parse_reservation_date(reservation.get('departure'))
+            if not arrival or not departure:
+                continue
+            if departure < start_date or arrival > end_date:
+                continue
+
+            if arrival >= start_date:
+                arrivals[(arrival - start_date).days] += 1
+            if departure <= end_date:
+                departures[(departure - start_date).days] += 1
+
+            # Présent du jour d'arrivée au jour de départ inclus (comme get_calendar_data)
+            first = (max(arrival, start_date) - start_date).days
+            last = (min(departure, end_date) - start_date).days
+            in_house_delta[first] += 1
+            in_house_delta[last + 1] -= 1
+
+        days = {}
+        in_house = 0
+        for i in range(nb_days):
+            in_house += in_house_delta[i]
+            if arrivals[i] or departures[i] or in_house:
+                days[(start_date + timedelta(days=i)).isoformat()] = {
+                    'arrivals': arrivals[i],
+                    'departures': departures[i],
+                    'in_house': in_house
+                }
+
+        return {
+            'from': start_date.isoformat(),
+            'to': end_date.isoformat(),
+            'days': days
+        }
+    except Exception as e:
+        print(f"Erreur get_calendar_range_counts: {str(e)}")
+        return {'from': start_date.isoformat(), 'to': end_date.isoformat(), 'days': {}}
+
+def fetch_calendar_day_details(day):
+    """Liste des clients (arrivées, départs, présents) pour un jour donné (les erreurs remontent)"""
+    day_key = day.isoformat()
+    reservations = fetch_all_rows(lambda: supabase.table('reservations').select(
+        'resv_name_id, room_no, arrival, departure, client_principal_id'
+    ).lte('arrival', day_key).gte('departure', day_key).order('resv_name_id'))
+
+    # Récupérer les clients principaux en une seule requête
+    client_ids = list({r['client_principal_id'] for r in reservations if r.get('client_principal_id')})
+    clients_data = {}
+    chunk_size = 100
+    for i in range(0, len(client_ids), chunk_size):
+        chunk = client_ids[i:i + chunk_size]
+        client_result = supabase.table('clients').select('id, guest_name').in_('id', chunk).execute()
+        for client in client_result.data:
+            clients_data[client['id']] = client
+
+    day_data = {'arrivals': [], 'departures': [], 'guests': []}
+
+    for reservation in reservations:
+        arrival = parse_reservation_date(reservation.get('arrival'))
+        departure = parse_reservation_date(reservation.get('departure'))
+        if not arrival or not departure or not (arrival <= day <= departure):
+            continue
+
+        client_principal = clients_data.get(reservation.get('client_principal_id'))
+        guest = {
+            'reservation_id': reservation['resv_name_id'],
+            'client_name': client_principal['guest_name'] if client_principal else 'Client inconnu',
+            'client_id': client_principal['id'] if client_principal else None,
+            'room_no': reservation.get('room_no') or 'Non assignée'
+        }
+
+        day_data['guests'].append(dict(guest, arrival=reservation['arrival'], departure=reservation['departure']))
+        if day == arrival:
+            day_data['arrivals'].append(guest)
+        if day == departure:
+            day_data['departures'].append(guest)
+
+    return dict(day_data, date=day_key)
+
+def get_calendar_day_details(day):
+    """Récupérer la liste des clients (arrivées, départs, présents) pour un jour donné"""
+    try:
+        return fetch_calendar_day_details(day)
+    except Exception as e:
+        print(f"Erreur get_calendar_day_details: {str(e)}")
+        return {'date': day.isoformat(), 'arrivals': [], 'departures': [], 'guests': []}
+
 def get_chambres_actuelles_from_reservations(reservations):
     """Organiser les réservations actuelles par chambre"""
     chambres_actuelles = {}
@@ -1622,85 +2482,631 @@ def test_chat_droite_bas():
     """Page de test pour le chat bot qui se déploie depuis la droite en bas"""
     return render_template('test_chat_droite.html')
 
-# ===== CHATBOT AI API =====
+# ===== RECHERCHE DANS LES PRÉFÉRENCES (BM25) =====
+# Index en mémoire des préférences clients (alimentaires, chambre, Opera) et des
+# demandes spéciales des réservations. Construit au premier usage, reconstruit
+# périodiquement (modifications externes) et mis à jour lors des écritures.
+PREFERENCE_INDEX_TTL = int(os.getenv('PREFERENCE_INDEX_TTL', 900))  # en secondes
+PREFERENCE_CLIENT_FIELDS = ['preferences_alimentaires', 'preferences_chambre', 'preferences_opera']
+BM25_K1 = 1.5
+BM25_B = 0.75
+SEARCH_STOP_WORDS = {
+    'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'au', 'aux', 'et', 'ou', 'a', 'en', 'est', 'sont',
+    'qui', 'que', 'quoi', 'quel', 'quels', 'quelle', 'quelles', 'il', 'elle', 'ils', 'y', 'pour', 'par',
+    'avec', 'sans', 'sur', 'dans', 'pas', 'ne', 'se', 'son', 'sa', 'ses', 'ce', 'cette', 'client', 'clients',
+    'the', 'is', 'are', 'who', 'what', 'which', 'of', 'to', 'for', 'and', 'or', 'in', 'on', 'has', 'have', 'asked'
+}
 
-@app.route('/api/chatbot/query', methods=['POST'])
-@login_required
-def chatbot_query():
-    """API pour interroger le chatbot AI - Reproduction exacte du comportement mobile"""
-    try:
-        data = request.get_json()
-        question = data.get('question', '').lower()
-        user_id = session.get('user_id')
-        
-        if not question:
-            return jsonify({'success': False, 'message': 'Question requise'}), 400
-        
-        print(f"🤖 Question reçue: '{question}' de l'utilisateur {user_id}")
-        
-        # ÉTAPE 2: Récupération Données Supabase (comme dans mobile)
-        print("📊 Récupération du contexte hôtel...")
-        
-        # ÉTAPE 3: Construction du Contexte
-        context_data = get_context_data_for_question(question)
-        print(f"🏨 Contexte construit: {len(str(context_data))} caractères")
-        
-        # ÉTAPE 4: Envoi à OpenAI GPT-3.5
-        print("🚀 Appel OpenAI GPT-3.5...")
-        response = generate_ai_response(question, user_id)
-        
-        print(f"✅ Réponse IA générée: {len(response)} caractères")
-        
-        # ÉTAPE 5: Sauvegarde Interaction (CRITIQUE - manquait dans mobile!)
-        print("💾 Sauvegarde dans ai_interactions...")
-        save_ai_interaction(user_id, question, response, context_data)
-        
-        print("🎉 Interaction complète sauvegardée!")
-        
-        return jsonify({
-            'success': True,
-            'response': response,
-            'question': question,
-            'context_used': len(str(context_data))
-        })
-        
-    except Exception as e:
-        print(f"❌ Erreur chatbot: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)}), 500
+_preference_index = {'docs': {}, 'postings': {}, 'total_length': 0, 'built_at': 0}
+_preference_index_lock = threading.RLock()
+_preference_index_build_lock = threading.Lock()  # une seule reconstruction à la fois
 
-def generate_ai_response(question, user_id):
-    """Générer une réponse AI basée sur la question et les données Supabase avec OpenAI GPT-3.5
-    - Reproduction exacte du comportement mobile AIConciergeService"""
-    
-    try:
-        # Récupérer le contexte des données Supabase (comme _getHotelContext() dans mobile)
-        context_data = get_context_data_for_question(question)
-        
-        # Préparer le prompt pour OpenAI (IA omnisciente)
-        system_prompt = """Tu es l'assistant concierge AYORA, un chatbot OMNISCIENT pour un hôtel de luxe en Thaïlande.
+def tokenize_search_text(text):
+    """Découper un texte en termes normalisés (accents, pluriels, racine courte)"""
+    terms = []
+    for word in normalize_question(str(text or '')).split():
+        if len(word) < 2 or word in SEARCH_STOP_WORDS:
+            continue
+        if len(word) > 3 and word[-1] in 'sx':
+            word = word[:-1]
+        terms.append(word[:6])
+    return terms
 
-🎯 TON RÔLE : Tu as accès à TOUTES les données de l'hôtel et tu peux répondre à TOUTES les questions possibles.
+def remove_preference_document(doc_id):
+    """Retirer un document de l'index"""
+    with _preference_index_lock:
+        doc = _preference_index['docs'].pop(doc_id, None)
+        if not doc:
+            return
+        _preference_index['total_length'] -= doc['length']
+        for term in doc['tf']:
+            postings = _preference_index['postings'].get(term)
+            if postings:
+                postings.discard(doc_id)
+                if not postings:
+                    del _preference_index['postings'][term]
 
-📊 TES DONNÉES : Tu as accès à :
-- Tous les clients (actuels, passés, futurs)
-- Toutes les réservations et chambres
-- Toutes les préférences et allergies
-- Tous les niveaux VIP et statuts
-- Tout le personnel et leur disponibilité
-- Toutes les alertes et problèmes
-- Toutes les statistiques et tendances
-- Tout le calendrier et planning
+def index_preference_document(doc_id, text, meta):
+    """Ajouter ou remplacer un document dans l'index (ignoré si le texte est vide)"""
+    with _preference_index_lock:
+        remove_preference_document(doc_id)
+        terms = tokenize_search_text(text)
+        if not terms:
+            return
+        tf = Counter(terms)
+        _preference_index['docs'][doc_id] = {'tf': tf, 'length': len(terms), 'meta': meta}
+        _preference_index['total_length'] += len(terms)
+        for term in tf:
+            _preference_index['postings'].setdefault(term, set()).add(doc_id)
 
-🧠 TES CAPACITÉS :
-- Analysez les données pour répondre précisément
-- Faites des recommandations basées sur l'historique
-- Identifiez des patterns et tendances
-- Anticipez les besoins et problèmes
-- Donnez des insights business
+def index_client_preferences(client):
+    """Indexer les préférences d'un client (ligne de la table clients)"""
+    fields = {field: client.get(field) for field in PREFERENCE_CLIENT_FIELDS if client.get(field)}
+    meta = {
+        'type': 'client',
+        'client_id': client.get('id'),
+        'client_name': f"{client.get('guest_title') or ''} {client.get('guest_name') or ''}".strip(),
+        'vip': client.get('vip'),
+        'fields': fields
+    }
+    index_preference_document(('client', client.get('id')), ' '.join(str(v) for v in fields.values()), meta)
 
-💬 STYLE DE RÉPONSE :
-- Professionnel mais chaleureux
-- Concis mais complet
+def index_reservation_requests(reservation, client_name=None):
+    """Indexer les demandes spéciales d'une réservation (ligne de la table reservations)"""
+    meta = {
+        'type': 'reservation',
+        'reservation_id': reservation.get('resv_name_id'),
+        'client_id': reservation.get('client_principal_id'),
+        'client_name': client_name,
+        'room_no': reservation.get('room_no'),
+        'arrival': reservation.get('arrival'),
+        'departure': reservation.get('departure'),
+        'statut': reservation.get('statut'),
+        'fields': {'special_requests': reservation.get('special_requests')} if reservation.get('special_requests') else {}
+    }
+    index_preference_document(('reservation', reservation.get('resv_name_id')), reservation.get('special_requests'), meta)
+
+def build_preference_index():
+    """Construire l'index complet depuis Supabase
+
+    Les lectures (paginées : plafond max-rows de PostgREST) sont faites sans verrou ;
+    l'index n'est verrouillé que pendant son remplacement, sans entrée/sortie.
+    """
+    started = time.time()
+    clients = fetch_all_rows(lambda: supabase.table('clients').select(
+        'id, guest_name, guest_title, vip, ' + ', '.join(PREFERENCE_CLIENT_FIELDS)
+    ).or_(','.join(f'{field}.not.is.null' for field in PREFERENCE_CLIENT_FIELDS)).order('id'))
+
+    reservations = fetch_all_rows(lambda: supabase.table('reservations').select(
+        'resv_name_id, room_no, arrival, departure, statut, special_requests, client_principal_id'
+    ).not_.is_('special_requests', 'null').order('resv_name_id'))
+
+    # Noms des clients principaux des réservations (par lots)
+    names = {client['id']: f"{client.get('guest_title') or ''} {client.get('guest_name') or ''}".strip()
+             for client in clients}
+    missing = list({r['client_principal_id'] for r in reservations
+                    if r.get('client_principal_id') and r['client_principal_id'] not in names})
+    for i in range(0, len(missing), 100):
+        chunk_result = supabase.table('clients').select('id, guest_name, guest_title').in_('id', missing[i:i + 100]).execute()
+        for client in chunk_result.data:
+            names[client['id']] = f"{client.get('guest_title') or ''} {client.get('guest_name') or ''}".strip()
+
+    with _preference_index_lock:
+        _preference_index.update({'docs': {}, 'postings': {}, 'total_length': 0})
+        for client in clients:
+            index_client_preferences(client)
+        for reservation in reservations:
+            index_reservation_requests(reservation, names.get(reservation.get('client_principal_id')))
+        _preference_index['built_at'] = time.time()
+
+    print(f"🔎 Index des préférences construit: {len(_preference_index['docs'])} documents, "
+          f"{len(_preference_index['postings'])} termes en {int((time.time() - started) * 1000)} ms")
+
+def ensure_preference_index():
+    """Construire l'index au premier usage ou s'il est trop ancien
+
+    Pendant une reconstruction, les recherches utilisent l'index précédent.
+    """
+    if time.time() - _preference_index['built_at'] < PREFERENCE_INDEX_TTL:
+        return
+    # Sans index, attendre la construction en cours ; sinon ne pas attendre
+    if not _preference_index_build_lock.acquire(blocking=not _preference_index['built_at']):
+        return
+    try:
+        if time.time() - _preference_index['built_at'] >= PREFERENCE_INDEX_TTL:
+            build_preference_index()
+    finally:
+        _preference_index_build_lock.release()
+
+def search_preferences(query, limit=10):
+    """Rechercher les clients/réservations dont les préférences correspondent à la requête (BM25)"""
+    ensure_preference_index()
+    terms = set(tokenize_search_text(query))
+    with _preference_index_lock:
+        docs = _preference_index['docs']
+        if not docs or not terms:
+            return []
+        average_length = _preference_index['total_length'] / len(docs)
+        scores = {}
+        for term in terms:
+            postings = _preference_index['postings'].get(term, ())
+            if not postings:
+                continue
+            idf = math.log(1 + (len(docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id in postings:
+                doc = docs[doc_id]
+                tf = doc['tf'][term]
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * doc['length'] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0) + idf * tf * (BM25_K1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [dict(docs[doc_id]['meta'], score=round(score, 3)) for doc_id, score in ranked]
+
+def format_preference_results(results):
+    """Formater des résultats de recherche en tableau compact pour OpenAI"""
+    rows = []
+    for result in results:
+        rows.append({
+            'type': result['type'],
+            'client': result.get('client_name'),
+            'chambre': result.get('room_no'),
+            'statut': result.get('statut'),
+            'texte': ' ; '.join(f"{field}: {value}" for field, value in result['fields'].items())
+        })
+    return compact_table(rows, ['type', 'client', 'chambre', 'statut', 'texte'])
+
+@app.route('/api/search/preferences')
+@login_required
+def search_preferences_api():
+    """API de recherche dans les préférences et demandes spéciales (sans LLM)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'message': 'Paramètre q requis'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Paramètre limit invalide'}), 400
+
+    try:
+        results = search_preferences(query, limit)
+        return jsonify({'success': True, 'query': query, 'results': results})
+    except Exception as e:
+        print(f"❌ Erreur recherche préférences: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# ===== INSTRUMENTATION DU CHATBOT =====
+# Chaque question est suivie par une trace (durée de chaque étape en ms, tokens,
+# chemin emprunté). La durée totale est enregistrée dans ai_interactions
+# (response_time_ms) et les dernières traces alimentent /api/chatbot/metrics.
+CHATBOT_METRICS_WINDOW = 1000  # nombre de traces conservées par processus
+_chatbot_traces = deque(maxlen=CHATBOT_METRICS_WINDOW)
+_current_trace = threading.local()
+
+def start_chatbot_trace():
+    """Démarrer la trace d'une question (rattachée au thread courant)"""
+    trace = {'started': time.perf_counter(), 'stages': {}, 'details': {}, 'path': None}
+    _current_trace.value = trace
+    return trace
+
+def get_current_trace():
+    """Trace de la question en cours sur ce thread (ou None)"""
+    return getattr(_current_trace, 'value', None)
+
+@contextmanager
+def chatbot_stage(name):
+    """Mesurer une étape du pipeline (cumulée si l'étape se répète, ex: appels OpenAI)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = get_current_trace()
+        if trace is not None:
+            elapsed = (time.perf_counter() - started) * 1000
+            trace['stages'][name] = round(trace['stages'].get(name, 0) + elapsed, 1)
+
+def record_trace_detail(key, value):
+    """Ajouter un détail à la trace en cours (durées par catégorie, par outil...)"""
+    trace = get_current_trace()
+    if trace is not None:
+        trace['details'].setdefault(key, {}).update(value)
+
+def trace_elapsed_ms(trace):
+    """Durée écoulée depuis le début de la trace (en ms)"""
+    return max(1, round((time.perf_counter() - trace['started']) * 1000))
+
+def finish_chatbot_trace(trace, path, response_time_ms, tokens=None):
+    """Clore la trace et l'ajouter à la fenêtre des métriques"""
+    trace['path'] = path
+    entry = {
+        'path': path,
+        'total_ms': response_time_ms,
+        'stages': dict(trace['stages']),
+        'tokens': dict(tokens or {}),
+        'at': time.time()
+    }
+    _chatbot_traces.append(entry)
+    _current_trace.value = None
+    stages = ', '.join(f"{name} {ms:.0f}ms" for name, ms in entry['stages'].items())
+    print(f"⏱️ Réponse ({path}) en {response_time_ms} ms: {stages}")
+    return entry
+
+def trace_summary(trace):
+    """Timings à enregistrer avec l'interaction"""
+    return {'stages': dict(trace['stages']), 'details': dict(trace['details'])}
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche (values triées)"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))
+    return values[index]
+
+def summarize_latencies(values):
+    """p50 / p95 / p99 / moyenne d'une liste de durées"""
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'avg': round(sum(values) / len(values), 1)
+    }
+
+@app.route('/api/chatbot/metrics')
+@login_required
+def chatbot_metrics():
+    """Percentiles de latence du chatbot (total et par étape) sur les dernières questions
+
+    ?source=db : percentiles calculés sur les response_time_ms enregistrés (tous processus)
+    """
+    if request.args.get('source') == 'db':
+        try:
+            result = supabase.table('ai_interactions').select('response_time_ms')\
+                .gt('response_time_ms', 0)\
+                .order('created_at', desc=True)\
+                .limit(CHATBOT_METRICS_WINDOW)\
+                .execute()
+            return jsonify({
+                'success': True,
+                'source': 'db',
+                'total_ms': summarize_latencies([row['response_time_ms'] for row in result.data])
+            })
+        except Exception as e:
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    traces = list(_chatbot_traces)
+    stage_names = sorted({name for trace in traces for name in trace['stages']})
+    paths = Counter(trace['path'] for trace in traces)
+    llm_traces = [trace for trace in traces if trace['tokens']]
+
+    return jsonify({
+        'success': True,
+        'source': 'memory',
+        'window': CHATBOT_METRICS_WINDOW,
+        'total_ms': summarize_latencies([trace['total_ms'] for trace in traces]),
+        'by_path': {
+            path: summarize_latencies([trace['total_ms'] for trace in traces if trace['path'] == path])
+            for path in paths
+        },
+        'stages_ms': {
+            name: summarize_latencies([trace['stages'][name] for trace in traces if name in trace['stages']])
+            for name in stage_names
+        },
+        'tokens': {
+            'prompt': summarize_latencies([t['tokens'].get('openai_prompt_tokens', t['tokens'].get('prompt_tokens', 0)) for t in llm_traces]),
+            'completion': summarize_latencies([t['tokens'].get('openai_completion_tokens', 0) for t in llm_traces])
+        },
+        'llm': dict(_llm_state)
+    })
+
+# ===== LIMITATION DES APPELS OPENAI =====
+# Un appel OpenAI occupe un thread du serveur pendant plusieurs secondes. Le nombre
+# d'appels simultanés par processus est borné (CHATBOT_MAX_INFLIGHT) pour que les
+# pages restent servies. Au-delà, les questions attendent au plus
+# CHATBOT_QUEUE_TIMEOUT secondes, puis l'assistant répond immédiatement qu'il est
+# occupé. Une question en attente bloque aussi un thread : appels en cours et en
+# attente restent sous WEB_THREADS (gunicorn --threads, voir Procfile) moins
+# CHATBOT_RESERVED_THREADS threads gardés pour les pages.
+WEB_THREADS = int(os.getenv('WEB_THREADS', 8))
+CHATBOT_RESERVED_THREADS = 2
+_chatbot_thread_budget = max(1, WEB_THREADS - CHATBOT_RESERVED_THREADS)
+CHATBOT_MAX_INFLIGHT = min(int(os.getenv('CHATBOT_MAX_INFLIGHT', 4)), _chatbot_thread_budget)
+CHATBOT_MAX_WAITING = min(int(os.getenv('CHATBOT_MAX_WAITING', _chatbot_thread_budget - CHATBOT_MAX_INFLIGHT)),
+                          _chatbot_thread_budget - CHATBOT_MAX_INFLIGHT)
+CHATBOT_QUEUE_TIMEOUT = float(os.getenv('CHATBOT_QUEUE_TIMEOUT', 5))  # en secondes
+CHATBOT_BUSY_MESSAGE = "L'assistant est très sollicité en ce moment. Merci de réessayer dans quelques secondes."
+_llm_slots = threading.BoundedSemaphore(CHATBOT_MAX_INFLIGHT)
+_llm_state = {'in_flight': 0, 'waiting': 0, 'rejected': 0}
+_llm_state_lock = threading.Lock()
+
+def acquire_llm_slot():
+    """Réserver un emplacement pour un appel OpenAI (False si l'assistant est saturé)"""
+    with _llm_state_lock:
+        # Threads occupés par l'assistant (en cours + en attente) bornés à MAX_INFLIGHT + MAX_WAITING
+        if _llm_state['in_flight'] + _llm_state['waiting'] >= CHATBOT_MAX_INFLIGHT + CHATBOT_MAX_WAITING:
+            _llm_state['rejected'] += 1
+            return False
+        _llm_state['waiting'] += 1
+
+    acquired = _llm_slots.acquire(timeout=CHATBOT_QUEUE_TIMEOUT)
+
+    with _llm_state_lock:
+        _llm_state['waiting'] -= 1
+        if acquired:
+            _llm_state['in_flight'] += 1
+        else:
+            _llm_state['rejected'] += 1
+    return acquired
+
+def release_llm_slot():
+    """Libérer l'emplacement réservé par acquire_llm_slot"""
+    with _llm_state_lock:
+        _llm_state['in_flight'] -= 1
+    _llm_slots.release()
+
+def chatbot_busy_response():
+    """Réponse immédiate quand tous les emplacements OpenAI sont occupés"""
+    print(f"🚦 Assistant saturé: {_llm_state['in_flight']} appel(s) en cours, {_llm_state['waiting']} en attente")
+    response = jsonify({'success': False, 'busy': True, 'message': CHATBOT_BUSY_MESSAGE})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, math.ceil(CHATBOT_QUEUE_TIMEOUT)))
+    return response
+
+# ===== CHATBOT AI API =====
+
+@app.route('/api/chatbot/query', methods=['POST'])
+@login_required
+def chatbot_query():
+    """API pour interroger le chatbot AI - Reproduction exacte du comportement mobile"""
+    try:
+        data = request.get_json()
+        question = data.get('question', '').lower()
+        user_id = session.get('user_id')
+        
+        if not question:
+            return jsonify({'success': False, 'message': 'Question requise'}), 400
+        
+        print(f"🤖 Question reçue: '{question}' de l'utilisateur {user_id}")
+        trace = start_chatbot_trace()
+        
+        # ÉTAPE 1: Intention courante → réponse directe sans LLM
+        with chatbot_stage('fast_path'):
+            intent, fast_response = get_fast_path_response(question)
+        if fast_response:
+            print(f"⚡ Réponse directe (intention '{intent}')")
+            response_time_ms = trace_elapsed_ms(trace)
+            with chatbot_stage('persistence'):
+                save_conversation_exchange(user_id, question, fast_response)
+                save_ai_interaction(user_id, question, fast_response, {'fast_path': intent}, response_time_ms, trace_summary(trace))
+            finish_chatbot_trace(trace, 'fast_path', response_time_ms)
+            return jsonify({
+                'success': True,
+                'response': fast_response,
+                'question': question,
+                'context_used': 0,
+                'fast_path': intent
+            })
+        
+        # Réponse déjà connue (même question, données inchangées, pas une relance)
+        use_answer_cache = bool(openai_client) and answer_cache_allowed(question)
+        with chatbot_stage('answer_cache'):
+            cached = get_cached_answer(question) if use_answer_cache else None
+        if cached:
+            print("⚡ Réponse servie depuis le cache")
+            response_time_ms = trace_elapsed_ms(trace)
+            with chatbot_stage('persistence'):
+                save_conversation_exchange(user_id, question, cached['response'])
+                save_ai_interaction(user_id, question, cached['response'], {'cache': cached['deps']}, response_time_ms, trace_summary(trace))
+            finish_chatbot_trace(trace, 'cache', response_time_ms)
+            return jsonify({
+                'success': True,
+                'response': cached['response'],
+                'question': question,
+                'context_used': 0,
+                'cached': True
+            })
+        
+        # ÉTAPE 2: Récupération Données Supabase (comme dans mobile)
+        print("📊 Récupération du contexte hôtel...")
+        
+        # Nombre de questions traitées simultanément limité : l'emplacement couvre aussi
+        # la construction du contexte, qui peut occuper le thread plusieurs secondes
+        if openai_client:
+            with chatbot_stage('queue_wait'):
+                acquired = acquire_llm_slot()
+            if not acquired:
+                finish_chatbot_trace(trace, 'busy', trace_elapsed_ms(trace))
+                return chatbot_busy_response()
+        try:
+            # ÉTAPE 3: Construction du Contexte
+            tool_calls = []
+            token_report = {}
+            if CHATBOT_CONTEXT_MODE == 'snapshot':
+                # Snapshot partagé, construit une seule fois
+                with chatbot_stage('context'):
+                    context_data = get_context_data_for_question(question)
+            else:
+                # Mode outils : seules les données demandées par le modèle sont récupérées
+                context_data = {'outils': tool_calls, 'tokens': token_report}
+
+            # ÉTAPE 4: Envoi à OpenAI GPT-3.5
+            print("🚀 Appel OpenAI GPT-3.5...")
+            response = generate_ai_response(question, user_id, tool_calls, token_report)
+        finally:
+            if openai_client:
+                release_llm_slot()
+        print(f"🏨 Contexte utilisé: {len(str(context_data))} caractères")
+        
+        print(f"✅ Réponse IA générée: {len(response)} caractères")
+        if use_answer_cache:
+            store_cached_answer(question, response, context_data, tool_calls)
+        response_time_ms = trace_elapsed_ms(trace)
+        
+        # ÉTAPE 5: Sauvegarde Interaction (CRITIQUE - manquait dans mobile!)
+        print("💾 Sauvegarde dans ai_interactions...")
+        with chatbot_stage('persistence'):
+            save_ai_interaction(user_id, question, response, context_data, response_time_ms, trace_summary(trace))
+        finish_chatbot_trace(trace, 'llm' if openai_client else 'fallback', response_time_ms, token_report)
+        
+        print("🎉 Interaction complète sauvegardée!")
+        
+        return jsonify({
+            'success': True,
+            'response': response,
+            'question': question,
+            'context_used': len(str(context_data)),
+            'tokens': token_report
+        })
+        
+    except Exception as e:
+        print(f"❌ Erreur chatbot: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/chatbot/stream', methods=['POST'])
+@login_required
+def chatbot_stream():
+    """API du chatbot en streaming (Server-Sent Events)
+
+    Les morceaux de réponse sont transmis au widget dès leur génération.
+    Le formatage final est envoyé dans l'événement 'done' et la sauvegarde
+    (historique + ai_interactions) est faite après la fermeture du flux.
+    """
+    data = request.get_json(silent=True) or {}
+    question = data.get('question', '').lower()
+    user_id = session.get('user_id')
+
+    if not question:
+        return jsonify({'success': False, 'message': 'Question requise'}), 400
+
+    print(f"🤖 Question reçue (streaming): '{question}' de l'utilisateur {user_id}")
+
+    trace = start_chatbot_trace()
+    tool_calls = []
+    token_report = {}
+    result = {}
+    with chatbot_stage('fast_path'):
+        intent, fast_response = get_fast_path_response(question)
+    use_answer_cache = bool(openai_client) and not fast_response and answer_cache_allowed(question)
+    with chatbot_stage('answer_cache'):
+        cached = get_cached_answer(question) if use_answer_cache else None
+    if fast_response:
+        # Réponse directe sans LLM, envoyée comme une réponse en cache
+        print(f"⚡ Réponse directe (intention '{intent}')")
+        cached = {'response': fast_response}
+
+    # L'emplacement OpenAI est réservé avant la construction du contexte et l'ouverture
+    # du flux, et libéré à la fermeture du flux
+    holds_llm_slot = bool(openai_client and not cached)
+    if holds_llm_slot:
+        with chatbot_stage('queue_wait'):
+            acquired = acquire_llm_slot()
+        if not acquired:
+            finish_chatbot_trace(trace, 'busy', trace_elapsed_ms(trace))
+            return chatbot_busy_response()
+
+    if fast_response:
+        context_data = {'fast_path': intent}
+    elif cached:
+        print("⚡ Réponse servie depuis le cache")
+        context_data = {'cache': cached['deps']}
+    elif CHATBOT_CONTEXT_MODE == 'snapshot':
+        with chatbot_stage('context'):
+            context_data = get_context_data_for_question(question)
+    else:
+        context_data = {'outils': tool_calls, 'tokens': token_report}
+    path = 'fast_path' if fast_response else 'cache' if cached else 'llm' if openai_client else 'fallback'
+
+    def sse_event(payload):
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def generate():
+        # Le flux est produit après le retour de la vue : rattacher la trace au thread
+        _current_trace.value = trace
+        try:
+            if cached:
+                result['response'] = cached['response']
+                result['conversation'] = True
+                yield sse_event({'type': 'token', 'content': result['response']})
+            elif openai_client:
+                chunks = []
+                for token in stream_ai_response(question, user_id, tool_calls, token_report):
+                    chunks.append(token)
+                    yield sse_event({'type': 'token', 'content': token})
+                with chatbot_stage('formatting'):
+                    result['response'] = format_ai_response(''.join(chunks).strip(), question)
+                result['conversation'] = True
+                if use_answer_cache:
+                    store_cached_answer(question, result['response'], context_data, tool_calls)
+            else:
+                print("⚠️ OpenAI non configuré, fallback vers fonctions spécifiques")
+                result['response'] = get_specific_response(question)
+                yield sse_event({'type': 'token', 'content': result['response']})
+            result['response_time_ms'] = trace_elapsed_ms(trace)
+            yield sse_event({'type': 'done', 'response': result['response'], 'tokens': token_report, 'path': path})
+        except Exception as e:
+            print(f"❌ Erreur chatbot (streaming): {e}")
+            yield sse_event({
+                'type': 'error',
+                'message': CHATBOT_ERROR_MESSAGE
+            })
+
+    def persist():
+        if holds_llm_slot:
+            release_llm_slot()
+        # Flux terminé : sauvegarde hors du temps de réponse perçu
+        if 'response' not in result:
+            return
+        _current_trace.value = trace
+        response_time_ms = result.get('response_time_ms', trace_elapsed_ms(trace))
+        with chatbot_stage('persistence'):
+            if result.get('conversation'):
+                save_conversation_exchange(user_id, question, result['response'])
+            save_ai_interaction(user_id, question, result['response'], context_data, response_time_ms, trace_summary(trace))
+        finish_chatbot_trace(trace, path, response_time_ms, token_report)
+        print("🎉 Interaction (streaming) sauvegardée!")
+
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(persist)
+    return response
+
+def build_chatbot_messages(question, user_id, report=None):
+    """Construire les messages envoyés à OpenAI (prompt système, historique et question)
+    dans le budget CHATBOT_PROMPT_TOKEN_BUDGET ; les comptes de tokens sont ajoutés à report"""
+    use_tools = CHATBOT_CONTEXT_MODE != 'snapshot'
+    if report is None:
+        report = {}
+    # Le contexte est inséré dans le prompt une fois son budget connu
+    context_data = '{context_data}'
+
+    # Préparer le prompt pour OpenAI (IA omnisciente)
+    system_prompt = """Tu es l'assistant concierge AYORA, un chatbot OMNISCIENT pour un hôtel de luxe en Thaïlande.
+
+🎯 TON RÔLE : Tu as accès à TOUTES les données de l'hôtel et tu peux répondre à TOUTES les questions possibles.
+
+📊 TES DONNÉES : Tu as accès à :
+- Tous les clients (actuels, passés, futurs)
+- Toutes les réservations et chambres
+- Toutes les préférences et allergies
+- Tous les niveaux VIP et statuts
+- Tout le personnel et leur disponibilité
+- Toutes les alertes et problèmes
+- Toutes les statistiques et tendances
+- Tout le calendrier et planning
+
+🧠 TES CAPACITÉS :
+- Analysez les données pour répondre précisément
+- Faites des recommandations basées sur l'historique
+- Identifiez des patterns et tendances
+- Anticipez les besoins et problèmes
+- Donnez des insights business
+
+💬 STYLE DE RÉPONSE :
+- Professionnel mais chaleureux
+- Concis mais complet
 - Basé sur les données réelles
 - Avec des suggestions d'actions si pertinent
 - Toujours en français
@@ -1718,7 +3124,25 @@ def generate_ai_response(question, user_id):
 - Ajoute des puces (-) pour chaque item
 - Garde une structure claire et lisible
 - IMPORTANT: Utilise \n pour les retours à la ligne, pas d'espaces multiples"""
-        
+
+    if use_tools:
+        system_prompt += """
+
+🔧 OUTILS : Les données de l'hôtel ne sont pas dans le message. Appelle les outils
+pour obtenir UNIQUEMENT les données nécessaires à la question. N'appelle aucun outil
+pour une salutation ou une question qui ne porte pas sur les données de l'hôtel.
+Date du jour : """ + date.today().isoformat()
+
+        user_prompt = f"""Question du personnel: {question}
+
+IMPORTANT: 
+- Si c'est une salutation (bonjour, salut, etc.) → Réponds UNIQUEMENT par une salutation chaleureuse, sans appeler d'outil
+- Si c'est une question spécifique → Appelle les outils utiles puis réponds précisément
+- Pour les listes → Utilise des retours à la ligne (\n) et des puces (-)
+- FORMATAGE OBLIGATOIRE: Chaque élément de liste doit être sur une nouvelle ligne
+
+Réponds de manière claire, structurée et utile. Si tu n'as pas assez d'informations, dis-le poliment."""
+    else:
         user_prompt = f"""Question du personnel: {question}
 
 IMPORTANT: 
@@ -1732,40 +3156,102 @@ Données contextuelles disponibles (utilise-les SEULEMENT si nécessaire):
 
 Réponds de manière claire, structurée et utile. Si tu n'as pas assez d'informations, dis-le poliment."""
 
+    # Budget restant après les parties fixes (prompt système et consignes) :
+    # une part pour l'historique, le reste pour le contexte (ou les résultats d'outils)
+    fixed_tokens = count_tokens(system_prompt) + count_tokens(user_prompt) + 8
+    available = max(CHATBOT_PROMPT_TOKEN_BUDGET - fixed_tokens, 200)
+    history_budget = int(available * CHATBOT_HISTORY_TOKEN_SHARE)
+    context_budget = available - history_budget
+    report['context_budget'] = context_budget
+
+    # Contexte des données Supabase (comme _getHotelContext() dans mobile) :
+    # snapshot partagé, classé selon la question et tronqué au budget
+    context_data = ''
+    if not use_tools:
+        try:
+            with chatbot_stage('context'):
+                snapshot = get_hotel_context_snapshot()
+            categories = dict(snapshot['categories'])
+            # Préférences : uniquement les clients correspondant à la question (index BM25)
+            try:
+                matches = search_preferences(question, 15)
+            except Exception as e:
+                print(f"❌ Erreur recherche préférences: {e}")
+                matches = []
+            if matches:
+                categories = dict({'preferences_pertinentes': format_preference_results(matches)}, **categories)
+                categories.pop('preferences_alimentaires', None)
+            context_data = build_context_prompt(categories, question, context_budget)
+        except Exception as e:
+            print(f"❌ Erreur récupération contexte: {e}")
+            context_data = "Données non disponibles"
+        user_prompt = user_prompt.replace('{context_data}', context_data, 1)
+
+    # Construire l'historique des messages avec le contexte
+    messages = [
+        {"role": "system", "content": system_prompt}
+    ]
+    
+    # Ajouter l'historique des conversations précédentes (anciens échanges résumés)
+    with chatbot_stage('history'):
+        conversation_history = compact_history(get_conversation_history(user_id), history_budget)
+    if conversation_history:
+        messages.extend(conversation_history)
+        print(f"📚 Ajout de {len(conversation_history)} messages d'historique")
+    
+    # Ajouter la question actuelle
+    messages.append({"role": "user", "content": user_prompt})
+
+    report['context_tokens'] = count_tokens(context_data)
+    report['history_tokens'] = count_message_tokens(conversation_history)
+    report['prompt_tokens'] = count_message_tokens(messages)
+    print(f"🧮 Prompt: {report['prompt_tokens']} tokens (contexte {report['context_tokens']}, "
+          f"historique {report['history_tokens']}, budget {CHATBOT_PROMPT_TOKEN_BUDGET})")
+    return messages
+
+def generate_ai_response(question, user_id, tool_calls=None, report=None):
+    """Générer une réponse AI basée sur la question et les données Supabase avec OpenAI GPT-3.5
+    - Reproduction exacte du comportement mobile AIConciergeService
+
+    En mode 'tools', les données sont obtenues par function calling et chaque
+    appel d'outil est ajouté à la liste tool_calls (journalisation). Les comptes
+    de tokens (prompt estimé, usage OpenAI) sont ajoutés au dict report.
+    """
+    
+    try:
+        if tool_calls is None:
+            tool_calls = []
+        if report is None:
+            report = {}
+
         # Appeler OpenAI GPT-3.5 (API v1.0.0+)
         if openai_client:
             print(f"🚀 Appel OpenAI pour la question: '{question}'")
+            messages = build_chatbot_messages(question, user_id, report)
             
-            # Construire l'historique des messages avec le contexte
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-            
-            # Ajouter l'historique des conversations précédentes
-            conversation_history = get_conversation_history(user_id)
-            if conversation_history:
-                messages.extend(conversation_history)
-                print(f"📚 Ajout de {len(conversation_history)} messages d'historique")
-            
-            # Ajouter la question actuelle
-            messages.append({"role": "user", "content": user_prompt})
-            
-            response = openai_client.chat.completions.create(
-                model=openai_model,
-                messages=messages,
-                max_tokens=1000,
-                temperature=0.7
-            )
+            if CHATBOT_CONTEXT_MODE != 'snapshot':
+                message = run_chatbot_tool_loop(messages, tool_calls, report)
+            else:
+                with chatbot_stage('openai'), observe_openai_call('chat'):
+                    completion = openai_client.chat.completions.create(
+                        model=openai_model,
+                        messages=messages,
+                        max_tokens=1000,
+                        temperature=0.7
+                    )
+                record_openai_usage(report, completion.usage)
+                message = completion.choices[0].message
             
-            ai_response = response.choices[0].message.content.strip()
+            ai_response = (message.content or '').strip()
             print(f"✅ Réponse OpenAI reçue: {len(ai_response)} caractères")
             
             # Améliorer le formatage de la réponse
-            formatted_response = format_ai_response(ai_response, question)
+            with chatbot_stage('formatting'):
+                formatted_response = format_ai_response(ai_response, question)
             
             # Sauvegarder la conversation dans l'historique
-            save_conversation_message(user_id, "user", question)
-            save_conversation_message(user_id, "assistant", formatted_response)
+            with chatbot_stage('persistence'):
+                save_conversation_exchange(user_id, question, formatted_response)
             
             return formatted_response
         else:
@@ -1776,83 +3262,766 @@ Réponds de manière claire, structurée et utile. Si tu n'as pas assez d'inform
     except Exception as e:
         print(f"❌ Erreur OpenAI: {e}")
         # En cas d'erreur, donner une réponse intelligente au lieu de bloquer
-        return f"Je suis désolé, j'ai rencontré une erreur technique. Pouvez-vous reformuler votre question ? ({str(e)[:100]}...)"
+        return f"{CHATBOT_ERROR_MESSAGE} ({str(e)[:100]}...)"
 
-def get_context_data_for_question(question):
-    """Récupérer TOUTES les données contextuelles pour l'IA omnisciente"""
+def save_conversation_exchange(user_id, question, response):
+    """Sauvegarder la question et la réponse dans l'historique de conversation"""
+    save_conversation_message(user_id, "user", question)
+    save_conversation_message(user_id, "assistant", response)
+
+def record_openai_usage(report, usage):
+    """Cumuler l'usage de tokens retourné par OpenAI dans le rapport de la requête"""
+    if usage is None:
+        return
+    report['openai_prompt_tokens'] = report.get('openai_prompt_tokens', 0) + (usage.prompt_tokens or 0)
+    report['openai_completion_tokens'] = report.get('openai_completion_tokens', 0) + (usage.completion_tokens or 0)
+    count_openai_tokens(usage)
+
+def append_tool_results(messages, calls, tool_calls, report):
+    """Exécuter les appels d'outils du modèle et ajouter leurs résultats aux messages
+
+    calls : liste de dicts {'id', 'name', 'arguments'} (réponse complète ou flux reconstitué).
+    Les résultats partagent le budget de contexte du prompt et sont tronqués au besoin.
+    """
+    messages.append({
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": call['id'],
+                "type": "function",
+                "function": {"name": call['name'], "arguments": call['arguments']}
+            }
+            for call in calls
+        ]
+    })
+    for call in calls:
+        with chatbot_stage('tools'):
+            result = execute_chatbot_tool(call['name'], call['arguments'])
+        tool_calls.append({
+            'outil': call['name'],
+            'arguments': call['arguments'],
+            'taille': len(result),
+            'empreinte': content_hash(result)
+        })
+        remaining = report.get('context_budget', CHATBOT_PROMPT_TOKEN_BUDGET) - report.get('tool_tokens', 0)
+        content = truncate_to_tokens(result, max(remaining, 50))
+        report['tool_tokens'] = report.get('tool_tokens', 0) + count_tokens(content)
+        messages.append({"role": "tool", "tool_call_id": call['id'], "content": content})
+
+def run_chatbot_tool_loop(messages, tool_calls, report):
+    """Appeler OpenAI en exécutant les outils demandés jusqu'à obtenir la réponse finale"""
+    for round_index in range(CHATBOT_MAX_TOOL_ROUNDS + 1):
+        # Nombre maximal d'allers-retours atteint : forcer une réponse sans nouvel outil
+        with chatbot_stage('openai'), observe_openai_call('tools'):
+            completion = openai_client.chat.completions.create(
+                model=openai_model,
+                messages=messages,
+                tools=CHATBOT_TOOLS,
+                tool_choice="auto" if round_index < CHATBOT_MAX_TOOL_ROUNDS else "none",
+                max_tokens=1000,
+                temperature=0.7
+            )
+        record_openai_usage(report, completion.usage)
+        message = completion.choices[0].message
+
+        if not message.tool_calls:
+            return message
+
+        append_tool_results(messages, [
+            {'id': call.id, 'name': call.function.name, 'arguments': call.function.arguments}
+            for call in message.tool_calls
+        ], tool_calls, report)
+
+    return message
+
+def stream_ai_response(question, user_id, tool_calls=None, report=None):
+    """Générer la réponse AI morceau par morceau (stream=True)
+
+    En mode 'tools', les appels d'outils sont reconstitués à partir du flux,
+    exécutés, puis un nouveau flux est ouvert pour la suite de la réponse.
+    """
+    if tool_calls is None:
+        tool_calls = []
+    if report is None:
+        report = {}
+    use_tools = CHATBOT_CONTEXT_MODE != 'snapshot'
+    messages = build_chatbot_messages(question, user_id, report)
+
+    for round_index in range(CHATBOT_MAX_TOOL_ROUNDS + 1):
+        params = {
+            'model': openai_model,
+            'messages': messages,
+            'max_tokens': 1000,
+            'temperature': 0.7,
+            'stream': True,
+            'stream_options': {'include_usage': True}
+        }
+        if use_tools:
+            params['tools'] = CHATBOT_TOOLS
+            params['tool_choice'] = "auto" if round_index < CHATBOT_MAX_TOOL_ROUNDS else "none"
+
+        pending_calls = {}
+        stream_started = time.perf_counter()
+        trace = get_current_trace()
+        with observe_openai_call('stream'):
+            for chunk in openai_client.chat.completions.create(**params):
+                # Le dernier morceau porte l'usage de tokens (sans choices)
+                record_openai_usage(report, getattr(chunk, 'usage', None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    if trace is not None and 'openai_first_token' not in trace['stages']:
+                        trace['stages']['openai_first_token'] = round((time.perf_counter() - trace['started']) * 1000, 1)
+                    yield delta.content
+                # Les appels d'outils arrivent par fragments indexés
+                for call in delta.tool_calls or []:
+                    entry = pending_calls.setdefault(call.index, {'id': '', 'name': '', 'arguments': ''})
+                    if call.id:
+                        entry['id'] = call.id
+                    if call.function and call.function.name:
+                        entry['name'] += call.function.name
+                    if call.function and call.function.arguments:
+                        entry['arguments'] += call.function.arguments
+
+        if trace is not None:
+            elapsed = (time.perf_counter() - stream_started) * 1000
+            trace['stages']['openai'] = round(trace['stages'].get('openai', 0) + elapsed, 1)
+
+        if not pending_calls:
+            return
+
+        append_tool_results(messages, [pending_calls[index] for index in sorted(pending_calls)], tool_calls, report)
+
+# ===== CONTEXTE HÔTEL PARTAGÉ (SNAPSHOT) =====
+# Le contexte ne dépend pas de la question posée : il est construit une seule fois,
+# partagé par tous les utilisateurs et invalidé comme les autres entrées du cache
+# lors des écritures (clé 'hotel_context'). Le TTL couvre les modifications faites
+# hors de l'application (synchronisation Opera, application mobile).
+CHATBOT_CONTEXT_TTL = int(os.getenv('CHATBOT_CONTEXT_TTL', 300))  # en secondes
+CHATBOT_CONTEXT_RETRY_TTL = 30  # snapshot incomplet : on retente plus tôt
+CHATBOT_CONTEXT_WORKERS = int(os.getenv('CHATBOT_CONTEXT_WORKERS', 8))
+CHATBOT_FETCH_TIMEOUT = float(os.getenv('CHATBOT_FETCH_TIMEOUT', 5))  # en secondes, par catégorie
+CONTEXT_UNAVAILABLE = "Données indisponibles pour le moment"
+_hotel_context_lock = threading.Lock()
+# Pool borné partagé : les catégories sont récupérées en parallèle
+_context_executor = ThreadPoolExecutor(max_workers=CHATBOT_CONTEXT_WORKERS, thread_name_prefix='context')
+
+def fetch_context_categories(fetchers):
+    """Exécuter les récupérations de catégories en parallèle avec un délai par catégorie
+
+    Une catégorie trop lente ou en erreur est marquée indisponible au lieu de
+    bloquer tout le contexte. Retourne (contexte, liste des catégories indisponibles).
+    """
+    started = {}
+    durations = {}
+    captures = _query_captures.get()  # appels des catégories comptés pour le thread appelant
+
+    def run(name, fetch):
+        token = _query_captures.set(captures)
+        try:
+            started[name] = time.time()
+            result = fetch()
+            durations[name] = round((time.time() - started[name]) * 1000, 1)
+            return result
+        finally:
+            _query_captures.reset(token)
+
+    pending = {_context_executor.submit(run, name, fetch): name for name, fetch in fetchers}
     context = {}
-    
-    try:
-        print(f"🔍 Analyse de la question: '{question}'")
-        question_lower = question.lower()
-        
-        # Récupérer TOUTES les données disponibles (pas seulement selon les mots-clés)
-        print("📊 Récupération de toutes les données hôtel...")
-        
+    unavailable = []
+    # Garde-fou global si le pool est saturé par des requêtes bloquées
+    hard_deadline = time.time() + CHATBOT_FETCH_TIMEOUT * 3
+
+    while pending:
+        now = time.time()
+        deadlines = [started[name] + CHATBOT_FETCH_TIMEOUT for name in pending.values() if name in started]
+        next_deadline = min(deadlines + [hard_deadline])
+        done, _ = wait(list(pending), timeout=max(0, next_deadline - now), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name = pending.pop(future)
+            try:
+                context[name] = future.result()
+            except Exception as e:
+                print(f"❌ Erreur catégorie {name}: {e}")
+                context[name] = CONTEXT_UNAVAILABLE
+                unavailable.append(name)
+
+        now = time.time()
+        for future, name in list(pending.items()):
+            timed_out = name in started and now - started[name] >= CHATBOT_FETCH_TIMEOUT
+            if timed_out or now >= hard_deadline:
+                # Le thread termine en arrière-plan, son résultat est ignoré
+                future.cancel()
+                del pending[future]
+                print(f"⏱️ Catégorie {name} indisponible (délai de {CHATBOT_FETCH_TIMEOUT}s dépassé)")
+                context[name] = CONTEXT_UNAVAILABLE
+                unavailable.append(name)
+
+    # Durée par catégorie (snapshot construit pendant la question en cours)
+    record_trace_detail('categories_ms', durations)
+
+    # Conserver l'ordre de déclaration des catégories
+    return {name: context[name] for name, _ in fetchers}, unavailable
+
+def build_hotel_context_snapshot():
+    """Construire le snapshot du contexte hôtel (toutes les catégories de données)"""
+    print("📊 Construction du snapshot du contexte hôtel...")
+    started = time.time()
+
+    fetchers = [
         # 1. CLIENTS ET RÉSERVATIONS (données principales)
-        context['clients_actuels'] = get_current_clients_info_raw()
-        context['clients_tous'] = get_all_clients_info_raw()
-        context['reservations_completes'] = get_all_reservations_info_raw()
-        context['chambres_etat'] = get_rooms_status_raw()
-        
+        ('clients_actuels', get_current_clients_info_raw),
+        ('clients_tous', get_all_clients_info_raw),
+        ('reservations_completes', get_all_reservations_info_raw),
+        ('chambres_etat', get_rooms_status_raw),
         # 2. PRÉFÉRENCES ET BESOINS SPÉCIAUX
-        context['preferences_alimentaires'] = get_allergies_info_raw()
-        context['preferences_chambres'] = get_room_preferences_raw()
-        context['demandes_speciales'] = get_special_requests_raw()
-        
+        ('preferences_alimentaires', get_allergies_info_raw),
+        ('preferences_chambres', get_room_preferences_raw),
+        ('demandes_speciales', get_special_requests_raw),
         # 3. VIP ET CLIENTÈLE
-        context['clients_vip'] = get_vip_info_raw()
-        context['statistiques_vip'] = get_vip_statistics_raw()
-        
+        ('clients_vip', get_vip_info_raw),
+        ('statistiques_vip', get_vip_statistics_raw),
         # 4. ALERTES ET PROBLÈMES
-        context['alertes'] = get_alerts_info_raw()
-        context['problemes_actuels'] = get_current_issues_raw()
-        
+        ('alertes', get_alerts_info_raw),
+        ('problemes_actuels', get_current_issues_raw),
         # 5. PERSONNEL ET ÉQUIPES
-        context['personnel'] = get_staff_info_raw()
-        context['disponibilite_staff'] = get_staff_availability_raw()
-        
+        ('personnel', get_staff_info_raw),
+        ('disponibilite_staff', get_staff_availability_raw),
         # 6. STATISTIQUES ET MÉTRIQUES
-        context['statistiques_occupation'] = get_occupancy_statistics_raw()
-        context['tendances_reservations'] = get_booking_trends_raw()
-        
+        ('statistiques_occupation', get_occupancy_statistics_raw),
+        ('tendances_reservations', get_booking_trends_raw),
         # 7. CALENDRIER ET PLANNING
-        context['calendrier_reservations'] = get_reservation_calendar_raw()
-        context['evenements_speciaux'] = get_special_events_raw()
-        
-        print(f"✅ {len(context)} catégories de données récupérées")
-        return format_context_for_openai(context)
-        
+        ('calendrier_reservations', get_reservation_calendar_raw),
+        ('evenements_speciaux', get_special_events_raw),
+    ]
+
+    context, unavailable = fetch_context_categories(fetchers)
+
+    formatted = format_context_for_openai(context)
+    snapshot = {
+        # La version est l'empreinte du contenu : elle ne change que si les données changent
+        'version': hashlib.sha256(formatted.encode('utf-8')).hexdigest()[:16],
+        'categories': context,
+        'formatted': formatted,
+        'unavailable': unavailable,
+        'built_at': datetime.now().isoformat()
+    }
+
+    print(f"✅ Snapshot {snapshot['version']} construit: {len(context)} catégories, "
+          f"{len(formatted)} caractères en {int((time.time() - started) * 1000)} ms")
+    return snapshot
+
+def get_hotel_context_snapshot():
+    """Récupérer le snapshot partagé du contexte hôtel (construit au plus une fois à la fois)"""
+    # Le verrou évite que plusieurs questions simultanées reconstruisent le même snapshot
+    with _hotel_context_lock:
+        timeout = CHATBOT_CONTEXT_TTL
+        cached = _cache.get('hotel_context')
+        if cached and cached[0].get('unavailable'):
+            timeout = CHATBOT_CONTEXT_RETRY_TTL
+        return get_cached_data('hotel_context', build_hotel_context_snapshot, timeout)
+
+def get_context_data_for_question(question):
+    """Récupérer les données contextuelles pour l'IA omnisciente (snapshot partagé)"""
+    try:
+        return get_hotel_context_snapshot()['formatted']
     except Exception as e:
         print(f"❌ Erreur récupération contexte: {e}")
         return "Données non disponibles"
 
+# ===== OUTILS DU CHATBOT (FUNCTION CALLING) =====
+# En mode 'tools', le contexte n'est plus collé dans le prompt : le modèle appelle
+# uniquement les outils utiles à la question (une salutation ne coûte aucune requête).
+# Le mode 'snapshot' conserve l'ancien comportement (contexte complet dans le prompt).
+CHATBOT_CONTEXT_MODE = os.getenv('CHATBOT_CONTEXT_MODE', 'tools').lower()
+CHATBOT_MAX_TOOL_ROUNDS = 3
+
+CHATBOT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_current_clients",
+            "description": "Clients actuellement à l'hôtel (séjours en cours) : chambre, catégorie, occupants, VIP et préférences.",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_allergies",
+            "description": "Clients ayant des allergies ou des préférences alimentaires.",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_vip_clients",
+            "description": "Clients VIP avec leur niveau et leur nombre de séjours.",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_reservations_overview",
+            "description": "Vue d'ensemble des réservations actives (en cours, arrivées du jour, futures) et réservations VIP.",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_alerts",
+            "description": "Alertes non lues (type, priorité, chambre, message).",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_staff",
+            "description": "Personnel par département avec poste et disponibilité.",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_guest_preferences",
+            "description": "Rechercher les clients dont les allergies, préférences (alimentaires, chambre) ou demandes spéciales correspondent à des mots-clés (ex: 'crustacés', 'late checkout', 'oreiller'). Préférer cet outil à get_allergies pour une question ciblée.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Mots-clés recherchés"}
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_reservations_on_date",
+            "description": "Arrivées, départs et clients présents à une date donnée.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string", "description": "Date au format YYYY-MM-DD"}
+                },
+                "required": ["date"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_room_occupant",
+            "description": "Occupant(s) actuel(s) d'une chambre donnée.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "room_no": {"type": "string", "description": "Numéro de chambre"}
+                },
+                "required": ["room_no"]
+            }
+        }
+    }
+]
+
+def get_reservations_on_date_raw(day_value):
+    """Récupérer les arrivées, départs et clients présents à une date pour OpenAI (tableau compact)"""
+    day = parse_date(day_value)
+    if not day:
+        return f"Date invalide: {day_value} (format attendu YYYY-MM-DD)"
+    details = fetch_calendar_day_details(day)
+    rows = [{'mouvement': 'arrivee', 'client': g['client_name'], 'chambre': g['room_no']} for g in details['arrivals']]
+    rows += [{'mouvement': 'depart', 'client': g['client_name'], 'chambre': g['room_no']} for g in details['departures']]
+    summary = f"Date: {details['date']} | Présents: {len(details['guests'])}"
+    if not rows:
+        return summary + " | Aucune arrivée ni aucun départ"
+    return summary + "\n" + compact_table(rows, ['mouvement', 'client', 'chambre'])
+
+
+def get_room_occupant_raw(room_no):
+    """Récupérer le ou les occupants actuels d'une chambre pour OpenAI (tableau compact)"""
+    try:
+        result = supabase.table('reservations').select(
+            'resv_name_id, room_no, arrival, departure, adults, children, vip, client_principal_id, client_secondaire_id'
+        ).eq('room_no', str(room_no)).eq('statut', 'en_cours').execute()
+
+        if not result.data:
+            return f"Aucun client actuellement dans la chambre {room_no}"
+
+        client_ids = set()
+        for res in result.data:
+            for key in ('client_principal_id', 'client_secondaire_id'):
+                if res.get(key):
+                    client_ids.add(res[key])
+
+        clients_data = {}
+        if client_ids:
+            clients_result = supabase.table('clients').select(
+                'id, guest_name, guest_title, vip, preferences_alimentaires, preferences_chambre'
+            ).in_('id', list(client_ids)).execute()
+            clients_data = {client['id']: client for client in clients_result.data}
+
+        rows = []
+        for res in result.data:
+            room_clients = [clients_data[client_id] for client_id in (res.get('client_principal_id'), res.get('client_secondaire_id'))
+                            if client_id in clients_data]
+            for client in room_clients or [{}]:
+                rows.append({
+                    'chambre': res.get('room_no'),
+                    'arrivee': res.get('arrival'),
+                    'depart': res.get('departure'),
+                    'adultes': res.get('adults'),
+                    'enfants': res.get('children'),
+                    'client': client.get('guest_name'),
+                    'titre': client.get('guest_title'),
+                    'vip': client.get('vip') or res.get('vip'),
+                    'pref_alimentaires': client.get('preferences_alimentaires'),
+                    'pref_chambre': client.get('preferences_chambre')
+                })
+
+        return compact_table(rows, [
+            'chambre', 'arrivee', 'depart', 'adultes', 'enfants', 'client', 'titre', 'vip', 'pref_alimentaires', 'pref_chambre'
+        ])
+
+    except Exception as e:
+        print(f"Erreur get_room_occupant_raw: {e}")
+        raise
+
+
+def search_guest_preferences_raw(query, limit=15):
+    """Rechercher les préférences correspondant à une requête pour OpenAI (tableau compact)"""
+    try:
+        results = search_preferences(query or '', limit)
+        if not results:
+            return f"Aucune préférence ni demande spéciale ne correspond à: {query}"
+        return format_preference_results(results)
+    except Exception as e:
+        print(f"Erreur search_guest_preferences_raw: {e}")
+        raise
+
+CHATBOT_TOOL_FUNCTIONS = {
+    'get_current_clients': lambda args: get_current_clients_info_raw(),
+    'get_allergies': lambda args: get_allergies_info_raw(),
+    'get_vip_clients': lambda args: get_vip_info_raw(),
+    'get_reservations_overview': lambda args: get_reservations_info_raw(),
+    'get_alerts': lambda args: get_alerts_info_raw(),
+    'get_staff': lambda args: get_staff_info_raw(),
+    'search_guest_preferences': lambda args: search_guest_preferences_raw(args.get('query')),
+    'get_reservations_on_date': lambda args: get_reservations_on_date_raw(args.get('date')),
+    'get_room_occupant': lambda args: get_room_occupant_raw(args.get('room_no')),
+}
+
+def execute_chatbot_tool(name, arguments):
+    """Exécuter un outil demandé par le modèle (résultat mis en cache comme le contexte)
+
+    Une erreur de lecture n'est pas mise en cache : le modèle reçoit CONTEXT_UNAVAILABLE
+    et l'outil est réexécuté à la question suivante.
+    """
+    if name not in CHATBOT_TOOL_FUNCTIONS:
+        return f"Outil inconnu: {name}"
+
+    try:
+        args = json.loads(arguments) if arguments else {}
+    except (ValueError, TypeError):
+        return f"Arguments invalides pour {name}"
+
+    # Préfixe 'hotel_context' : invalidé avec le snapshot lors des écritures
+    cache_key = f"hotel_context_tool_{name}_{json.dumps(args, sort_keys=True)}"
+
+    def fetch_tool_result():
+        print(f"🔧 Outil exécuté: {name}({args})")
+        started = time.perf_counter()
+        result = CHATBOT_TOOL_FUNCTIONS[name](args)
+        record_trace_detail('tools_ms', {name: round((time.perf_counter() - started) * 1000, 1)})
+        return result
+
+    try:
+        return get_cached_data(cache_key, fetch_tool_result, CHATBOT_CONTEXT_TTL)
+    except Exception as e:
+        print(f"❌ Erreur outil {name}: {e}")
+        return CONTEXT_UNAVAILABLE
+
+# ===== CACHE DES RÉPONSES DU CHATBOT =====
+# Une réponse est réutilisée pour la même question (normalisée) tant que les
+# données dont elle dépend n'ont pas changé : à chaque lecture, les empreintes
+# des résultats d'outils (ou du snapshot) sont recalculées à partir du cache du
+# contexte, donc sans requête tant que celui-ci est valide.
+# Une relance (« et demain ? », « et pour lui ? ») dépend des échanges précédents :
+# ces questions ne lisent ni n'alimentent le cache, les autres l'utilisent même
+# quand l'utilisateur a déjà un historique.
+CHATBOT_ANSWER_CACHE_TTL = int(os.getenv('CHATBOT_ANSWER_CACHE_TTL', 3600))  # en secondes
+CHATBOT_ANSWER_CACHE_MAX = 500
+CHATBOT_ERROR_MESSAGE = "Je suis désolé, j'ai rencontré une erreur technique. Pouvez-vous reformuler votre question ?"
+
+def content_hash(value):
+    """Empreinte courte d'un contenu (contexte, résultat d'outil)"""
+    return hashlib.sha256(str(value).encode('utf-8')).hexdigest()[:16]
+
+# Marqueurs de relance (texte normalisé, sans accents)
+FOLLOW_UP_PREFIXES = ('et ', 'and ', 'aussi ', 'also ', 'puis ', 'ensuite ', 'what about ', 'how about ',
+                      'pareil', 'idem', 'meme chose', 'same ')
+FOLLOW_UP_WORDS = {'lui', 'elle', 'eux', 'elles', 'leur', 'leurs', 'celui', 'celle', 'ceux', 'celles',
+                   'dernier', 'derniere', 'precedent', 'precedente', 'him', 'her', 'them', 'they', 'their',
+                   'he', 'she', 'those'}
+
+def is_follow_up_question(question):
+    """Relance qui s'appuie sur les échanges précédents (connecteur, pronom, question elliptique)"""
+    normalized = normalize_question(question)
+    words = normalized.split()
+    return (len(words) <= 2 or f"{normalized} ".startswith(FOLLOW_UP_PREFIXES)
+            or any(word in FOLLOW_UP_WORDS for word in words))
+
+def answer_cache_allowed(question):
+    """Le cache de réponses s'applique à toute question qui n'est pas une relance"""
+    return not is_follow_up_question(question)
+
+def normalize_question(question):
+    """Normaliser une question (casse, accents, ponctuation, espaces)"""
+    text = unicodedata.normalize('NFKD', question.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+def get_answer_cache_key(question):
+    """Clé du cache de réponses (le jour en fait partie : 'aujourd'hui' change de sens)"""
+    normalized = normalize_question(question)
+    return f"chatbot_answer_{date.today().isoformat()}_{CHATBOT_CONTEXT_MODE}_{content_hash(normalized)}"
+
+def get_cached_answer(question):
+    """Récupérer une réponse en cache si les données utilisées n'ont pas changé"""
+    key = get_answer_cache_key(question)
+    entry = _cache.get(key)
+    if not entry:
+        CACHE_REQUESTS.inc('chatbot_answer', 'miss')
+        return None
+
+    cached, timestamp = entry
+    if time.time() - timestamp >= CHATBOT_ANSWER_CACHE_TTL:
+        evict_cache_entry(key, 'expired')
+        CACHE_REQUESTS.inc('chatbot_answer', 'miss')
+        return None
+
+    for dependency, expected in cached['deps'].items():
+        if dependency == 'snapshot':
+            current = content_hash(get_context_data_for_question(question))
+        else:
+            name, arguments = dependency.split(':', 1)
+            current = content_hash(execute_chatbot_tool(name, arguments))
+        if current != expected:
+            print(f"♻️ Réponse en cache invalidée ({dependency} a changé)")
+            evict_cache_entry(key, 'invalidated')
+            CACHE_REQUESTS.inc('chatbot_answer', 'miss')
+            return None
+
+    CACHE_REQUESTS.inc('chatbot_answer', 'hit')
+    return cached
+
+def store_cached_answer(question, response, context_data, tool_calls):
+    """Mettre en cache une réponse avec les empreintes des données utilisées"""
+    if not response or response.startswith(CHATBOT_ERROR_MESSAGE):
+        return
+
+    if CHATBOT_CONTEXT_MODE == 'snapshot':
+        if CONTEXT_UNAVAILABLE in (context_data or ''):
+            return  # réponse construite sans certaines données : ne pas la réutiliser
+        deps = {'snapshot': content_hash(context_data)}
+    else:
+        if any(call['empreinte'] == content_hash(CONTEXT_UNAVAILABLE) for call in tool_calls):
+            return
+        deps = {f"{call['outil']}:{call['arguments']}": call['empreinte'] for call in tool_calls}
+
+    # Borner la taille du cache : retirer les réponses les plus anciennes
+    answer_keys = [key for key in _cache if key.startswith('chatbot_answer_')]
+    if len(answer_keys) >= CHATBOT_ANSWER_CACHE_MAX:
+        for key in sorted(answer_keys, key=lambda k: _cache[k][1])[:len(answer_keys) - CHATBOT_ANSWER_CACHE_MAX + 1]:
+            evict_cache_entry(key, 'size')
+
+    _cache[get_answer_cache_key(question)] = ({'response': response, 'deps': deps}, time.time())
+
+# ===== BUDGET DE TOKENS DU PROMPT =====
+# Le prompt (contexte + historique) est construit dans un budget de tokens :
+# le contexte est sérialisé en tableaux compacts, les catégories sont classées
+# selon la question puis tronquées, et les anciens échanges sont résumés.
+CHATBOT_PROMPT_TOKEN_BUDGET = int(os.getenv('CHATBOT_PROMPT_TOKEN_BUDGET', 3000))
+CHATBOT_HISTORY_TOKEN_SHARE = 0.25  # part du budget réservée à l'historique
+CHATBOT_RECENT_MESSAGES = 4  # derniers messages conservés intégralement
+
+CONTEXT_CATEGORY_LABELS = {
+    'clients_actuels': 'CLIENTS ACTUELS',
+    'clients_tous': 'CLIENTS (TOUS)',
+    'reservations_completes': 'RÉSERVATIONS (TOUTES)',
+    'chambres_etat': 'ÉTAT DES CHAMBRES',
+    'preferences_alimentaires': 'PRÉFÉRENCES ALIMENTAIRES',
+    'preferences_pertinentes': 'PRÉFÉRENCES CORRESPONDANT À LA QUESTION',
+    'preferences_chambres': 'PRÉFÉRENCES CHAMBRES',
+    'demandes_speciales': 'DEMANDES SPÉCIALES',
+    'clients_vip': 'CLIENTS VIP',
+    'statistiques_vip': 'STATISTIQUES VIP',
+    'alertes': 'ALERTES',
+    'problemes_actuels': 'PROBLÈMES ACTUELS',
+    'personnel': 'PERSONNEL',
+    'disponibilite_staff': 'DISPONIBILITÉ DU PERSONNEL',
+    'statistiques_occupation': 'STATISTIQUES OCCUPATION',
+    'tendances_reservations': 'TENDANCES',
+    'calendrier_reservations': 'CALENDRIER',
+    'evenements_speciaux': 'ÉVÉNEMENTS',
+}
+
+# Mots-clés (normalisés, sans accents) utilisés pour classer les catégories
+CONTEXT_CATEGORY_KEYWORDS = {
+    'clients_actuels': ['client', 'qui', 'chambre', 'present', 'sejour', 'hotel', 'occupe'],
+    'preferences_pertinentes': ['allerg', 'aliment', 'regime', 'preference', 'demande', 'intolerance'],
+    'preferences_alimentaires': ['allerg', 'aliment', 'regime', 'intolerance', 'repas', 'vegan', 'vegetarien', 'gluten'],
+    'preferences_chambres': ['preference', 'oreiller', 'lit', 'etage', 'vue'],
+    'demandes_speciales': ['demande', 'special', 'late', 'checkout', 'transfert'],
+    'clients_vip': ['vip', 'important', 'niveau', 'fidele'],
+    'statistiques_vip': ['vip', 'statistique'],
+    'alertes': ['alerte', 'urgence', 'probleme', 'attention'],
+    'problemes_actuels': ['probleme', 'incident'],
+    'personnel': ['staff', 'personnel', 'employe', 'equipe', 'disponible'],
+    'disponibilite_staff': ['staff', 'disponible', 'equipe'],
+    'statistiques_occupation': ['occupation', 'taux', 'statistique'],
+    'tendances_reservations': ['tendance', 'evolution'],
+    'calendrier_reservations': ['calendrier', 'planning', 'date', 'arrivee', 'depart'],
+    'chambres_etat': ['chambre', 'libre', 'disponible'],
+    'reservations_completes': ['reservation', 'total'],
+}
+
+_token_encoder = None
+
+def count_tokens(text):
+    """Compter les tokens d'un texte (tiktoken si disponible, sinon estimation ~4 caractères/token)"""
+    global _token_encoder
+    if not text:
+        return 0
+    if tiktoken:
+        if _token_encoder is None:
+            try:
+                _token_encoder = tiktoken.encoding_for_model(openai_model)
+            except KeyError:
+                _token_encoder = tiktoken.get_encoding('cl100k_base')
+        return len(_token_encoder.encode(text))
+    return len(text) // 4 + 1
+
+def count_message_tokens(messages):
+    """Compter les tokens d'une liste de messages OpenAI (~4 tokens de structure par message)"""
+    return sum(count_tokens(message.get('content') or '') + 4 for message in messages)
+
+def compact_table(rows, columns):
+    """Sérialiser des lignes en tableau compact : une ligne d'en-tête puis une ligne par élément"""
+    def cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 'oui' if value else 'non'
+        return ' '.join(str(value).replace('|', '/').split())
+
+    lines = ['|'.join(columns)]
+    for row in rows:
+        lines.append('|'.join(cell(row.get(column)) for column in columns))
+    return '\n'.join(lines)
+
+def truncate_to_tokens(text, budget):
+    """Tronquer un texte ligne par ligne pour respecter un budget de tokens"""
+    if count_tokens(text) <= budget:
+        return text
+    kept = []
+    used = 0
+    lines = text.split('\n')
+    for line in lines:
+        line_tokens = count_tokens(line) + 1
+        if used + line_tokens > budget:
+            break
+        kept.append(line)
+        used += line_tokens
+    omitted = len(lines) - len(kept)
+    return '\n'.join(kept + [f"… ({omitted} ligne(s) omise(s))"])
+
+def rank_context_categories(categories, question):
+    """Classer les catégories selon leur pertinence pour la question (ordre d'origine à égalité)"""
+    normalized = normalize_question(question)
+    order = list(categories)
+
+    def score(name):
+        return sum(1 for keyword in CONTEXT_CATEGORY_KEYWORDS.get(name, []) if keyword in normalized)
+
+    return sorted(order, key=lambda name: (-score(name), order.index(name)))
+
+def build_context_prompt(categories, question, budget):
+    """Construire le contexte du prompt dans un budget de tokens (catégories classées puis tronquées)"""
+    sections = []
+    remaining = budget
+    for name in rank_context_categories(categories, question):
+        if remaining <= 20:
+            break
+        label = CONTEXT_CATEGORY_LABELS.get(name, name.upper())
+        content = truncate_to_tokens(str(categories[name]), remaining - count_tokens(label) - 2)
+        sections.append(f"{label}:\n{content}")
+        remaining -= count_tokens(sections[-1]) + 2
+    return '\n\n'.join(sections)
+
+def compact_history(history, budget):
+    """Réduire l'historique au budget : résumé des anciens échanges + derniers messages intacts"""
+    recent = list(history[-CHATBOT_RECENT_MESSAGES:])
+    older = history[:-CHATBOT_RECENT_MESSAGES]
+
+    summary_lines = []
+    for message in older:
+        prefix = 'Q' if message['role'] == 'user' else 'R'
+        content = ' '.join((message.get('content') or '').split())
+        summary_lines.append(f"- {prefix}: {content[:120]}{'…' if len(content) > 120 else ''}")
+
+    # Retirer d'abord les résumés les plus anciens, puis les messages récents les plus anciens
+    def assemble():
+        messages = []
+        if summary_lines:
+            messages.append({"role": "system", "content": "Résumé des échanges précédents:\n" + '\n'.join(summary_lines)})
+        return messages + recent
+
+    messages = assemble()
+    while count_message_tokens(messages) > budget and (summary_lines or recent):
+        if summary_lines:
+            summary_lines.pop(0)
+        else:
+            recent.pop(0)
+        messages = assemble()
+    return messages
+
+CONTEXT_CATEGORY_TITLES = {
+    'clients_actuels': "CLIENTS ACTUELS",
+    'preferences_alimentaires': "PRÉFÉRENCES ALIMENTAIRES",
+    'clients_vip': "CLIENTS VIP",
+    'reservations_completes': "RÉSERVATIONS",
+    'alertes': "ALERTES",
+    'personnel': "PERSONNEL",
+}
+
 def format_context_for_openai(context):
-    """Formater le contexte pour OpenAI"""
+    """Formater le contexte pour OpenAI
+
+    Toutes les catégories y figurent : la version du snapshot et l'empreinte des
+    réponses en cache (mode snapshot) sont calculées sur ce texte.
+    """
     formatted = ""
-    
-    if 'clients_actuels' in context:
-        formatted += f"CLIENTS ACTUELS:\n{context['clients_actuels']}\n\n"
-        
-    if 'preferences_alimentaires' in context:
-        formatted += f"PRÉFÉRENCES ALIMENTAIRES:\n{context['preferences_alimentaires']}\n\n"
-        
-    if 'clients_vip' in context:
-        formatted += f"CLIENTS VIP:\n{context['clients_vip']}\n\n"
-        
-    if 'reservations' in context:
-        formatted += f"RÉSERVATIONS:\n{context['reservations']}\n\n"
-        
-    if 'alertes' in context:
-        formatted += f"ALERTES:\n{context['alertes']}\n\n"
-        
-    if 'personnel' in context:
-        formatted += f"PERSONNEL:\n{context['personnel']}\n\n"
-    
+    for name, value in context.items():
+        title = CONTEXT_CATEGORY_TITLES.get(name, name.replace('_', ' ').upper())
+        formatted += f"{title}:\n{value}\n\n"
     return formatted
 
 
 
+def formatter_unavailable(subject):
+    """Message d'excuse quand un formateur n'a pas pu lire ses données (il renvoie alors None)"""
+    return f"Désolé, je ne peux pas récupérer les informations {subject} pour le moment."
+
 def get_specific_response(question):
     """Obtenir une réponse spécifique en utilisant les fonctions existantes (fallback intelligent)"""
     question_lower = question.lower()
@@ -1863,27 +4032,27 @@ def get_specific_response(question):
     
     # Questions sur les clients actuels
     if any(word in question_lower for word in ['qui', 'client', 'actuel', 'hotel', 'présent']):
-        return get_current_clients_info()
+        return get_current_clients_info() or formatter_unavailable('sur les clients actuels')
     
     # Questions sur les allergies
     elif any(word in question_lower for word in ['allergie', 'allergique', 'intolérance', 'préférence alimentaire']):
-        return get_allergies_info()
+        return get_allergies_info() or formatter_unavailable('sur les allergies')
     
     # Questions sur les VIP
     elif any(word in question_lower for word in ['vip', 'important', 'niveau']):
-        return get_vip_info()
+        return get_vip_info() or formatter_unavailable('VIP')
     
     # Questions sur les réservations
     elif any(word in question_lower for word in ['réservation', 'chambre', 'occupation', 'disponible']):
-        return get_reservations_info()
+        return get_reservations_info() or formatter_unavailable('sur les réservations')
     
     # Questions sur les alertes
     elif any(word in question_lower for word in ['alerte', 'urgence', 'problème', 'attention']):
-        return get_alerts_info()
+        return get_alerts_info() or formatter_unavailable('sur les alertes')
     
     # Questions sur le personnel
     elif any(word in question_lower for word in ['staff', 'personnel', 'employé', 'équipe']):
-        return get_staff_info()
+        return get_staff_info() or formatter_unavailable('sur le personnel')
     
     # Questions générales
     elif any(word in question_lower for word in ['aide', 'comment', 'quoi', 'quoi faire']):
@@ -1894,7 +4063,7 @@ def get_specific_response(question):
         return f"Je comprends votre question '{question}'. Laissez-moi analyser nos données pour vous donner la meilleure réponse possible. Pouvez-vous préciser ce que vous souhaitez savoir exactement ?"
 
 def get_current_clients_info_raw():
-    """Récupérer les données brutes sur les clients actuels pour OpenAI"""
+    """Récupérer les données brutes sur les clients actuels pour OpenAI (tableau compact)"""
     try:
         # Récupérer les réservations en cours
         result = supabase.table('reservations').select(
@@ -1922,41 +4091,34 @@ def get_current_clients_info_raw():
         if not clients_result.data:
             return "Aucune information client disponible"
         
-        # Retourner les données brutes structurées
-        data = {
-            'reservations_en_cours': len(result.data),
-            'chambres': []
-        }
+        clients_data = {client['id']: client for client in clients_result.data}
         
+        # Une ligne par client et par chambre
+        rows = []
         for res in result.data:
-            room_data = {
-                'chambre': res.get('room_no'),
-                'categorie': res.get('room_category_label'),
-                'adultes': res.get('adults'),
-                'enfants': res.get('children'),
-                'vip': res.get('vip'),
-                'clients': []
-            }
-            
-            # Trouver les clients de cette réservation
-            for client in clients_result.data:
-                if client['id'] in [res.get('client_principal_id'), res.get('client_secondaire_id')]:
-                    client_data = {
-                        'nom': client.get('guest_name'),
-                        'titre': client.get('guest_title'),
-                        'vip': client.get('vip'),
-                        'preferences_alimentaires': client.get('preferences_alimentaires'),
-                        'preferences_chambre': client.get('preferences_chambre')
-                    }
-                    room_data['clients'].append(client_data)
-            
-            data['chambres'].append(room_data)
+            room_clients = [clients_data[client_id] for client_id in (res.get('client_principal_id'), res.get('client_secondaire_id'))
+                            if client_id in clients_data]
+            for client in room_clients or [{}]:
+                rows.append({
+                    'chambre': res.get('room_no'),
+                    'categorie': res.get('room_category_label'),
+                    'adultes': res.get('adults'),
+                    'enfants': res.get('children'),
+                    'client': client.get('guest_name'),
+                    'titre': client.get('guest_title'),
+                    'vip': client.get('vip') or res.get('vip'),
+                    'pref_alimentaires': client.get('preferences_alimentaires'),
+                    'pref_chambre': client.get('preferences_chambre')
+                })
         
-        return str(data)
+        return f"Réservations en cours: {len(result.data)}\n" + compact_table(rows, [
+            'chambre', 'categorie', 'adultes', 'enfants', 'client', 'titre', 'vip', 'pref_alimentaires', 'pref_chambre'
+        ])
         
     except Exception as e:
         print(f"Erreur get_current_clients_info_raw: {e}")
-        return "Erreur lors de la récupération des données"
+        raise
+
 
 def get_all_clients_info_raw():
     """Récupérer TOUS les clients (actuels, passés, futurs)"""
@@ -1965,7 +4127,7 @@ def get_all_clients_info_raw():
         return f"Total clients: {len(result.data)}" if result.data else "Aucun client"
     except Exception as e:
         print(f"Erreur get_all_clients_info_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_all_reservations_info_raw():
     """Récupérer TOUTES les réservations"""
@@ -1974,7 +4136,7 @@ def get_all_reservations_info_raw():
         return f"Total réservations: {len(result.data)}" if result.data else "Aucune réservation"
     except Exception as e:
         print(f"Erreur get_all_reservations_info_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_rooms_status_raw():
     """Récupérer l'état de toutes les chambres"""
@@ -1983,7 +4145,7 @@ def get_rooms_status_raw():
         return f"Chambres: {len(result.data)}" if result.data else "Aucune chambre"
     except Exception as e:
         print(f"Erreur get_rooms_status_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_room_preferences_raw():
     """Récupérer toutes les préférences de chambres"""
@@ -1992,7 +4154,7 @@ def get_room_preferences_raw():
         return f"Préférences chambres: {len(result.data)}" if result.data else "Aucune préférence"
     except Exception as e:
         print(f"Erreur get_room_preferences_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_special_requests_raw():
     """Récupérer toutes les demandes spéciales"""
@@ -2001,7 +4163,7 @@ def get_special_requests_raw():
         return f"Demandes spéciales: {len(result.data)}" if result.data else "Aucune demande"
     except Exception as e:
         print(f"Erreur get_special_requests_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_vip_statistics_raw():
     """Récupérer les statistiques VIP"""
@@ -2014,7 +4176,7 @@ def get_vip_statistics_raw():
         return f"Statistiques VIP: {vip_counts}"
     except Exception as e:
         print(f"Erreur get_vip_statistics_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_current_issues_raw():
     """Récupérer les problèmes actuels"""
@@ -2023,7 +4185,7 @@ def get_current_issues_raw():
         return "Analyse des problèmes en cours..."
     except Exception as e:
         print(f"Erreur get_current_issues_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_staff_availability_raw():
     """Récupérer la disponibilité du staff"""
@@ -2034,7 +4196,7 @@ def get_staff_availability_raw():
         return f"Staff disponible: {available}/{total}"
     except Exception as e:
         print(f"Erreur get_staff_availability_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_occupancy_statistics_raw():
     """Récupérer les statistiques d'occupation"""
@@ -2047,7 +4209,7 @@ def get_occupancy_statistics_raw():
         return f"Statistiques occupation: {stats}"
     except Exception as e:
         print(f"Erreur get_occupancy_statistics_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_booking_trends_raw():
     """Récupérer les tendances de réservation"""
@@ -2056,7 +4218,7 @@ def get_booking_trends_raw():
         return f"Tendances: {len(result.data)} réservations analysées"
     except Exception as e:
         print(f"Erreur get_booking_trends_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_reservation_calendar_raw():
     """Récupérer le calendrier des réservations"""
@@ -2065,7 +4227,7 @@ def get_reservation_calendar_raw():
         return f"Calendrier: {len(result.data)} dates"
     except Exception as e:
         print(f"Erreur get_reservation_calendar_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_special_events_raw():
     """Récupérer les événements spéciaux"""
@@ -2074,7 +4236,7 @@ def get_special_events_raw():
         return "Événements: Analyse en cours..."
     except Exception as e:
         print(f"Erreur get_special_events_raw: {e}")
-        return "Erreur récupération"
+        raise
 
 def get_current_clients_info():
     """Récupérer les informations sur les clients actuels (formaté pour l'affichage)"""
@@ -2125,10 +4287,10 @@ def get_current_clients_info():
         
     except Exception as e:
         print(f"Erreur get_current_clients_info: {e}")
-        return "Désolé, je ne peux pas récupérer les informations sur les clients actuels pour le moment."
+        return None  # voir formatter_unavailable()
 
 def get_allergies_info_raw():
-    """Récupérer les données brutes sur les allergies pour OpenAI"""
+    """Récupérer les données brutes sur les allergies pour OpenAI (tableau compact)"""
     try:
         result = supabase.table('clients').select(
             'guest_name, guest_title, preferences_alimentaires, preferences_opera'
@@ -2137,21 +4299,19 @@ def get_allergies_info_raw():
         if not result.data:
             return "Aucune préférence alimentaire enregistrée"
         
-        data = []
-        for client in result.data:
-            client_data = {
-                'nom': client.get('guest_name'),
-                'titre': client.get('guest_title'),
-                'preferences_alimentaires': client.get('preferences_alimentaires'),
-                'preferences_opera': client.get('preferences_opera')
-            }
-            data.append(client_data)
+        rows = [{
+            'nom': client.get('guest_name'),
+            'titre': client.get('guest_title'),
+            'pref_alimentaires': client.get('preferences_alimentaires'),
+            'pref_opera': client.get('preferences_opera')
+        } for client in result.data]
         
-        return str(data)
+        return compact_table(rows, ['nom', 'titre', 'pref_alimentaires', 'pref_opera'])
         
     except Exception as e:
         print(f"Erreur get_allergies_info_raw: {e}")
-        return "Erreur lors de la récupération des données"
+        raise
+
 
 def get_allergies_info():
     """Récupérer les informations sur les allergies et préférences alimentaires (formaté pour l'affichage)"""
@@ -2177,10 +4337,10 @@ def get_allergies_info():
         
     except Exception as e:
         print(f"Erreur get_allergies_info: {e}")
-        return "Désolé, je ne peux pas récupérer les informations sur les allergies pour le moment."
+        return None  # voir formatter_unavailable()
 
 def get_vip_info_raw():
-    """Récupérer les données brutes sur les VIP pour OpenAI"""
+    """Récupérer les données brutes sur les VIP pour OpenAI (tableau compact)"""
     try:
         result = supabase.table('clients').select(
             'guest_name, guest_title, vip, nombre_sejours'
@@ -2189,21 +4349,19 @@ def get_vip_info_raw():
         if not result.data:
             return "Aucun client VIP enregistré"
         
-        data = []
-        for client in result.data:
-            client_data = {
-                'nom': client.get('guest_name'),
-                'titre': client.get('guest_title'),
-                'vip': client.get('vip'),
-                'nombre_sejours': client.get('nombre_sejours')
-            }
-            data.append(client_data)
+        rows = [{
+            'nom': client.get('guest_name'),
+            'titre': client.get('guest_title'),
+            'vip': client.get('vip'),
+            'sejours': client.get('nombre_sejours')
+        } for client in result.data]
         
-        return str(data)
+        return compact_table(rows, ['nom', 'titre', 'vip', 'sejours'])
         
     except Exception as e:
         print(f"Erreur get_vip_info_raw: {e}")
-        return "Erreur lors de la récupération des données"
+        raise
+
 
 def get_vip_info():
     """Récupérer les informations sur les clients VIP (formaté pour l'affichage)"""
@@ -2242,10 +4400,10 @@ def get_vip_info():
         
     except Exception as e:
         print(f"Erreur get_vip_info: {e}")
-        return "Désolé, je ne peux pas récupérer les informations VIP pour le moment."
+        return None  # voir formatter_unavailable()
 
 def get_reservations_info_raw():
-    """Récupérer les données brutes sur les réservations pour OpenAI"""
+    """Récupérer les données brutes sur les réservations pour OpenAI (tableau compact)"""
     try:
         result = supabase.table('reservations').select(
             'resv_name_id, room_no, arrival, departure, statut, adults, children, vip'
@@ -2254,32 +4412,27 @@ def get_reservations_info_raw():
         if not result.data:
             return "Aucune réservation active"
         
-        data = {
-            'total': len(result.data),
-            'par_statut': {},
-            'vip': []
-        }
-        
+        par_statut = {}
         for res in result.data:
             statut = res.get('statut', 'futures')
-            if statut not in data['par_statut']:
-                data['par_statut'][statut] = 0
-            data['par_statut'][statut] += 1
-            
-            if res.get('vip'):
-                vip_data = {
-                    'chambre': res.get('room_no'),
-                    'vip': res.get('vip'),
-                    'arrivee': res.get('arrival'),
-                    'depart': res.get('departure')
-                }
-                data['vip'].append(vip_data)
+            par_statut[statut] = par_statut.get(statut, 0) + 1
+        
+        summary = f"Total: {len(result.data)} | " + " | ".join(f"{statut}: {count}" for statut, count in par_statut.items())
+        vip_rows = [{
+            'chambre': res.get('room_no'),
+            'vip': res.get('vip'),
+            'arrivee': res.get('arrival'),
+            'depart': res.get('departure')
+        } for res in result.data if res.get('vip')]
         
-        return str(data)
+        if not vip_rows:
+            return summary
+        return summary + "\nRéservations VIP:\n" + compact_table(vip_rows, ['chambre', 'vip', 'arrivee', 'depart'])
         
     except Exception as e:
         print(f"Erreur get_reservations_info_raw: {e}")
-        return "Erreur lors de la récupération des données"
+        raise
+
 
 def get_reservations_info():
     """Récupérer les informations sur les réservations (formaté pour l'affichage)"""
@@ -2315,10 +4468,10 @@ def get_reservations_info():
         
     except Exception as e:
         print(f"Erreur get_reservations_info: {e}")
-        return "Désolé, je ne peux pas récupérer les informations sur les réservations pour le moment."
+        return None  # voir formatter_unavailable()
 
 def get_alerts_info_raw():
-    """Récupérer les données brutes sur les alertes pour OpenAI"""
+    """Récupérer les données brutes sur les alertes pour OpenAI (tableau compact)"""
     try:
         result = supabase.table('ai_alerts').select(
             'alert_type, priority, title, message, room_number, created_at'
@@ -2327,23 +4480,21 @@ def get_alerts_info_raw():
         if not result.data:
             return "Aucune alerte active"
         
-        data = []
-        for alert in result.data[:10]:
-            alert_data = {
-                'type': alert.get('alert_type'),
-                'priorite': alert.get('priority'),
-                'titre': alert.get('title'),
-                'message': alert.get('message'),
-                'chambre': alert.get('room_number'),
-                'cree_le': alert.get('created_at')
-            }
-            data.append(alert_data)
+        rows = [{
+            'type': alert.get('alert_type'),
+            'priorite': alert.get('priority'),
+            'titre': alert.get('title'),
+            'message': alert.get('message'),
+            'chambre': alert.get('room_number'),
+            'cree_le': alert.get('created_at')
+        } for alert in result.data[:10]]
         
-        return str(data)
+        return compact_table(rows, ['type', 'priorite', 'titre', 'message', 'chambre', 'cree_le'])
         
     except Exception as e:
         print(f"Erreur get_alerts_info_raw: {e}")
-        return "Erreur lors de la récupération des données"
+        raise
+
 
 def get_alerts_info():
     """Récupérer les informations sur les alertes (formaté pour l'affichage)"""
@@ -2371,10 +4522,10 @@ def get_alerts_info():
         
     except Exception as e:
         print(f"Erreur get_alerts_info: {e}")
-        return "Désolé, je ne peux pas récupérer les informations sur les alertes pour le moment."
+        return None  # voir formatter_unavailable()
 
 def get_staff_info_raw():
-    """Récupérer les données brutes sur le personnel pour OpenAI"""
+    """Récupérer les données brutes sur le personnel pour OpenAI (tableau compact)"""
     try:
         result = supabase.table('staff_directory').select(
             'first_name, last_name, position, department, available, status'
@@ -2383,29 +4534,21 @@ def get_staff_info_raw():
         if not result.data:
             return "Aucune information sur le personnel"
         
-        data = {
-            'total': len(result.data),
-            'par_departement': {}
-        }
-        
-        for staff in result.data:
-            dept = staff.get('department', 'Autre')
-            if dept not in data['par_departement']:
-                data['par_departement'][dept] = []
-            
-            staff_data = {
-                'nom': f"{staff.get('first_name', '')} {staff.get('last_name', '')}".strip(),
-                'position': staff.get('position'),
-                'disponible': staff.get('available'),
-                'statut': staff.get('status')
-            }
-            data['par_departement'][dept].append(staff_data)
+        rows = [{
+            'departement': staff.get('department', 'Autre'),
+            'nom': f"{staff.get('first_name', '')} {staff.get('last_name', '')}".strip(),
+            'position': staff.get('position'),
+            'disponible': staff.get('available'),
+            'statut': staff.get('status')
+        } for staff in result.data]
+        rows.sort(key=lambda row: str(row['departement']))
         
-        return str(data)
+        return f"Total: {len(rows)}\n" + compact_table(rows, ['departement', 'nom', 'position', 'disponible', 'statut'])
         
     except Exception as e:
         print(f"Erreur get_staff_info_raw: {e}")
-        return "Erreur lors de la récupération des données"
+        raise
+
 
 def get_staff_info():
     """Récupérer les informations sur le personnel (formaté pour l'affichage)"""
@@ -2442,7 +4585,7 @@ def get_staff_info():
         
     except Exception as e:
         print(f"Erreur get_staff_info: {e}")
-        return "Désolé, je ne peux pas récupérer les informations sur le personnel pour le moment."
+        return None  # voir formatter_unavailable()
 
 def get_general_help():
     """Aide générale pour le chatbot"""
@@ -2456,45 +4599,617 @@ Voici ce que je peux vous dire :
 📅 **Réservations** : "État des réservations ?", "Chambres occupées ?"
 🚨 **Alertes** : "Y a-t-il des alertes ?", "Problèmes actuels ?"
 👥 **Personnel** : "Qui est disponible ?", "Équipe actuelle ?"
+☀️ **Briefing du jour** : "Que dois-je savoir aujourd'hui ?", "Briefing"
 
 Posez-moi une question spécifique !"""
 
-def save_ai_interaction(user_id, question, response, context_data=None):
-    """Sauvegarder l'interaction AI dans la base - Reproduction exacte du mobile"""
+# ===== BRIEFING DU JOUR =====
+# Résumé quotidien (arrivées, départs, VIP, allergies des clients présents, alertes)
+# construit une fois et partagé par tout le personnel : tableau de bord et chatbot.
+# Les données sont relues au plus toutes les CHATBOT_CONTEXT_TTL secondes (et après
+# chaque écriture) ; le résumé rédigé par le modèle n'est régénéré que si elles changent,
+# en arrière-plan : le texte à jour est servi sans attendre le modèle.
+BRIEFING_LANGUAGES = ['fr', 'en']
+BRIEFING_MIN_REFRESH = int(os.getenv('BRIEFING_MIN_REFRESH', 600))  # secondes entre deux résumés IA
+BRIEFING_LLM = os.getenv('BRIEFING_LLM', 'true').lower() != 'false'
+_briefings = {}  # (date, langue) → briefing
+_briefing_generating = set()  # (date, langue) dont le résumé IA est en cours de rédaction
+_briefing_lock = threading.Lock()  # protège les deux structures ci-dessus, jamais pendant une entrée/sortie
+
+BRIEFING_LABELS = {
+    'fr': {
+        'title': "☀️ Briefing du {date}",
+        'arrivals': "🛬 Arrivées ({count})",
+        'departures': "🛫 Départs ({count})",
+        'vip': "👑 VIP présents ou attendus ({count})",
+        'allergies': "⚠️ Allergies et régimes des clients présents ({count})",
+        'alerts': "🚨 Alertes ouvertes ({count})",
+        'none': "Aucun",
+        'room': "Ch.",
+        'arriving': "arrivée",
+        'in_house': "en séjour",
+        'unknown': "Client inconnu",
+        'prompt': "Rédige en français, en 3 phrases maximum, les points d'attention de la journée pour la réception à partir de ces données. Pas de liste, pas de salutation."
+    },
+    'en': {
+        'title': "☀️ Briefing for {date}",
+        'arrivals': "🛬 Arrivals ({count})",
+        'departures': "🛫 Departures ({count})",
+        'vip': "👑 VIPs in house or arriving ({count})",
+        'allergies': "⚠️ Allergies and diets of in-house guests ({count})",
+        'alerts': "🚨 Open alerts ({count})",
+        'none': "None",
+        'room': "Rm.",
+        'arriving': "arriving",
+        'in_house': "in house",
+        'unknown': "Unknown guest",
+        'prompt': "Write in English, in at most 3 sentences, today's points of attention for the front desk based on this data. No list, no greeting."
+    }
+}
+
+def fetch_briefing_data():
+    """Données du briefing : réservations du jour et en cours, clients, alertes (3 requêtes)"""
+    today = date.today().isoformat()
+    reservations = supabase.table('reservations').select(
+        'resv_name_id, room_no, arrival, departure, statut, vip, client_principal_id, client_secondaire_id'
+    ).or_(f'arrival.eq.{today},departure.eq.{today},statut.eq.en_cours').execute().data
+
+    client_ids = {res[key] for res in reservations
+                  for key in ('client_principal_id', 'client_secondaire_id') if res.get(key)}
+    clients = {}
+    if client_ids:
+        clients_result = supabase.table('clients').select(
+            'id, guest_name, guest_title, vip, statut, preferences_alimentaires'
+        ).in_('id', list(client_ids)).execute()
+        clients = {client['id']: client for client in clients_result.data}
+
+    alerts = supabase.table('ai_alerts').select(
+        'id, alert_type, priority, title, room_number'
+    ).eq('is_read', False).order('created_at', desc=True).limit(10).execute().data
+
+    def guests(res):
+        return [clients[res[key]] for key in ('client_principal_id', 'client_secondaire_id')
+                if res.get(key) in clients]
+
+    def entry(res, client, state=None):
+        name = f"{client.get('guest_title') or ''} {client.get('guest_name') or ''}".strip() if client else None
+        return {'reservation': res.get('resv_name_id'), 'chambre': res.get('room_no'), 'client': name,
+                'vip': (client or {}).get('vip') or res.get('vip'), 'etat': state,
+                'allergies': (client or {}).get('preferences_alimentaires')}
+
+    # Mêmes règles que le tableau de bord (get_reservations_jour, get_departures_jour,
+    # get_reservations_actuelles)
+    arrivals = [res for res in reservations if res.get('arrival') == today and res.get('statut') in ('futures', 'jour')]
+    departures = [res for res in reservations if res.get('departure') == today and res.get('statut') in ('futures', 'en_cours', 'jour')]
+    in_house = [res for res in reservations if res.get('statut') == 'en_cours' and (res.get('departure') or '') >= today
+                and any(client.get('statut') == 'actuel' for client in guests(res))]
+
+    vip = [entry(res, client, 'in_house') for res in in_house for client in guests(res) if client.get('vip')]
+    vip += [entry(res, client, 'arriving') for res in arrivals for client in guests(res) or [None]
+            if (client or {}).get('vip') or res.get('vip')]
+
+    return {
+        'date': today,
+        'arrivees': [entry(res, (guests(res) or [None])[0]) for res in arrivals],
+        'departs': [entry(res, (guests(res) or [None])[0]) for res in departures],
+        'vip': vip,
+        'allergies': [entry(res, client) for res in in_house for client in guests(res)
+                      if client.get('preferences_alimentaires')],
+        'alertes': [{'priorite': alert.get('priority'), 'titre': alert.get('title'),
+                     'type': alert.get('alert_type'), 'chambre': alert.get('room_number')}
+                    for alert in alerts]
+    }
+
+def get_briefing_data():
+    """Données du briefing (préfixe 'hotel_context' : invalidées lors des écritures)"""
+    return get_cached_data('hotel_context_briefing_data', fetch_briefing_data, CHATBOT_CONTEXT_TTL)
+
+def render_briefing(data, language):
+    """Texte du briefing dans une langue (sans appel au modèle)"""
+    labels = BRIEFING_LABELS[language]
+
+    def guest_line(item):
+        parts = [f"{labels['room']} {item['chambre']}" if item.get('chambre') else None,
+                 item.get('client') or labels['unknown']]
+        if item.get('vip'):
+            parts.append(str(item['vip']))
+        if item.get('etat'):
+            parts.append(labels[item['etat']])
+        return "• " + " — ".join(part for part in parts if part)
+
+    sections = [
+        ('arrivals', data['arrivees'], guest_line),
+        ('departures', data['departs'], guest_line),
+        ('vip', data['vip'], guest_line),
+        ('allergies', data['allergies'],
+         lambda item: f"{guest_line(item)} : {item['allergies']}"),
+        ('alerts', data['alertes'],
+         lambda alert: "• " + " — ".join(str(value) for value in
+                                          (alert.get('priorite'), alert.get('titre'), alert.get('chambre')) if value)),
+    ]
+
+    lines = [labels['title'].format(date=data['date'])]
+    for key, items, line in sections:
+        lines.append("")
+        lines.append(labels[key].format(count=len(items)))
+        if not items:
+            lines.append(labels['none'])
+        lines.extend(line(item) for item in items[:15])
+        if len(items) > 15:
+            lines.append(f"… (+{len(items) - 15})")
+    return "\n".join(lines)
+
+def generate_briefing_summary(data, language):
+    """Points d'attention rédigés par le modèle (None si indisponible)"""
+    if not (openai_client and BRIEFING_LLM):
+        return None
+    if not acquire_llm_slot():
+        return None
+    try:
+        with observe_openai_call('briefing'):
+            completion = openai_client.chat.completions.create(
+                model=openai_model,
+                messages=[
+                    {"role": "system", "content": BRIEFING_LABELS[language]['prompt']},
+                    {"role": "user", "content": json.dumps(data, ensure_ascii=False, default=str)}
+                ],
+                max_tokens=250,
+                temperature=0.3
+            )
+        count_openai_tokens(completion.usage)
+        return completion.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"❌ Erreur résumé du briefing ({language}): {e}")
+        return None
+    finally:
+        release_llm_slot()
+
+def load_stored_briefing(briefing_date, language):
+    """Briefing déjà enregistré (généré par un autre processus ou par la tâche planifiée)"""
+    try:
+        result = supabase.table('ai_daily_briefings').select('*')\
+            .eq('briefing_date', briefing_date)\
+            .eq('language', language)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        print(f"❌ Erreur lecture ai_daily_briefings: {e}")
+        return None
+
+def store_briefing(briefing):
+    """Enregistrer le briefing du jour (une ligne par date et par langue)"""
+    try:
+        supabase.table('ai_daily_briefings')\
+            .upsert(briefing, on_conflict='briefing_date,language', returning='minimal')\
+            .execute()
+    except Exception as e:
+        print(f"❌ Erreur sauvegarde ai_daily_briefings: {e}")
+
+def publish_briefing(briefing):
+    """Publier un briefing en mémoire (seuls ceux du jour sont gardés) puis l'enregistrer"""
+    key = (briefing['briefing_date'], briefing['language'])
+    with _briefing_lock:
+        for stale_key in [k for k in _briefings if k[0] != key[0]]:
+            del _briefings[stale_key]
+        _briefings[key] = briefing
+    store_briefing(briefing)
+
+def write_briefing_summary(briefing):
+    """Rédiger le résumé IA d'un briefing et le publier (thread d'arrière-plan ou tâche planifiée)
+
+    En cas d'échec, le résumé précédent est gardé et la tentative datée : pas de
+    nouvel essai avant BRIEFING_MIN_REFRESH secondes.
+    """
+    key = (briefing['briefing_date'], briefing['language'])
+    try:
+        summary = generate_briefing_summary(briefing['data'], briefing['language'])
+    finally:
+        with _briefing_lock:
+            _briefing_generating.discard(key)
+
+    briefing = dict(briefing, summary_generated_at=utc_now().isoformat())
+    if summary is not None:
+        briefing.update(summary=summary, summary_version=briefing['version'])
+    with _briefing_lock:
+        current = _briefings.get(key)
+    if current is not None and current['version'] != briefing['version']:
+        # Données modifiées pendant la rédaction : le briefing plus récent est gardé
+        return current
+    publish_briefing(briefing)
+    print(f"☀️ Résumé du briefing {briefing['language']} {'généré' if summary is not None else 'indisponible'} (version {briefing['version']})")
+    return briefing
+
+def get_daily_briefing(language=None, force=False, wait_summary=False):
+    """Briefing du jour dans une langue (texte à jour, résumé IA régénéré si les données changent)
+
+    Le texte est toujours renvoyé tout de suite : le résumé IA est rédigé dans un
+    thread d'arrière-plan (les requêtes suivantes le reçoivent), sauf avec
+    wait_summary (generate_briefing.py). Lecture en base et appel OpenAI hors de
+    _briefing_lock : le verrou ne sert qu'à publier le briefing et à éviter que deux
+    threads rédigent le même résumé.
+    """
+    if language not in BRIEFING_LANGUAGES:
+        language = session.get('language', 'fr') if has_request_context() else 'fr'
+        language = language if language in BRIEFING_LANGUAGES else 'fr'
+
+    data = get_briefing_data()
+    version = content_hash(serialize_context(data))
+    key = (data['date'], language)
+
+    with _briefing_lock:
+        briefing = _briefings.get(key)
+    if briefing is None:
+        briefing = load_stored_briefing(*key)
+
+    summary_current = bool(briefing) and briefing.get('summary_version') == version
+    summary_generated_at = parse_utc_timestamp((briefing or {}).get('summary_generated_at'))
+    summary_recent = bool(summary_generated_at) and (
+        utc_now() - summary_generated_at
+    ).total_seconds() < BRIEFING_MIN_REFRESH
+    # Sans modèle disponible, le briefing se limite au texte
+    summary_settled = summary_current or summary_recent or not (openai_client and BRIEFING_LLM)
+
+    if briefing and briefing['version'] == version and summary_settled and not force:
+        with _briefing_lock:
+            _briefings.setdefault(key, briefing)
+        return briefing
+
+    # Données modifiées : texte toujours à jour, résumé IA limité à un par intervalle
+    # (et à un seul thread à la fois ; en attendant, le résumé précédent est gardé)
+    with _briefing_lock:
+        regenerate = bool(openai_client and BRIEFING_LLM) \
+            and not (summary_current or (summary_recent and not force)) \
+            and key not in _briefing_generating
+        if regenerate:
+            _briefing_generating.add(key)
+
+    briefing = {
+        'briefing_date': data['date'],
+        'language': language,
+        'version': version,
+        'content': render_briefing(data, language),
+        'data': data,
+        'summary': (briefing or {}).get('summary'),
+        'summary_version': (briefing or {}).get('summary_version'),
+        'summary_generated_at': (briefing or {}).get('summary_generated_at'),
+        'generated_at': utc_now().isoformat()
+    }
+    publish_briefing(briefing)
+    print(f"☀️ Briefing {language} mis à jour (version {version})")
+
+    if regenerate:
+        if wait_summary:
+            return write_briefing_summary(briefing)
+        try:
+            threading.Thread(target=write_briefing_summary, args=(briefing,),
+                             name='briefing-summary', daemon=True).start()
+        except Exception:
+            with _briefing_lock:
+                _briefing_generating.discard(key)
+            raise
+    return briefing
+
+
+def get_briefing_text(language=None):
+    """Briefing du jour formaté pour le chatbot (None si les données sont indisponibles)"""
+    try:
+        briefing = get_daily_briefing(language)
+    except Exception as e:
+        print(f"❌ Erreur briefing du jour: {e}")
+        return None
+    if briefing.get('summary'):
+        return f"{briefing['summary']}\n\n{briefing['content']}"
+    return briefing['content']
+
+@app.route('/api/briefing/today')
+@login_required
+def briefing_today():
+    """Briefing du jour (carte du tableau de bord)"""
     try:
-        # Calculer le temps de réponse (simulation pour l'instant)
-        response_time_ms = 500  # 500ms par défaut
+        briefing = get_daily_briefing(request.args.get('lang'))
+        return jsonify({
+            'success': True,
+            'date': briefing['briefing_date'],
+            'language': briefing['language'],
+            'version': briefing['version'],
+            'summary': briefing.get('summary'),
+            'stale_summary': briefing.get('summary_version') != briefing['version'],
+            'content': briefing['content'],
+            'counts': {key: len(briefing['data'][key]) for key in ('arrivees', 'departs', 'vip', 'allergies', 'alertes')},
+            'generated_at': briefing['generated_at']
+        })
+    except Exception as e:
+        print(f"❌ Erreur briefing du jour: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# ===== RÉPONSES DIRECTES (SANS LLM) =====
+# Les questions courantes et sans ambiguïté ("qui est VIP ?", "des alertes ?")
+# sont servies par les formateurs existants, depuis le cache, sans appel OpenAI.
+# Tous les mots de la question doivent relever d'une seule intention : au moindre
+# doute la question part vers le LLM, de même si les données sont indisponibles
+# (l'échec n'est pas mis en cache).
+CHATBOT_FAST_PATH = os.getenv('CHATBOT_FAST_PATH', 'true').lower() != 'false'
+
+FAST_PATH_FILLER_WORDS = {
+    'qui', 'est', 'sont', 'les', 'des', 'le', 'la', 'l', 'de', 'du', 'd', 'a', 'y', 't', 'il', 'ils', 'quels',
+    'quelles', 'quel', 'quelle', 'liste', 'montre', 'moi', 'donne', 'affiche', 'voir', 'nos', 'mes', 'actuellement',
+    'en', 'ce', 'moment', 'svp', 'stp', 'merci', 'etat', 'info', 'infos', 'please', 'show', 'list', 'me', 'the',
+    'any', 'there', 'are', 'is', 'who', 'what', 'current', 'currently', 'aujourd', 'hui', 'today',
+    'qu', 'que', 'je', 'dois', 'faut', 'i', 'need', 'to', 'do', 'should'
+}
+# 'client(s)' ne suffit pas à lui seul à choisir une intention autre que les clients actuels
+FAST_PATH_SOFT_WORDS = {'client', 'clients', 'guest', 'guests'}
+FAST_PATH_GREETING_WORDS = {'bonjour', 'salut', 'hello', 'bonsoir', 'coucou', 'hi', 'hey'}
+FAST_PATH_GREETING_EXTRA = {'comment', 'ca', 'va', 'tout', 'monde', 'merci'}
+
+FAST_PATH_INTENTS = {
+    'clients_actuels': (['client', 'present', 'hotel', 'sejour', 'occupe', 'chambre', 'guest'], get_current_clients_info),
+    'allergies': (['allerg', 'intoleran', 'alimentaire', 'preference'], get_allergies_info),
+    'vip': (['vip'], get_vip_info),
+    'reservations': (['reservation', 'occupation', 'booking'], get_reservations_info),
+    'alertes': (['alerte', 'urgence', 'probleme', 'alert'], get_alerts_info),
+    'personnel': (['staff', 'personnel', 'employe', 'equipe'], get_staff_info),
+    'aide': (['aide', 'help'], get_general_help),
+    'briefing': (['brief', 'savoir', 'resume', 'recap', 'jour', 'know', 'summary'], get_briefing_text),
+}
+
+def classify_fast_path_intent(question):
+    """Identifier une intention sans ambiguïté (ou None si la question doit aller au LLM)"""
+    words = normalize_question(question).split()
+    if not words:
+        return None
+
+    if set(words) <= FAST_PATH_GREETING_WORDS | FAST_PATH_GREETING_EXTRA and (
+            set(words) & FAST_PATH_GREETING_WORDS or {'ca', 'va'} <= set(words)):
+        return 'salutation'
+
+    remaining = [word for word in words if word not in FAST_PATH_FILLER_WORDS]
+    if len(remaining) > 1:
+        remaining = [word for word in remaining if word not in FAST_PATH_SOFT_WORDS] or remaining
+    if not remaining:
+        return None
+
+    intents = set()
+    for word in remaining:
+        matches = {intent for intent, (keywords, _) in FAST_PATH_INTENTS.items()
+                   if any(word.startswith(keyword) for keyword in keywords)}
+        if not matches:
+            return None  # mot inconnu : question plus précise que les formateurs
+        intents |= matches
+    return intents.pop() if len(intents) == 1 else None
+
+def get_fast_path_response(question):
+    """Réponse directe pour une intention courante : (intention, réponse) ou (None, None)"""
+    if not CHATBOT_FAST_PATH:
+        return None, None
+    intent = classify_fast_path_intent(question)
+    if not intent:
+        return None, None
+    if intent == 'salutation':
+        return intent, get_specific_response('bonjour')
+    if intent == 'briefing':
+        # Briefing partagé, dans la langue de l'utilisateur (sinon question transmise au modèle)
+        briefing = get_briefing_text()
+        return (intent, briefing) if briefing else (None, None)
+
+    _, formatter = FAST_PATH_INTENTS[intent]
+
+    def fetch_fast_response():
+        response = formatter()
+        if response is None:
+            # Exception : get_cached_data ne met pas l'échec en cache
+            raise RuntimeError(f"données indisponibles pour l'intention '{intent}'")
+        return response
+
+    # Préfixe 'hotel_context' : invalidé lors des écritures comme le contexte du chatbot
+    try:
+        return intent, get_cached_data(f'hotel_context_fast_{intent}', fetch_fast_response, CHATBOT_CONTEXT_TTL)
+    except Exception as e:
+        print(f"⚠️ Réponse directe impossible ({e}) : question transmise au modèle")
+        return None, None
+
+# ===== SNAPSHOTS DE CONTEXTE (STOCKAGE DÉDUPLIQUÉ) =====
+# Le contexte hôtel envoyé au modèle est identique pour toutes les questions posées
+# entre deux écritures : il est stocké une seule fois dans ai_context_snapshots
+# (clé = empreinte SHA-256 du contenu) et ai_interactions n'en garde que l'empreinte.
+CONTEXT_SNAPSHOT_MIN_CHARS = 1024  # en dessous, le contexte reste dans la ligne
+CONTEXT_SNAPSHOT_KNOWN_MAX = 10000
+_known_context_hashes = set()  # empreintes déjà présentes dans ai_context_snapshots
+_known_context_hashes_lock = threading.Lock()
+
+def serialize_context(context):
+    """Sérialisation canonique d'un contexte (même contenu → même texte)"""
+    return json.dumps(context, sort_keys=True, ensure_ascii=False, default=str)
+
+def context_snapshot_hash(context):
+    """Empreinte SHA-256 complète d'un contexte (clé de ai_context_snapshots)"""
+    return hashlib.sha256(serialize_context(context).encode('utf-8')).hexdigest()
+
+def build_context_reference(context):
+    """Remplacer un contexte volumineux par sa référence
+
+    Retourne (champs à mettre dans context_data, ligne ai_context_snapshots ou None).
+    """
+    if context is None:
+        return {'hotel_context': None}, None
+    serialized = serialize_context(context)
+    if len(serialized) < CONTEXT_SNAPSHOT_MIN_CHARS:
+        return {'hotel_context': context}, None
+    snapshot_hash = hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+    snapshot = {
+        'hash': snapshot_hash,
+        'content': context,
+        'size_chars': len(serialized),
+        'created_at': utc_now().isoformat()
+    }
+    return {'hotel_context_ref': snapshot_hash}, snapshot
+
+def store_context_snapshots(snapshots):
+    """Enregistrer les snapshots pas encore connus (une ligne par empreinte)
+
+    Retourne False si l'écriture a échoué : les interactions ne doivent alors pas
+    référencer une empreinte absente.
+    """
+    with _known_context_hashes_lock:
+        pending = {snap['hash']: snap for snap in snapshots if snap['hash'] not in _known_context_hashes}
+    if not pending:
+        return True
+    try:
+        supabase.table('ai_context_snapshots')\
+            .upsert(list(pending.values()), on_conflict='hash', ignore_duplicates=True, returning='minimal')\
+            .execute()
+    except Exception as e:
+        print(f"❌ Erreur sauvegarde ai_context_snapshots: {e}")
+        return False
+    with _known_context_hashes_lock:
+        if len(_known_context_hashes) + len(pending) > CONTEXT_SNAPSHOT_KNOWN_MAX:
+            _known_context_hashes.clear()
+        _known_context_hashes.update(pending)
+    print(f"🗂️ {len(pending)} snapshot(s) de contexte enregistré(s)")
+    return True
+
+def get_context_snapshot(snapshot_hash):
+    """Relire un contexte à partir de son empreinte (context_data.hotel_context_ref)"""
+    try:
+        result = supabase.table('ai_context_snapshots').select('content')\
+            .eq('hash', snapshot_hash)\
+            .limit(1)\
+            .execute()
+        return result.data[0]['content'] if result.data else None
+    except Exception as e:
+        print(f"❌ Erreur lecture ai_context_snapshots: {e}")
+        return None
+
+def resolve_interaction_context(context_data):
+    """Contexte hôtel d'une interaction, qu'il soit en ligne ou référencé"""
+    context_data = context_data or {}
+    if 'hotel_context_ref' in context_data:
+        return get_context_snapshot(context_data['hotel_context_ref'])
+    return context_data.get('hotel_context')
+
+# ===== HISTORIQUE DES CONVERSATIONS (MÉMOIRE + ÉCRITURE DIFFÉRÉE) =====
+# L'historique est lu dans un tampon circulaire par utilisateur (chargé une seule
+# fois depuis ai_interactions) et les écritures passent par une file traitée en
+# arrière-plan, par lots : aucune requête Supabase bloquante pendant un échange.
+CHATBOT_HISTORY_MESSAGES = 20  # 10 échanges question/réponse
+CHATBOT_WRITE_BATCH_SIZE = int(os.getenv('CHATBOT_WRITE_BATCH_SIZE', 50))
+CHATBOT_WRITE_FLUSH_INTERVAL = float(os.getenv('CHATBOT_WRITE_FLUSH_INTERVAL', 2))  # en secondes
+_conversations = {}
+_conversations_lock = threading.Lock()
+_interaction_queue = queue.Queue()
+_interaction_writer = None
+_interaction_writer_lock = threading.Lock()
+
+def write_interaction_batch(rows):
+    """Insérer un lot de lignes dans ai_interactions (une nouvelle tentative en cas d'échec)
+
+    Les snapshots de contexte référencés sont enregistrés avant les interactions.
+    """
+    snapshots = [row.pop('_context_snapshot') for row in rows if row.get('_context_snapshot')]
+    if snapshots and not store_context_snapshots(snapshots):
+        # Référence impossible à garantir : garder le contexte dans la ligne
+        inline = {snap['hash']: snap['content'] for snap in snapshots}
+        for row in rows:
+            ref = row['context_data'].pop('hotel_context_ref', None)
+            if ref:
+                row['context_data']['hotel_context'] = inline[ref]
+    for row in rows:
+        row.pop('_context_snapshot', None)
+    for attempt in range(2):
+        try:
+            supabase.table('ai_interactions').insert(rows).execute()
+            print(f"💾 {len(rows)} ligne(s) sauvegardée(s) dans ai_interactions")
+            return True
+        except Exception as e:
+            print(f"❌ Erreur sauvegarde ai_interactions (tentative {attempt + 1}): {e}")
+            time.sleep(1)
+    return False
+
+def interaction_writer_loop():
+    """Thread d'écriture : regroupe les lignes en attente pendant l'intervalle de flush"""
+    while True:
+        rows = [_interaction_queue.get()]
+        deadline = time.time() + CHATBOT_WRITE_FLUSH_INTERVAL
+        while len(rows) < CHATBOT_WRITE_BATCH_SIZE:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(_interaction_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        write_interaction_batch(rows)
+
+def enqueue_interaction_row(row):
+    """Ajouter une ligne à la file d'écriture (le thread est démarré à la première utilisation)"""
+    global _interaction_writer
+    with _interaction_writer_lock:
+        if _interaction_writer is None or not _interaction_writer.is_alive():
+            _interaction_writer = threading.Thread(
+                target=interaction_writer_loop, name='ai-interactions-writer', daemon=True
+            )
+            _interaction_writer.start()
+    _interaction_queue.put(row)
+
+@atexit.register
+def flush_interaction_queue():
+    """Écrire les lignes encore en file à l'arrêt du processus"""
+    rows = []
+    while True:
+        try:
+            rows.append(_interaction_queue.get_nowait())
+        except queue.Empty:
+            break
+    for i in range(0, len(rows), CHATBOT_WRITE_BATCH_SIZE):
+        write_interaction_batch(rows[i:i + CHATBOT_WRITE_BATCH_SIZE])
+
+def save_ai_interaction(user_id, question, response, context_data=None, response_time_ms=None, timings=None):
+    """Sauvegarder l'interaction AI dans la base - Reproduction exacte du mobile
+    (écriture différée, par lots) avec le temps de réponse mesuré et la durée des étapes"""
+    try:
+        if response_time_ms is None:
+            response_time_ms = 0  # non mesuré
+        
+        # Contexte volumineux → stocké une fois dans ai_context_snapshots
+        context_fields, snapshot = build_context_reference(context_data)
         
         # Préparer les données comme dans le cahier des charges
+        # (toutes les lignes ont les mêmes colonnes pour l'insertion par lots)
         interaction_data = {
+            'id': str(uuid.uuid4()),
             'staff_user_id': user_id,
             'question': question,
             'ai_response': response,
             'context_data': {
                 'source': 'web_chatbot',
-                'hotel_context': context_data,
-                'timestamp': datetime.now().isoformat()
+                **context_fields,
+                'timings': timings,
+                'timestamp': utc_now().isoformat()
             },
             'response_time_ms': response_time_ms,
-            'created_at': datetime.now().isoformat()
+            'created_at': utc_now().isoformat()
         }
         
-        print(f"💾 Données à sauvegarder: {len(str(interaction_data))} caractères")
+        print(f"💾 Interaction mise en file: {len(str(interaction_data))} caractères")
         
-        # INSERT INTO ai_interactions (comme dans le flux mobile)
-        result = supabase.table('ai_interactions').insert(interaction_data).execute()
-        
-        if result.data:
-            print(f"✅ Interaction sauvegardée avec ID: {result.data[0].get('id', 'N/A')}")
-        else:
-            print("⚠️ Aucune donnée retournée après sauvegarde")
+        # INSERT INTO ai_interactions (comme dans le flux mobile), en arrière-plan
+        # (le snapshot voyage avec la ligne et sera écrit juste avant elle)
+        interaction_data['_context_snapshot'] = snapshot
+        enqueue_interaction_row(interaction_data)
             
     except Exception as e:
         print(f"❌ Erreur sauvegarde interaction: {e}")
         # Ne pas faire échouer la requête si la sauvegarde échoue
 
-def get_conversation_history(user_id, limit=10):
-    """Récupérer l'historique des conversations pour un utilisateur"""
+def load_conversation_history(user_id, limit=CHATBOT_HISTORY_MESSAGES // 2 * 3):
+    """Charger l'historique des conversations d'un utilisateur depuis ai_interactions
+
+    Un échange du web y figure deux fois : deux lignes de conversation (question seule,
+    réponse seule) et une ligne d'interaction (question et réponse). L'historique est
+    construit à partir des lignes de conversation, ou des interactions s'il n'y en a
+    aucune (échanges plus anciens ou venus du mobile). Trois lignes par échange.
+    """
     try:
         # Récupérer les dernières interactions
         result = supabase.table('ai_interactions')\
@@ -2505,15 +5220,18 @@ def get_conversation_history(user_id, limit=10):
             .execute()
         
         if result.data:
+            conversation_rows = [row for row in result.data if bool(row.get('question')) != bool(row.get('ai_response'))]
+            rows = conversation_rows or result.data
+
             # Convertir en format OpenAI (alternance user/assistant)
             messages = []
-            for interaction in reversed(result.data):  # Inverser pour avoir l'ordre chronologique
+            for interaction in reversed(rows):  # Inverser pour avoir l'ordre chronologique
                 if interaction.get('question'):
                     messages.append({"role": "user", "content": interaction['question']})
                 if interaction.get('ai_response'):
                     messages.append({"role": "assistant", "content": interaction['ai_response']})
             
-            print(f"📚 Historique récupéré: {len(messages)} messages")
+            print(f"📚 Historique chargé depuis la base: {len(messages)} messages")
             return messages
         else:
             print("📚 Aucun historique trouvé")
@@ -2523,9 +5241,30 @@ def get_conversation_history(user_id, limit=10):
         print(f"❌ Erreur lors de la récupération de l'historique: {e}")
         return []
 
+def get_user_conversation(user_id):
+    """Tampon circulaire des derniers messages d'un utilisateur"""
+    with _conversations_lock:
+        conversation = _conversations.get(user_id)
+    if conversation is not None:
+        return conversation
+
+    # Premier échange depuis le démarrage du processus : amorcer depuis la base
+    conversation = deque(load_conversation_history(user_id), maxlen=CHATBOT_HISTORY_MESSAGES)
+
+    with _conversations_lock:
+        return _conversations.setdefault(user_id, conversation)
+
+def get_conversation_history(user_id, limit=10):
+    """Récupérer l'historique des conversations pour un utilisateur (en mémoire)"""
+    messages = list(get_user_conversation(user_id))[-limit * 2:]
+    print(f"📚 Historique récupéré: {len(messages)} messages")
+    return messages
+
 def save_conversation_message(user_id, role, content):
     """Sauvegarder un message de conversation pour l'historique"""
     try:
+        get_user_conversation(user_id).append({"role": role, "content": content})
+
         # Créer une interaction temporaire pour l'historique
         data = {
             'id': str(uuid.uuid4()),
@@ -2534,18 +5273,13 @@ def save_conversation_message(user_id, role, content):
             'ai_response': content if role == 'assistant' else '',
             'context_data': {'role': role, 'conversation': True},
             'response_time_ms': 0,
-            'created_at': datetime.now().isoformat()
+            'created_at': utc_now().isoformat()
         }
         
-        # Insérer dans Supabase
-        result = supabase.table('ai_interactions').insert(data).execute()
-        
-        if result.data:
-            print(f"💬 Message {role} sauvegardé dans l'historique")
-            return True
-        else:
-            print(f"❌ Échec de la sauvegarde du message {role}")
-            return False
+        # Insérer dans Supabase (écriture différée)
+        enqueue_interaction_row(data)
+        print(f"💬 Message {role} ajouté à l'historique")
+        return True
             
     except Exception as e:
         print(f"❌ Erreur lors de la sauvegarde du message {role}: {e}")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Benchmark de charge du chatbot AYORA
+Simule plusieurs membres du personnel connectés en même temps qui posent des
+questions à /api/chatbot/query (ou /api/chatbot/stream) et mesure le débit et
+les percentiles p50/p95/p99 de latence (et du premier token en streaming).
+
+Pour ne pas appeler OpenAI, lancer d'abord openai_stub.py et démarrer
+l'application avec OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub.
+Chaque session se connecte par /auth/login avec un jeton JWT signé par
+BENCH_AUTH_SECRET : l'application doit tourner avec SUPABASE_BACKEND=fake (ou
+replay) et la même valeur de BENCH_AUTH_SECRET, seul cas où ces jetons sont acceptés.
+
+Usage : python bench_chatbot.py [--url http://127.0.0.1:5003] [--sessions 10]
+                                [--requests 20] [--stream] [--unique] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import uuid
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt
+
+DEFAULT_URL = 'http://127.0.0.1:5003'
+BENCH_TOKEN_ISSUER = 'ayora-bench'  # app.py : BENCH_TOKEN_ISSUER
+
+# Mélange de questions du personnel : réponses directes, analyses et recherches
+QUESTIONS = [
+    "Quels sont les clients VIP ?",
+    "Y a-t-il des allergies ?",
+    "Que dois-je savoir aujourd'hui ?",
+    "Qui est dans la chambre 101 ?",
+    "Quelles arrivées sont prévues demain ?",
+    "Quels clients présents ont une allergie aux fruits à coque ?",
+    "Combien de chambres sont occupées ce week-end ?",
+    "Résume les demandes spéciales des clients VIP présents",
+    "Quelles alertes concernent des chambres occupées ?",
+    "Quel client séjourne le plus souvent chez nous ?",
+]
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche (values triées)"""
+    if not values:
+        return None
+    return values[max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))]
+
+def latency_summary(values):
+    """p50 / p95 / p99 / moyenne / max (en ms)"""
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50), 1),
+        'p95': round(percentile(values, 95), 1),
+        'p99': round(percentile(values, 99), 1),
+        'avg': round(sum(values) / len(values), 1),
+        'max': round(values[-1], 1)
+    }
+
+def login(client, index):
+    """Ouvrir une session pour un membre du personnel fictif"""
+    secret = os.getenv('BENCH_AUTH_SECRET')
+    if not secret:
+        raise RuntimeError("BENCH_AUTH_SECRET doit être défini (même valeur que pour l'application)")
+    token = jwt.encode({
+        'sub': str(uuid.uuid4()),
+        'iss': BENCH_TOKEN_ISSUER,
+        'exp': datetime.now(timezone.utc) + timedelta(hours=1),
+        'email': f"bench.agent{index}@layana.com",
+        'user_metadata': {'full_name': f"Agent {index}", 'role': 'Réception'}
+    }, secret, algorithm='HS256')
+    response = client.post('/auth/login', json={'access_token': token, 'refresh_token': ''})
+    response.raise_for_status()
+
+def ask(client, question, stream):
+    """Poser une question : (statut, chemin, latence ms, premier token ms)"""
+    started = time.perf_counter()
+    if not stream:
+        response = client.post('/api/chatbot/query', json={'question': question})
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            return response.status_code, 'busy' if response.status_code == 503 else 'error', elapsed, None
+        result = response.json()
+        path = 'fast_path' if result.get('fast_path') else 'cache' if result.get('cached') else 'llm'
+        return 200, path, elapsed, elapsed
+
+    first_token = None
+    path = 'llm'
+    with client.stream('POST', '/api/chatbot/stream', json={'question': question}) as response:
+        if response.status_code != 200:
+            response.read()
+            elapsed = (time.perf_counter() - started) * 1000
+            return response.status_code, 'busy' if response.status_code == 503 else 'error', elapsed, None
+        for line in response.iter_lines():
+            if not line.startswith('data: '):
+                continue
+            event = json.loads(line[6:])
+            if event.get('type') == 'token' and first_token is None:
+                first_token = (time.perf_counter() - started) * 1000
+            elif event.get('type') == 'done':
+                path = event.get('path', path)
+            elif event.get('type') == 'error':
+                path = 'error'
+    return 200, path, (time.perf_counter() - started) * 1000, first_token
+
+def run_session(index, options, results, lock):
+    """Une session : connexion puis questions enchaînées"""
+    rng = random.Random(index)
+    with httpx.Client(base_url=options['url'], timeout=options['timeout']) as client:
+        try:
+            login(client, index)
+        except Exception as e:
+            with lock:
+                results['errors'].append(f"login {index}: {e}")
+            return
+        for i in range(options['requests']):
+            question = rng.choice(QUESTIONS)
+            if options['unique']:
+                # Question différente à chaque fois : pas de cache des réponses
+                question = f"{question} (session {index} question {i})"
+            try:
+                status, path, elapsed, first_token = ask(client, question, options['stream'])
+            except Exception as e:
+                status, path, elapsed, first_token = 0, 'error', None, None
+                with lock:
+                    results['errors'].append(str(e))
+            with lock:
+                results['status'][status] += 1
+                results['paths'][path] += 1
+                if elapsed is not None and status == 200:
+                    results['latencies'].append(elapsed)
+                    results['by_path'].setdefault(path, []).append(elapsed)
+                if first_token is not None:
+                    results['first_token'].append(first_token)
+
+def run_benchmark(options):
+    """Lancer toutes les sessions en parallèle et calculer le rapport"""
+    results = {'status': Counter(), 'paths': Counter(), 'latencies': [], 'by_path': {},
+               'first_token': [], 'errors': []}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=run_session, args=(index, options, results, lock))
+               for index in range(options['sessions'])]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    completed = sum(results['status'].values())
+    report = {
+        'url': options['url'],
+        'endpoint': '/api/chatbot/stream' if options['stream'] else '/api/chatbot/query',
+        'sessions': options['sessions'],
+        'requests': completed,
+        'duration_s': round(duration, 2),
+        'throughput_rps': round(completed / duration, 2) if duration else None,
+        'status': {str(status): count for status, count in results['status'].items()},
+        'paths': dict(results['paths']),
+        'latency_ms': latency_summary(results['latencies']),
+        'latency_by_path_ms': {path: latency_summary(values) for path, values in results['by_path'].items()},
+        'errors': results['errors'][:10]
+    }
+    if options['stream']:
+        report['first_token_ms'] = latency_summary(results['first_token'])
+
+    # Détail par étape mesuré par l'application (GET /api/chatbot/metrics)
+    try:
+        with httpx.Client(base_url=options['url'], timeout=options['timeout']) as client:
+            login(client, 'metrics')
+            report['server_stages_ms'] = client.get('/api/chatbot/metrics').json().get('stages_ms')
+    except Exception as e:
+        report['server_stages_ms'] = f"indisponible: {e}"
+    return report
+
+def print_report(report):
+    """Afficher le rapport de façon lisible"""
+    def line(label, summary):
+        if not summary.get('count'):
+            return f"   {label:<20} —"
+        return (f"   {label:<20} p50 {summary['p50']:>8.1f}  p95 {summary['p95']:>8.1f}  "
+                f"p99 {summary['p99']:>8.1f}  max {summary['max']:>8.1f}  ({summary['count']})")
+
+    print()
+    print(f"📊 {report['requests']} requêtes en {report['duration_s']} s → {report['throughput_rps']} req/s")
+    print(f"   Statuts: {report['status']}  Chemins: {report['paths']}")
+    print("⏱️ Latence (ms)")
+    print(line('total', report['latency_ms']))
+    for path, summary in sorted(report['latency_by_path_ms'].items()):
+        print(line(path, summary))
+    if 'first_token_ms' in report:
+        print(line('1er token', report['first_token_ms']))
+    if isinstance(report.get('server_stages_ms'), dict):
+        print("🔬 Étapes côté serveur (ms)")
+        for stage, summary in sorted(report['server_stages_ms'].items()):
+            summary.setdefault('max', summary.get('p99') or 0)
+            print(line(stage, summary))
+    for error in report['errors']:
+        print(f"   ❌ {error}")
+
+def parse_args(args):
+    """Options de la ligne de commande"""
+    def value(flag, default, cast=str):
+        return cast(args[args.index(flag) + 1]) if flag in args else default
+    return {
+        'url': value('--url', DEFAULT_URL),
+        'sessions': value('--sessions', 10, int),
+        'requests': value('--requests', 20, int),
+        'timeout': value('--timeout', 60, float),
+        'stream': '--stream' in args,
+        'unique': '--unique' in args,
+        'json': '--json' in args
+    }
+
+if __name__ == "__main__":
+    options = parse_args(sys.argv[1:])
+    print("🏋️ Benchmark du chatbot")
+    print("=" * 50)
+    print(f"   {options['sessions']} session(s) × {options['requests']} question(s) sur {options['url']}"
+          f"{' (streaming)' if options['stream'] else ''}")
+    report = run_benchmark(options)
+    if options['json']:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    sys.exit(0 if report['requests'] and not report['errors'] else 1)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Test de charge de bout en bout d'AYORA (sessions de réception simulées)
+Chaque session se connecte puis reproduit le travail d'un réceptionniste :
+tableau de bord, rafraîchissement des chambres toutes les 2 minutes et du statut
+système toutes les 30 secondes, navigation dans le calendrier, recherche de
+clients, arrivées/départs (changements de statut) et questions au chatbot.
+Le temps est accéléré par --speed (60 = une minute de travail par seconde).
+
+Par défaut l'application est démarrée dans ce processus, derrière un serveur à
+nombre de threads fixe (--threads, comme gunicorn --threads), sur le backend en
+mémoire (--backend fake) ou sur un enregistrement (--backend replay --replay-file).
+Le rapport donne le débit, p50/p95/p99 par route et les appels Supabase par
+requête. Avec --url, une instance déjà démarrée (ex: gunicorn) est testée, sans
+comptage des appels Supabase ; elle doit partager BENCH_AUTH_SECRET avec ce script
+(voir bench_chatbot.py).
+
+Usage : python bench_load.py [--sessions 20] [--duration 60] [--speed 60] [--threads 8]
+                             [--backend fake|replay] [--replay-file supabase_recording.jsonl]
+                             [--latency-ms 5] [--chatbot-rate 0.1] [--url http://127.0.0.1:5003]
+                             [--rooms 120] [--years 3] [--clients 20000] [--seed 42] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import logging
+import threading
+import contextlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import httpx
+
+from bench_chatbot import QUESTIONS, latency_summary, login
+from bench_routes import prepare_environment
+
+ROOMS_POLL_S = 120          # dashboard.js : loadRoomsStatus
+SYSTEM_STATUS_POLL_S = 30   # main_pro.js : checkSystemStatus
+THINK_TIME_S = 20           # temps moyen entre deux actions d'un réceptionniste
+
+# Actions d'une session et leur poids (le chatbot a son propre taux, --chatbot-rate)
+ACTIONS = {
+    'calendar': 25,
+    'client_search': 25,
+    'arrival_departure': 10,
+    'reservations': 10,
+    'clients_actuels': 10,
+    'dashboard': 10,
+}
+
+# ============================================================================
+# CÔTÉ SERVEUR (MODE INTÉGRÉ)
+# ============================================================================
+
+_request_state = threading.local()
+
+class CountingTransport(httpx.BaseTransport):
+    """Compte les appels Supabase de la requête HTTP en cours (thread courant)"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def handle_request(self, request):
+        if getattr(_request_state, 'calls', None) is not None:
+            _request_state.calls += 1
+        return self.inner.handle_request(request)
+
+class ServerStats:
+    """Appels Supabase par route, relevés par le middleware WSGI"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def middleware(self, wsgi_app):
+        def counted_app(environ, start_response):
+            _request_state.calls = 0
+            body = None
+            try:
+                # Corps produit entièrement ici : les appels du rendu sont comptés
+                body = wsgi_app(environ, start_response)
+                return list(body)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+                label = environ.get('HTTP_X_LOAD_LABEL') or f"{environ['REQUEST_METHOD']} {environ['PATH_INFO']}"
+                with self.lock:
+                    self.calls.setdefault(label, []).append(_request_state.calls)
+                _request_state.calls = None
+        return counted_app
+
+def start_server(options, stats):
+    """Démarrer l'application (backend fake ou replay) derrière un pool de threads"""
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """Serveur WSGI avec un nombre fixe de threads (équivalent de gunicorn --threads)"""
+
+        def __init__(self, host, port, wsgi_app, threads):
+            super().__init__(host, port, wsgi_app)
+            self.pool = ThreadPoolExecutor(threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.process_request_thread, request, client_address)
+
+        def process_request_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    if options['backend'] == 'replay':
+        os.environ['SUPABASE_BACKEND'] = 'replay'
+        os.environ['SUPABASE_REPLAY_FILE'] = options['replay_file']
+        os.environ['SUPABASE_REPLAY_LATENCY_SCALE'] = str(options['latency_scale'])
+        generated = None
+    else:
+        generated = prepare_environment(options)
+        os.environ['SUPABASE_FAKE_LATENCY_MS'] = str(options['latency_ms'])
+    os.environ['WEB_THREADS'] = str(options['threads'])  # limites du chatbot calées sur le pool
+    os.environ.setdefault('BENCH_AUTH_SECRET', secrets.token_hex(32))  # connexion des sessions simulées
+
+    import app as app_module
+    from fake_supabase import use_postgrest_transport
+
+    use_postgrest_transport(app_module.supabase, CountingTransport(app_module.supabase.postgrest_transport))
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = PooledWSGIServer('127.0.0.1', 0, stats.middleware(app_module.app.wsgi_app), options['threads'])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", generated
+
+# ============================================================================
+# SESSIONS DE RÉCEPTION
+# ============================================================================
+
+def month_range(day, offset):
+    """Période chargée par le calendrier du tableau de bord (mois -1 à mois +1)"""
+    month_index = day.year * 12 + day.month - 1 + offset
+    first = date(month_index // 12, month_index % 12 + 1, 1)
+    previous = date((month_index - 1) // 12, (month_index - 1) % 12 + 1, 1)
+    after_next = date((month_index + 2) // 12, (month_index + 2) % 12 + 1, 1)
+    return first, previous - timedelta(days=6), after_next + timedelta(days=6)
+
+class FrontDeskSession:
+    """Un réceptionniste : enchaîne les actions avec des temps de réflexion"""
+
+    def __init__(self, index, url, options, results):
+        self.index = index
+        self.options = options
+        self.results = results
+        self.rng = random.Random(options['seed'] * 1000 + index)
+        self.client = httpx.Client(base_url=url, timeout=options['timeout'])
+        self.guests = []
+
+    def request(self, label, method, path, **kwargs):
+        """Requête HTTP mesurée, regroupée sous le libellé de la route"""
+        started = time.perf_counter()
+        try:
+            response = self.client.request(method, path, headers={'X-Load-Label': label}, **kwargs)
+            status = response.status_code
+        except Exception as e:
+            response, status = None, 0
+            self.results.error(f"{label}: {e}")
+        self.results.record(label, status, (time.perf_counter() - started) * 1000)
+        return response if status and status < 400 else None
+
+    def json(self, label, method, path, **kwargs):
+        response = self.request(label, method, path, **kwargs)
+        try:
+            return response.json() if response is not None else None
+        except ValueError:
+            return None
+
+    # --- Actions ---
+
+    def dashboard(self):
+        today = date.today()
+        _, start, end = month_range(today, 0)
+        self.request('GET /', 'GET', '/')
+        self.request('GET /api/briefing/today', 'GET', '/api/briefing/today')
+        self.request('GET /api/departures/today', 'GET', '/api/departures/today')
+        self.request('GET /api/rooms/status', 'GET', '/api/rooms/status')
+        self.request('GET /api/system/status', 'GET', '/api/system/status')
+        self.request('GET /api/calendar/range', 'GET', f'/api/calendar/range?from={start}&to={end}')
+        day = self.json('GET /api/calendar/day/<day>', 'GET', f'/api/calendar/day/{today.isoformat()}')
+        if day:
+            self.guests = day.get('guests') or self.guests
+
+    def calendar(self):
+        first, start, end = month_range(date.today(), self.rng.randint(-3, 3))
+        self.request('GET /api/calendar/range', 'GET', f'/api/calendar/range?from={start}&to={end}')
+        day = first + timedelta(days=self.rng.randint(0, 27))
+        self.request('GET /api/calendar/day/<day>', 'GET', f'/api/calendar/day/{day.isoformat()}')
+
+    def client_search(self):
+        guest = self.rng.choice(self.guests) if self.guests else None
+        name = (guest or {}).get('client_name') or self.rng.choice(['martin', 'rossi', 'smith', 'dubois'])
+        term = name.split()[0][:self.rng.randint(3, 6)].lower()
+        self.request('GET /clients?search', 'GET', '/clients', params={'search': term})
+        if guest and guest.get('client_id'):
+            self.request('GET /client/<id>', 'GET', f"/client/{guest['client_id']}")
+
+    def arrival_departure(self):
+        if not self.guests:
+            return
+        guest = self.rng.choice(self.guests)
+        reservation_id = guest['reservation_id']
+        self.request('GET /reservation/<id>', 'GET', f'/reservation/{reservation_id}')
+        status = 'terminee' if guest.get('departure') == date.today().isoformat() else 'en_cours'
+        self.request('PUT /api/reservations/<id>/status', 'PUT', f'/api/reservations/{reservation_id}/status',
+                     json={'status': status})
+
+    def reservations(self):
+        self.request('GET /reservations', 'GET', '/reservations', params={'page': self.rng.randint(1, 5)})
+
+    def clients_actuels(self):
+        self.request('GET /clients-actuels', 'GET', '/clients-actuels')
+
+    def chatbot(self):
+        self.request('POST /api/chatbot/query', 'POST', '/api/chatbot/query',
+                     json={'question': self.rng.choice(QUESTIONS)})
+
+    # --- Déroulement ---
+
+    def think_time(self):
+        return self.rng.expovariate(1 / THINK_TIME_S) / self.options['speed']
+
+    def run(self, deadline):
+        try:
+            login(self.client, f"load{self.index}")
+        except Exception as e:
+            self.results.error(f"login {self.index}: {e}")
+            return
+        self.dashboard()
+        now = time.perf_counter()
+        next_rooms = now + ROOMS_POLL_S / self.options['speed']
+        next_status = now + SYSTEM_STATUS_POLL_S / self.options['speed']
+        next_action = now + self.think_time()
+        names, weights = list(ACTIONS), list(ACTIONS.values())
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now >= next_rooms:
+                self.request('GET /api/rooms/status', 'GET', '/api/rooms/status')
+                next_rooms += ROOMS_POLL_S / self.options['speed']
+            if now >= next_status:
+                self.request('GET /api/system/status', 'GET', '/api/system/status')
+                next_status += SYSTEM_STATUS_POLL_S / self.options['speed']
+            if now >= next_action:
+                if self.rng.random() < self.options['chatbot_rate']:
+                    self.chatbot()
+                else:
+                    getattr(self, self.rng.choices(names, weights)[0])()
+                next_action = time.perf_counter() + self.think_time()
+            time.sleep(max(0, min(next_rooms, next_status, next_action, deadline) - time.perf_counter()))
+        self.client.close()
+
+class LoadResults:
+    """Mesures côté client, partagées par toutes les sessions"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.status = {}
+        self.errors = []
+
+    def record(self, label, status, elapsed_ms):
+        with self.lock:
+            self.status.setdefault(label, Counter())[status] += 1
+            if status and status < 400:
+                self.latencies.setdefault(label, []).append(elapsed_ms)
+
+    def error(self, message):
+        with self.lock:
+            self.errors.append(message)
+
+# ============================================================================
+# RAPPORT
+# ============================================================================
+
+def run_load_test(options):
+    """Démarrer le serveur (mode intégré), lancer les sessions et calculer le rapport"""
+    stats, server, generated = ServerStats(), None, None
+    with contextlib.ExitStack() as stack:
+        if not options['verbose']:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        if options['url']:
+            url = options['url']
+        else:
+            server, url, generated = start_server(options, stats)
+
+        results = LoadResults()
+        started = time.perf_counter()
+        deadline = started + options['duration']
+        sessions = [FrontDeskSession(index, url, options, results) for index in range(options['sessions'])]
+        threads = [threading.Thread(target=session.run, args=(deadline,)) for session in sessions]
+        for thread in threads:
+            thread.start()
+            time.sleep(min(0.05, options['duration'] / 100))  # arrivée progressive des sessions
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+
+        if server:
+            server.shutdown()
+        if generated:
+            os.unlink(generated)
+
+    total = sum(sum(counter.values()) for counter in results.status.values())
+    routes = {}
+    for label in sorted(results.status):
+        calls = stats.calls.get(label)
+        routes[label] = dict(
+            latency_summary(results.latencies.get(label, [])),
+            requests=sum(results.status[label].values()),
+            errors=sum(count for status, count in results.status[label].items() if not status or status >= 400),
+            supabase_calls=round(sum(calls) / len(calls), 1) if calls else None,
+            supabase_calls_max=max(calls) if calls else None,
+        )
+    all_calls = [count for calls in stats.calls.values() for count in calls]
+    return {
+        'url': options['url'] or f"intégré ({options['backend']}, {options['threads']} threads)",
+        'sessions': options['sessions'],
+        'duration_s': round(duration, 1),
+        'speed': options['speed'],
+        'requests': total,
+        'throughput_rps': round(total / duration, 2) if duration else None,
+        'errors': sum(route['errors'] for route in routes.values()),
+        'supabase_calls_per_request': round(sum(all_calls) / len(all_calls), 1) if all_calls else None,
+        'latency_ms': latency_summary([value for values in results.latencies.values() for value in values]),
+        'routes': routes,
+        'error_messages': results.errors[:10],
+    }
+
+def print_report(report):
+    """Afficher le rapport de façon lisible"""
+    print()
+    print(f"🏨 {report['sessions']} session(s) sur {report['url']}, {report['duration_s']} s (×{report['speed']})")
+    print(f"📊 {report['requests']} requêtes → {report['throughput_rps']} req/s, {report['errors']} erreur(s), "
+          f"{report['supabase_calls_per_request'] if report['supabase_calls_per_request'] is not None else '—'} appel(s) Supabase/requête")
+    print(f"   {'route':<36} {'nb':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'supabase':>9}")
+    for label, route in sorted(report['routes'].items(), key=lambda item: -item[1]['requests']):
+        if not route.get('count'):
+            print(f"   {label[:36]:<36} {route['requests']:>6} {route['errors']:>4}        —")
+            continue
+        calls = '—' if route['supabase_calls'] is None else f"{route['supabase_calls']}"
+        print(f"   {label[:36]:<36} {route['requests']:>6} {route['errors']:>4} {route['p50']:>8.1f} {route['p95']:>8.1f} "
+              f"{route['p99']:>8.1f} {route['max']:>8.1f} {calls:>9}")
+    for message in report['error_messages']:
+        print(f"   ❌ {message}")
+
+def parse_args(args):
+    """Options de la ligne de commande"""
+    def value(flag, default, cast=str):
+        return cast(args[args.index(flag) + 1]) if flag in args else default
+    return {
+        'sessions': value('--sessions', 20, int),
+        'duration': value('--duration', 60, float),
+        'speed': value('--speed', 60, float),
+        'threads': value('--threads', 8, int),
+        'timeout': value('--timeout', 60, float),
+        'backend': value('--backend', 'fake'),
+        'replay_file': value('--replay-file', 'supabase_recording.jsonl'),
+        'latency_scale': value('--latency-scale', 1, float),
+        'latency_ms': value('--latency-ms', 5, float),
+        'chatbot_rate': value('--chatbot-rate', 0.1, float),
+        'url': value('--url', None),
+        'rooms': value('--rooms', 120, int),
+        'years': value('--years', 3, int),
+        'clients': value('--clients', 20000, int),
+        'seed': value('--seed', 42, int),
+        'data': value('--data', None),
+        'verbose': '--verbose' in args,
+        'json': '--json' in args,
+    }
+
+if __name__ == "__main__":
+    options = parse_args(sys.argv[1:])
+    print("🏋️ Test de charge (sessions de réception)")
+    print("=" * 50)
+    report = run_load_test(options)
+    if options['json']:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    sys.exit(0 if report['requests'] and not report['errors'] else 1)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Benchmark des routes et des fonctions de données d'AYORA
+L'application est chargée avec le backend Supabase en mémoire (fake_supabase.py)
+rempli par un hôtel synthétique (synthetic_hotel.py) : aucune donnée de production
+n'est lue. Chaque route GET et chaque fonction de données est exécutée plusieurs
+fois, cache vidé (sauf --warm), pour une ou plusieurs latences réseau simulées.
+Le rapport donne p50/p95/max, le nombre d'appels Supabase par exécution et les
+requêtes répétées à l'identique (N+1) relevées par le traçage de app.py. Les routes
+de QUERY_BUDGETS sont ensuite vérifiées une fois, cache vidé, avec assert_max_queries :
+un dépassement (régression N+1) fait échouer le script.
+
+Usage : python bench_routes.py [--rooms 120] [--years 3] [--clients 20000] [--seed 42]
+                               [--data hotel.json] [--latency-ms 0,5,20]
+                               [--iterations 5] [--only calendar] [--warm]
+                               [--verbose] [--json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import contextlib
+from datetime import date, timedelta
+
+from synthetic_hotel import generate_hotel
+from bench_chatbot import latency_summary
+
+# Nombre maximal d'appels Supabase par route (et ses sous-chemins), cache vidé
+QUERY_BUDGETS = {
+    '/api/rooms/status': 3,     # réservations en cours + clients par lots de 100 (120 chambres)
+    '/api/system/status': 2,
+    '/api/calendar/range': 3,
+    '/api/calendar/day': 3,
+    '/clients': 2,
+}
+
+def prepare_environment(options):
+    """Variables d'environnement à définir avant d'importer app.py"""
+    os.environ['SUPABASE_BACKEND'] = 'fake'
+    os.environ.setdefault('BRIEFING_LLM', 'false')  # pas d'appel OpenAI pendant le benchmark
+    if options['data']:
+        os.environ['SUPABASE_FAKE_DATA'] = options['data']
+        return None
+    tables = generate_hotel(rooms=options['rooms'], years=options['years'],
+                            clients=options['clients'], seed=options['seed'])
+    handle = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8')
+    with handle:
+        json.dump(tables, handle, ensure_ascii=False)
+    os.environ['SUPABASE_FAKE_DATA'] = handle.name
+    return handle.name
+
+def sample_ids(store):
+    """Un client et une réservation en cours pour les pages de détail"""
+    reservations = store.rows('reservations').values()
+    current = next((r for r in reservations if r.get('statut') == 'en_cours'), None) or next(iter(reservations))
+    return current['client_principal_id'], current['resv_name_id']
+
+def build_cases(app_module):
+    """(nom, fonction) pour chaque route et chaque fonction de données mesurée"""
+    store = app_module.supabase.fake_transport.store
+    client_id, resv_name_id = sample_ids(store)
+    today = date.today()
+    month_end = today + timedelta(days=30)
+
+    routes = [
+        '/', '/clients', '/clients?search=martin', '/clients-actuels', '/reservations',
+        '/reservations?search=10', f'/client/{client_id}', f'/reservation/{resv_name_id}',
+        f'/api/client/{client_id}', f'/api/reservation/{resv_name_id}',
+        f'/api/calendar/{today.year}/{today.month}',
+        f'/api/calendar/range?from={today.isoformat()}&to={month_end.isoformat()}',
+        f'/api/calendar/day/{today.isoformat()}', '/api/departures/today', '/api/rooms/status',
+        '/api/system/status', '/settings', '/api/search/preferences?q=allergie',
+        '/api/briefing/today', '/api/chatbot/metrics', '/debug/rooms',
+    ]
+    helpers = {
+        'get_dashboard_stats': lambda: app_module.get_dashboard_stats(),
+        'get_reservations_jour_with_clients': lambda: app_module.get_reservations_jour_with_clients(),
+        'get_departures_jour_with_clients': lambda: app_module.get_departures_jour_with_clients(),
+        'get_clients': lambda: app_module.get_clients('', 1, 20),
+        'get_clients(search)': lambda: app_module.get_clients('martin', 1, 20),
+        'get_reservations': lambda: app_module.get_reservations('', 1, 20),
+        'get_reservations_actuelles': lambda: app_module.get_reservations_actuelles(),
+        'get_calendar_data': lambda: app_module.get_calendar_data(today.year, today.month),
+        'get_calendar_range_counts': lambda: app_module.get_calendar_range_counts(today, month_end),
+        'get_calendar_day_details': lambda: app_module.get_calendar_day_details(today),
+        'get_reservations_par_client': lambda: app_module.get_reservations_par_client(client_id),
+        'get_current_clients_info_raw': lambda: app_module.get_current_clients_info_raw(),
+        'get_vip_info_raw': lambda: app_module.get_vip_info_raw(),
+        'get_allergies_info_raw': lambda: app_module.get_allergies_info_raw(),
+        'get_briefing_data': lambda: app_module.fetch_briefing_data(),
+    }
+
+    client = logged_in_client(app_module)
+
+    def get(path):
+        def call():
+            response = client.get(path)
+            if response.status_code >= 400:
+                raise RuntimeError(f"HTTP {response.status_code}")
+        return call
+
+    return [(f"GET {path}", get(path)) for path in routes] + [(name, call) for name, call in helpers.items()]
+
+def logged_in_client(app_module):
+    """Client de test Flask avec une session du personnel"""
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 'bench-user'
+        session['user_email'] = 'bench@layana.com'
+        session['user_name'] = 'Bench'
+    return client
+
+def check_query_budgets(app_module, cases):
+    """Vérifier QUERY_BUDGETS sur les routes mesurées : liste des dépassements"""
+    client = logged_in_client(app_module)
+    failures = []
+    for name, _ in cases:
+        method, _, path = name.partition(' ')
+        budgets = [budget for route, budget in QUERY_BUDGETS.items()
+                   if method == 'GET' and (path == route or path.startswith((route + '/', route + '?')))]
+        if not budgets:
+            continue
+        budget = budgets[0]
+        app_module.clear_cache()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                app_module.assert_max_queries(client, path, budget)
+        except AssertionError as e:
+            failures.append(str(e))
+    return failures
+
+def measure(app_module, name, call, options):
+    """Exécuter un cas plusieurs fois : durées (ms), appels Supabase et formes répétées (N+1)"""
+    durations, calls, error, repeated = [], [], None, []
+    for _ in range(options['iterations']):
+        if not options['warm']:
+            app_module.clear_cache()
+        output = contextlib.nullcontext() if options['verbose'] else contextlib.redirect_stdout(io.StringIO())
+        started = time.perf_counter()
+        try:
+            with output, app_module.capture_supabase_queries() as queries:
+                call()
+        except Exception as e:
+            error = str(e)
+        durations.append((time.perf_counter() - started) * 1000)
+        calls.append(len(queries))
+        repeated = app_module.find_n_plus_one(queries)
+    return dict(latency_summary(durations), name=name, calls=round(sum(calls) / len(calls), 1),
+                n_plus_one=repeated[:3], error=error)
+
+def run_benchmark(options):
+    """Mesurer tous les cas pour chaque latence simulée"""
+    import app as app_module
+
+    cases = build_cases(app_module)
+    if options['only']:
+        cases = [(name, call) for name, call in cases if options['only'] in name]
+    transport = app_module.supabase.fake_transport
+    report = {'tables': transport.store.counts(), 'iterations': options['iterations'],
+              'warm': options['warm'], 'runs': []}
+    for latency in options['latencies']:
+        transport.latency_ms = latency
+        results = [measure(app_module, name, call, options) for name, call in cases]
+        report['runs'].append({'latency_ms': latency, 'results': results})
+    transport.latency_ms = 0
+    report['budget_failures'] = check_query_budgets(app_module, cases)
+    return report
+
+def print_report(report):
+    """Afficher le rapport de façon lisible"""
+    print(f"🏨 Données: {report['tables']}")
+    print(f"   {report['iterations']} exécution(s) par cas, cache {'conservé' if report['warm'] else 'vidé'}")
+    for run in report['runs']:
+        print()
+        print(f"⏱️ Latence Supabase simulée: {run['latency_ms']} ms")
+        print(f"   {'cas':<60} {'p50':>9} {'p95':>9} {'max':>9} {'appels':>7}")
+        for result in run['results']:
+            line = (f"   {result['name'][:60]:<60} {result['p50']:>9.1f} {result['p95']:>9.1f} "
+                    f"{result['max']:>9.1f} {result['calls']:>7}")
+            print(line + (f"  ❌ {result['error']}" if result['error'] else ''))
+            for shape, count in result['n_plus_one']:
+                print(f"      ⚠️ N+1 {count}× {shape[:100]}")
+    print()
+    if report['budget_failures']:
+        print("❌ Budgets d'appels Supabase dépassés")
+        for failure in report['budget_failures']:
+            print(f"   {failure}")
+    else:
+        print("✅ Budgets d'appels Supabase respectés")
+
+def parse_args(args):
+    """Options de la ligne de commande"""
+    def value(flag, default, cast=str):
+        return cast(args[args.index(flag) + 1]) if flag in args else default
+    return {
+        'rooms': value('--rooms', 120, int),
+        'years': value('--years', 3, int),
+        'clients': value('--clients', 20000, int),
+        'seed': value('--seed', 42, int),
+        'data': value('--data', None),
+        'latencies': [float(latency) for latency in value('--latency-ms', '0').split(',')],
+        'iterations': value('--iterations', 5, int),
+        'only': value('--only', None),
+        'warm': '--warm' in args,
+        'verbose': '--verbose' in args,
+        'json': '--json' in args,
+    }
+
+if __name__ == "__main__":
+    options = parse_args(sys.argv[1:])
+    print("🏋️ Benchmark des routes")
+    print("=" * 50)
+    generated = prepare_environment(options)
+    try:
+        report = run_benchmark(options)
+    finally:
+        if generated:
+            os.unlink(generated)
+    if options['json']:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    errors = [result for run in report['runs'] for result in run['results'] if result['error']]
+    sys.exit(0 if not errors and not report['budget_failures'] else 1)
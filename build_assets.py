@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Script de build des fichiers statiques (CSS/JS)
+Minifie, ajoute une empreinte (hash) au nom des fichiers et précompresse en .gz/.br
+Les fichiers générés sont écrits dans static/dist/ avec un manifest.json utilisé par app.py
+"""
+
+import os
+import re
+import json
+import gzip
+import hashlib
+import shutil
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : seuls les .gz seront générés
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+ASSET_DIRS = ['css', 'js']
+
+def minify_css(source):
+    """Minifier une feuille de style (commentaires et espaces superflus)"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    source = source.replace(';}', '}')
+    return source.strip()
+
+def minify_js(source):
+    """Minifier un script de façon conservatrice
+
+    Seuls les commentaires occupant une ligne entière, l'indentation et les
+    lignes vides sont supprimés : les chaînes, templates et expressions
+    régulières ne sont jamais réécrits.
+    """
+    lines = []
+    in_block_comment = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_block_comment:
+            if '*/' in stripped:
+                in_block_comment = False
+            continue
+        if stripped.startswith('/*') and not stripped.startswith('/**/'):
+            if '*/' not in stripped:
+                in_block_comment = True
+                continue
+            if stripped.endswith('*/'):
+                continue
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+def fingerprint(content):
+    """Empreinte courte du contenu pour le nom du fichier"""
+    return hashlib.sha256(content).hexdigest()[:12]
+
+def precompress(path, content):
+    """Écrire les variantes précompressées .gz et .br à côté du fichier"""
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9))
+    if brotli:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+
+def build_assets():
+    """Construire tous les fichiers CSS/JS et écrire le manifest"""
+    print("🔨 Build des fichiers statiques")
+    print("=" * 50)
+
+    # Repartir d'un dossier propre pour ne pas accumuler d'anciennes versions
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    total_source = 0
+    total_output = 0
+
+    for asset_dir in ASSET_DIRS:
+        source_dir = os.path.join(STATIC_DIR, asset_dir)
+        if not os.path.isdir(source_dir):
+            continue
+
+        # Parcours récursif (ex: js/pages/dashboard.js)
+        sources = []
+        for root, _, filenames in os.walk(source_dir):
+            for filename in filenames:
+                relative = os.path.relpath(os.path.join(root, filename), STATIC_DIR).replace(os.sep, '/')
+                sources.append(relative)
+
+        for relative in sorted(sources):
+            subdir, filename = relative.rsplit('/', 1)
+            name, ext = os.path.splitext(filename)
+            if ext not in ('.css', '.js'):
+                continue
+
+            with open(os.path.join(STATIC_DIR, relative), 'r', encoding='utf-8') as f:
+                source = f.read()
+
+            minified = minify_css(source) if ext == '.css' else minify_js(source)
+            content = minified.encode('utf-8')
+
+            hashed_name = f"{name}.{fingerprint(content)}{ext}"
+            output_dir = os.path.join(DIST_DIR, subdir)
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = os.path.join(output_dir, hashed_name)
+
+            with open(output_path, 'wb') as f:
+                f.write(content)
+            precompress(output_path, content)
+
+            manifest[relative] = f"dist/{subdir}/{hashed_name}"
+
+            source_size = len(source.encode('utf-8'))
+            gz_size = os.path.getsize(output_path + '.gz')
+            total_source += source_size
+            total_output += gz_size
+            print(f"   ✅ {relative} → dist/{subdir}/{hashed_name} "
+                  f"({source_size // 1024} Ko → {len(content) // 1024} Ko, gzip {gz_size // 1024} Ko)")
+
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print()
+    print(f"📦 {len(manifest)} fichier(s) générés dans static/dist/")
+    print(f"📉 Total: {total_source // 1024} Ko → {total_output // 1024} Ko (gzip)")
+    if not brotli:
+        print("⚠️ Module brotli absent : variantes .br non générées")
+
+if __name__ == "__main__":
+    build_assets()
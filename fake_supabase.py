@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Backend Supabase en mémoire, compatible PostgREST
+Les requêtes construites par supabase-py (select, eq, in_, or_, ilike, gte, not_.is_,
+order, limit, range, count, insert, update, upsert, delete, chemins JSON col->>cle)
+sont interprétées par un transport httpx au lieu d'être envoyées sur le réseau : le
+code de app.py est exécuté tel quel, sans projet Supabase, avec une latence réseau
+simulée configurable.
+Comme PostgREST sur Supabase, une lecture renvoie au plus max_rows lignes (1000 par
+défaut, SUPABASE_FAKE_MAX_ROWS) même sans limit : les lectures non paginées de
+l'application sont tronquées comme en production.
+
+Utilisé par l'application avec SUPABASE_BACKEND=fake (données de SUPABASE_FAKE_DATA
+ou hôtel synthétique de synthetic_hotel.py) et par bench_routes.py.
+
+Les scripts test_*.py chargent l'application avec load_test_app().
+
+Usage : python fake_supabase.py [--data hotel.json] — affiche le contenu des tables
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import httpx
+import jwt
+from postgrest.utils import SyncClient as PostgrestSession
+from supabase import create_client
+
+FAKE_SUPABASE_URL = 'http://fake-supabase.local'
+
+# Clé primaire des tables (colonnes séparées par des virgules), 'id' par défaut
+PRIMARY_KEYS = {
+    'clients': 'id',
+    'reservations': 'resv_name_id',
+    'ai_context_snapshots': 'hash',
+    'ai_daily_briefings': 'briefing_date,language',
+}
+
+# max-rows de PostgREST (valeur par défaut des projets Supabase)
+DEFAULT_MAX_ROWS = 1000
+
+FILTER_OPERATORS = ('eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'is', 'in')
+RESERVED_PARAMS = ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns')
+
+class FakePostgrestError(Exception):
+    """Erreur renvoyée au client au format PostgREST (APIError côté supabase-py)"""
+    def __init__(self, status, code, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.payload = {'code': code, 'message': message, 'details': details, 'hint': None}
+
+# ============================================================================
+# STOCKAGE
+# ============================================================================
+
+class FakeStore:
+    """Tables en mémoire indexées par clé primaire (créées au premier accès)"""
+
+    def __init__(self, tables=None):
+        self.lock = threading.RLock()
+        self.tables = {}
+        for name, rows in (tables or {}).items():
+            self.insert(name, rows)
+
+    @classmethod
+    def from_json(cls, path):
+        """Charger des tables depuis un fichier JSON {table: [lignes]}"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def dump(self, path):
+        """Écrire toutes les tables dans un fichier JSON"""
+        with self.lock:
+            data = {name: list(rows.values()) for name, rows in self.tables.items()}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def primary_key(self, table):
+        return PRIMARY_KEYS.get(table, 'id').split(',')
+
+    def rows(self, table):
+        """Lignes d'une table (dictionnaire clé primaire -> ligne)"""
+        return self.tables.setdefault(table, {})
+
+    def row_key(self, table, row, columns=None):
+        return tuple(str(row.get(column)) for column in columns or self.primary_key(table))
+
+    def prepare_row(self, table, row):
+        """Valeurs par défaut de la base : id auto-incrémenté et created_at"""
+        row = dict(row)
+        rows = self.rows(table)
+        if self.primary_key(table) == ['id'] and row.get('id') is None:
+            existing = [r['id'] for r in rows.values() if r.get('id') is not None]
+            if existing and not all(isinstance(value, int) for value in existing):
+                row['id'] = str(uuid.uuid4())
+            else:
+                row['id'] = (max(existing) if existing else 0) + 1
+        row.setdefault('created_at', datetime.now().isoformat())
+        return row
+
+    def insert(self, table, rows, on_conflict=None, resolution=None):
+        """Insérer des lignes ; resolution 'merge' ou 'ignore' pour un upsert"""
+        written = []
+        with self.lock:
+            table_rows = self.rows(table)
+            conflict_columns = on_conflict.split(',') if on_conflict else None
+            for values in rows:
+                row = self.prepare_row(table, values)
+                existing = self.find_conflict(table, row, conflict_columns)
+                if existing is None:
+                    table_rows[self.row_key(table, row)] = row
+                    written.append(row)
+                elif resolution == 'merge':
+                    existing.update(values)  # les valeurs par défaut ne remplacent pas l'existant
+                    written.append(existing)
+                elif resolution != 'ignore':
+                    raise FakePostgrestError(409, '23505', 'duplicate key value violates unique constraint',
+                                             f"Key ({','.join(conflict_columns or self.primary_key(table))}) already exists.")
+        return written
+
+    def find_conflict(self, table, row, columns):
+        table_rows = self.rows(table)
+        if not columns or columns == self.primary_key(table):
+            return table_rows.get(self.row_key(table, row))
+        key = self.row_key(table, row, columns)
+        return next((r for r in table_rows.values() if self.row_key(table, r, columns) == key), None)
+
+    def update(self, table, rows, values):
+        """Mettre à jour des lignes (la clé primaire peut changer)"""
+        with self.lock:
+            table_rows = self.rows(table)
+            for row in rows:
+                old_key = self.row_key(table, row)
+                row.update(values)
+                new_key = self.row_key(table, row)
+                if new_key != old_key:
+                    table_rows.pop(old_key, None)
+                    table_rows[new_key] = row
+        return rows
+
+    def delete(self, table, rows):
+        with self.lock:
+            table_rows = self.rows(table)
+            for row in rows:
+                table_rows.pop(self.row_key(table, row), None)
+        return rows
+
+    def counts(self):
+        """Nombre de lignes par table"""
+        with self.lock:
+            return {name: len(rows) for name, rows in self.tables.items()}
+
+# ============================================================================
+# FILTRES POSTGREST
+# ============================================================================
+
+def split_top_level(text, separator=','):
+    """Découper une liste PostgREST en respectant parenthèses et guillemets"""
+    parts, depth, quoted, current = [], 0, False, ''
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == separator and depth == 0 and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    parts.append(current)
+    return [part for part in parts if part != '']
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+def parse_condition(expression):
+    """'not.ilike.%x%' -> (négation, opérateur, opérande)"""
+    negate = expression.startswith('not.')
+    if negate:
+        expression = expression[4:]
+    operator, _, operand = expression.partition('.')
+    if operator not in FILTER_OPERATORS:
+        raise FakePostgrestError(400, 'PGRST100', f'opérateur non supporté: {operator}')
+    # Opérande préparé une seule fois pour toutes les lignes
+    if operator == 'in':
+        operand = frozenset(unquote(item) for item in split_top_level(operand.strip('()')))
+    elif operator in ('like', 'ilike'):
+        operand = re.compile(like_to_regex(unquote(operand)), re.I | re.S if operator == 'ilike' else re.S)
+    else:
+        operand = unquote(operand)
+    return negate, operator, operand
+
+def parse_logic_group(operator, body):
+    """or=(a.eq.1,and(b.gt.2,c.is.null)) -> arbre de conditions"""
+    terms = []
+    for term in split_top_level(body[1:-1] if body.startswith('(') else body):
+        negate = term.startswith('not.')
+        if negate:
+            term = term[4:]
+        match = re.match(r'^(or|and)(\(.*\))$', term)
+        if match:
+            node = parse_logic_group(*match.groups())
+        else:
+            column, _, condition = term.partition('.')
+            node = ('filter', column, parse_condition(condition))
+        terms.append(('not', node) if negate else node)
+    return (operator, terms)
+
+def parse_filters(params):
+    """Paramètres de requête -> liste de conditions (toutes combinées en ET)"""
+    filters = []
+    for key, value in params.multi_items():
+        if key in RESERVED_PARAMS:
+            continue
+        if key in ('or', 'and', 'not.or', 'not.and'):
+            node = parse_logic_group(key.replace('not.', ''), value)
+            filters.append(('not', node) if key.startswith('not.') else node)
+        else:
+            filters.append(('filter', key, parse_condition(value)))
+    return filters
+
+def coerce(value, operand):
+    """Convertir l'opérande texte dans le type de la valeur stockée"""
+    if isinstance(value, bool):
+        return operand.lower() == 'true'
+    if isinstance(value, (int, float)):
+        try:
+            number = float(operand)
+        except ValueError:
+            return operand
+        return int(number) if number.is_integer() else number
+    return operand
+
+def as_text(value):
+    """Valeur stockée telle qu'écrite dans une URL PostgREST"""
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+def like_to_regex(pattern):
+    pattern = pattern.replace('*', '%')
+    return '^' + ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in pattern) + '$'
+
+def compare(value, operator, operand):
+    """Évaluer une condition PostgREST sur une valeur"""
+    if operator == 'is':
+        expected = {'null': None, 'true': True, 'false': False}.get(operand.lower(), operand)
+        return value is expected if expected is None else value == expected
+    if value is None:
+        return False  # NULL ne satisfait aucune comparaison en SQL
+    if operator == 'in':
+        return as_text(value) in operand
+    if operator in ('like', 'ilike'):
+        return operand.match(str(value)) is not None
+    expected = coerce(value, operand)
+    if isinstance(value, (dict, list)):
+        value, expected = json.dumps(value), operand
+    try:
+        return {
+            'eq': value == expected,
+            'neq': value != expected,
+            'gt': value > expected,
+            'gte': value >= expected,
+            'lt': value < expected,
+            'lte': value <= expected,
+        }[operator]
+    except TypeError:
+        return False
+
+def column_value(row, column):
+    """Valeur d'une colonne ou d'un chemin JSON ('context_data->>cle', '->' garde le JSON)"""
+    name, *path = re.split(r'(->>?)', column)
+    value = row.get(name.strip())
+    for arrow, key in zip(path[::2], path[1::2]):
+        value = value.get(key.strip()) if isinstance(value, dict) else None
+        if arrow == '->>' and isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        elif arrow == '->>' and value is not None:
+            value = as_text(value)
+    return value
+
+def matches(row, node):
+    kind = node[0]
+    if kind == 'filter':
+        _, column, (negate, operator, operand) = node
+        return compare(column_value(row, column), operator, operand) != negate
+    if kind == 'not':
+        return not matches(row, node[1])
+    if kind == 'or':
+        return any(matches(row, child) for child in node[1])
+    return all(matches(row, child) for child in node[1])
+
+def sort_rows(rows, order):
+    """order=col.desc.nullslast,col2 (PostgREST : NULLS LAST en ASC, FIRST en DESC)"""
+    for term in reversed(split_top_level(order)):
+        column, *modifiers = term.split('.')
+        descending = 'desc' in modifiers
+        nulls_first = 'nullsfirst' in modifiers or (descending and 'nullslast' not in modifiers)
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: row[column], reverse=descending)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+def project(row, select):
+    """Colonnes demandées par select (alias 'nom:colonne' et chemins JSON acceptés)"""
+    if not select or select == '*':
+        return dict(row)
+    projected = {}
+    for column in split_top_level(select):
+        column = column.strip()
+        if column == '*':
+            projected.update(row)
+            continue
+        alias, _, source = column.rpartition(':')
+        source = source.strip()
+        projected[alias.strip() or re.split(r'->>?', source)[-1].strip()] = column_value(row, source)
+    return projected
+
+# ============================================================================
+# TRANSPORT HTTP
+# ============================================================================
+
+class FakePostgrestTransport(httpx.BaseTransport):
+    """Transport httpx qui répond aux requêtes PostgREST depuis un FakeStore"""
+
+    def __init__(self, store, latency_ms=0, max_rows=DEFAULT_MAX_ROWS):
+        self.store = store
+        self.latency_ms = latency_ms
+        self.max_rows = max_rows   # None ou 0 : pas de plafond
+        self.calls = Counter()   # (méthode, table) -> nombre d'appels
+        self.stats_lock = threading.Lock()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.calls.clear()
+
+    def handle_request(self, request):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        table = urlsplit(str(request.url)).path.rstrip('/').rsplit('/', 1)[-1]
+        with self.stats_lock:
+            self.calls[(request.method, table)] += 1
+        try:
+            with self.store.lock:
+                status, body, headers = self.dispatch(request, table)
+        except FakePostgrestError as e:
+            status, body, headers = e.status, e.payload, {}
+        content = b'' if body is None else json.dumps(body, default=str).encode('utf-8')
+        headers = dict(headers, **{'Content-Type': 'application/json'})
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+    def dispatch(self, request, table):
+        params = request.url.params
+        prefer = request.headers.get('Prefer', '')
+        representation = 'return=minimal' not in prefer
+        single = 'vnd.pgrst.object' in request.headers.get('Accept', '')
+
+        if request.method in ('GET', 'HEAD'):
+            rows = self.select_rows(table, params)
+            total = len(rows)
+            if 'order' in params:
+                rows = sort_rows(rows, params['order'])
+            offset = int(params.get('offset', 0))
+            limit = int(params['limit']) if 'limit' in params else None
+            if self.max_rows:
+                limit = min(limit, self.max_rows) if limit is not None else self.max_rows
+            rows = rows[offset:offset + limit if limit is not None else None]
+            data = [project(row, params.get('select')) for row in rows]
+            # Comme PostgREST : plage toujours renvoyée, total seulement si count= est demandé
+            total_text = total if 'count=' in prefer else '*'
+            headers = {'Content-Range': f"{offset}-{offset + len(data) - 1}/{total_text}" if data
+                       else f"*/{total_text}"}
+            if single:
+                if len(data) != 1:
+                    raise FakePostgrestError(406, 'PGRST116', 'JSON object requested, multiple (or no) rows returned',
+                                             f'The result contains {len(data)} rows')
+                data = data[0]
+            return 200, None if request.method == 'HEAD' else data, headers
+
+        if request.method == 'POST':
+            payload = json.loads(request.content or b'[]')
+            rows = payload if isinstance(payload, list) else [payload]
+            resolution = 'merge' if 'merge-duplicates' in prefer else 'ignore' if 'ignore-duplicates' in prefer else None
+            written = self.store.insert(table, rows, params.get('on_conflict'), resolution)
+            return 201, [project(row, params.get('select')) for row in written] if representation else None, {}
+
+        if request.method == 'PATCH':
+            values = json.loads(request.content or b'{}')
+            updated = self.store.update(table, self.select_rows(table, params), values)
+            return 200, [dict(row) for row in updated] if representation else None, {}
+
+        if request.method == 'DELETE':
+            deleted = self.store.delete(table, self.select_rows(table, params))
+            return 200, [dict(row) for row in deleted] if representation else None, {}
+
+        raise FakePostgrestError(405, 'PGRST000', f'méthode non supportée: {request.method}')
+
+    def select_rows(self, table, params):
+        """Lignes qui satisfont tous les filtres (accès direct par clé primaire si possible)"""
+        filters = parse_filters(params)
+        table_rows = self.store.rows(table)
+        candidates = table_rows.values()
+        primary_key = self.store.primary_key(table)
+        for node in filters:
+            if len(primary_key) == 1 and node[0] == 'filter' and node[1] == primary_key[0] \
+                    and node[2][:2] in ((False, 'eq'), (False, 'in')):
+                keys = [node[2][2]] if node[2][1] == 'eq' else node[2][2]
+                candidates = [table_rows[(key,)] for key in keys if (key,) in table_rows]
+                break
+        return [row for row in candidates if all(matches(row, node) for node in filters)]
+
+# ============================================================================
+# CLIENT SUPABASE
+# ============================================================================
+
+def use_postgrest_transport(client, transport):
+    """Faire passer toutes les requêtes PostgREST d'un client Supabase par un transport httpx
+
+    Le client PostgREST est recréé par supabase-py (changement de session) :
+    le transport est donc réinstallé à chaque création.
+    """
+    create_postgrest = client._init_postgrest_client
+
+    def create_postgrest_with_transport(**kwargs):
+        postgrest = create_postgrest(**kwargs)
+        session = postgrest.session
+        postgrest.session = PostgrestSession(base_url=session.base_url, headers=session.headers,
+                                             timeout=session.timeout, transport=transport,
+                                             follow_redirects=True)
+        session.close()
+        return postgrest
+
+    client._init_postgrest_client = create_postgrest_with_transport
+    client._postgrest = None
+    client.postgrest_transport = transport
+    return client
+
+def create_offline_client(transport):
+    """Client supabase-py sans projet Supabase : toutes les requêtes passent par le transport"""
+    key = jwt.encode({'role': 'service_role', 'iss': 'fake-supabase'}, 'fake-supabase-secret', algorithm='HS256')
+    return use_postgrest_transport(create_client(FAKE_SUPABASE_URL, key), transport)
+
+def create_fake_client(store, latency_ms=0, max_rows=DEFAULT_MAX_ROWS):
+    """Client supabase-py dont les requêtes sont servies par le FakeStore"""
+    transport = FakePostgrestTransport(store, latency_ms, max_rows)
+    client = create_offline_client(transport)
+    client.fake_transport = transport
+    return client
+
+def load_fake_store(path=None, **options):
+    """Données d'un fichier JSON ou, à défaut, hôtel synthétique généré"""
+    if path:
+        return FakeStore.from_json(path)
+    from synthetic_hotel import generate_hotel
+    return FakeStore(generate_hotel(**options))
+
+# ============================================================================
+# APPLICATION DE TEST
+# ============================================================================
+
+def load_test_app(**hotel_options):
+    """Importer app.py sur le backend en mémoire, rempli d'un hôtel synthétique neuf
+
+    Les variables d'environnement ne comptent qu'avant le premier import de app.py ;
+    aux appels suivants, seule la base en mémoire est remplacée (cache vidé).
+    """
+    if 'app' not in sys.modules:
+        os.environ['SUPABASE_BACKEND'] = 'fake'
+        os.environ['SUPABASE_RECORD_FILE'] = ''            # jamais d'enregistrement pendant les tests
+        os.environ.setdefault('BRIEFING_LLM', 'false')     # pas d'appel OpenAI
+        os.environ['SUPABASE_FAKE_DATA'] = ''              # hôtel par défaut, remplacé ci-dessous
+        os.environ.setdefault('SUPABASE_FAKE_MAX_ROWS', str(DEFAULT_MAX_ROWS))
+    import app
+    if getattr(app.supabase, 'fake_transport', None) is None:
+        raise RuntimeError("app.py a été importé sur une vraie base Supabase : tests interrompus")
+    transport = app.supabase.fake_transport
+    transport.store = load_fake_store(**dict({'rooms': 30, 'years': 1, 'clients': 300, 'interactions': 100},
+                                             **hotel_options))
+    transport.latency_ms = 0
+    transport.max_rows = DEFAULT_MAX_ROWS
+    transport.reset_stats()
+    app.clear_cache()
+    return app
+
+@contextmanager
+def failing_table(transport, table):
+    """Faire échouer toutes les requêtes sur une table pendant le bloc (panne simulée)"""
+    dispatch = transport.dispatch
+
+    def failing_dispatch(request, name):
+        if name == table:
+            raise FakePostgrestError(503, 'PGRST000', f'table {table} indisponible (panne simulée)')
+        return dispatch(request, name)
+
+    transport.dispatch = failing_dispatch
+    try:
+        yield
+    finally:
+        del transport.dispatch
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    store = load_fake_store(args[args.index('--data') + 1] if '--data' in args else None)
+    print("🧪 Backend Supabase en mémoire")
+    print("=" * 50)
+    for name, count in sorted(store.counts().items()):
+        print(f"   {name:<24} {count:>8} ligne(s)")
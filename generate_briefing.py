@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Génération planifiée du briefing du jour
+À lancer chaque matin avant l'arrivée de l'équipe (cron / tâche planifiée) : le
+briefing est préparé dans toutes les langues puis servi instantanément par le
+tableau de bord et le chatbot. Il est ensuite régénéré automatiquement lorsque
+les données changent.
+
+Usage : python generate_briefing.py [--force]
+"""
+
+import sys
+
+from app import BRIEFING_LANGUAGES, get_daily_briefing
+
+def generate_briefings(force=False):
+    """Préparer le briefing du jour pour chaque langue"""
+    print("☀️ Génération du briefing du jour")
+    print("=" * 50)
+    for language in BRIEFING_LANGUAGES:
+        try:
+            briefing = get_daily_briefing(language, force=force, wait_summary=True)
+        except Exception as e:
+            print(f"❌ Erreur briefing {language}: {e}")
+            return False
+        summary = "avec résumé" if briefing.get('summary') else "sans résumé"
+        print(f"   ✅ {language}: version {briefing['version']} ({summary}, {len(briefing['content'])} caractères)")
+    return True
+
+if __name__ == "__main__":
+    success = generate_briefings(force='--force' in sys.argv[1:])
+    sys.exit(0 if success else 1)
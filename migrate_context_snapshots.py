@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Migration des contextes du chatbot vers ai_context_snapshots
+Parcourt ai_interactions, déplace chaque context_data.hotel_context volumineux dans
+ai_context_snapshots (une ligne par contenu) et le remplace par son empreinte.
+
+Prérequis : supabase/migrations/20261019090000_ai_context_snapshots.sql appliqué.
+Usage : python migrate_context_snapshots.py [--dry-run] [--batch-size 200]
+"""
+
+import sys
+
+from app import supabase, build_context_reference, store_context_snapshots
+
+DEFAULT_BATCH_SIZE = 200
+
+def fetch_interactions_page(after_id, batch_size):
+    """Lire une page d'interactions contenant un contexte en ligne (pagination par id)"""
+    query = supabase.table('ai_interactions')\
+        .select('id, context_data')\
+        .not_.is_('context_data->hotel_context', 'null')\
+        .order('id')\
+        .limit(batch_size)
+    if after_id:
+        query = query.gt('id', after_id)
+    return query.execute().data
+
+def migrate_context_snapshots(dry_run=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Compacter les lignes existantes de ai_interactions"""
+    print("🗂️ Migration des contextes du chatbot vers ai_context_snapshots")
+    print("=" * 50)
+    if dry_run:
+        print("🔍 Mode simulation : aucune écriture")
+
+    scanned = 0
+    compacted = 0
+    saved_chars = 0
+    hashes = set()
+    after_id = None
+
+    while True:
+        rows = fetch_interactions_page(after_id, batch_size)
+        if not rows:
+            break
+        after_id = rows[-1]['id']
+        scanned += len(rows)
+
+        updates = []
+        snapshots = []
+        for row in rows:
+            context_data = dict(row['context_data'] or {})
+            context_fields, snapshot = build_context_reference(context_data.get('hotel_context'))
+            if not snapshot:
+                continue  # contexte trop petit : laissé en ligne
+            context_data.pop('hotel_context', None)
+            context_data.update(context_fields)
+            updates.append((row['id'], context_data))
+            snapshots.append(snapshot)
+            hashes.add(snapshot['hash'])
+            saved_chars += snapshot['size_chars']
+
+        if updates and not dry_run:
+            # Snapshots d'abord : une ligne ne référence jamais une empreinte absente
+            if not store_context_snapshots(snapshots):
+                print("❌ Arrêt : snapshots non enregistrés")
+                return False
+            for interaction_id, context_data in updates:
+                supabase.table('ai_interactions')\
+                    .update({'context_data': context_data})\
+                    .eq('id', interaction_id)\
+                    .execute()
+
+        compacted += len(updates)
+        print(f"   ✅ {scanned} ligne(s) parcourue(s), {compacted} compactée(s)")
+
+    print()
+    print(f"📦 {compacted} interaction(s) → {len(hashes)} snapshot(s) distinct(s)")
+    print(f"📉 Environ {saved_chars // 1024} Ko de contexte dédupliqués")
+    return True
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    batch_size = DEFAULT_BATCH_SIZE
+    if '--batch-size' in args:
+        batch_size = int(args[args.index('--batch-size') + 1])
+    success = migrate_context_snapshots(dry_run='--dry-run' in args, batch_size=batch_size)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Serveur local compatible OpenAI (chat.completions) pour les tests et benchmarks
+Remplace l'API OpenAI sans coût ni réseau : latence, débit de tokens, longueur des
+réponses et appels d'outils sont configurables. Les réponses en streaming (SSE)
+et les statistiques d'usage (stream_options.include_usage) sont prises en charge.
+
+Lancer le serveur puis démarrer l'application avec :
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub python app.py
+
+Usage : python openai_stub.py [--port 8089] [--latency-ms 400] [--tokens-per-second 60]
+                              [--completion-tokens 120] [--tool-call-rate 0.5]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONFIG = {
+    'port': int(os.getenv('OPENAI_STUB_PORT', 8089)),
+    'latency_ms': float(os.getenv('OPENAI_STUB_LATENCY_MS', 400)),            # avant le premier token
+    'tokens_per_second': float(os.getenv('OPENAI_STUB_TOKENS_PER_SECOND', 60)),
+    'completion_tokens': int(os.getenv('OPENAI_STUB_COMPLETION_TOKENS', 120)),
+    'tool_call_rate': float(os.getenv('OPENAI_STUB_TOOL_CALL_RATE', 0.5)),    # part des questions avec un outil
+}
+
+FILLER_WORDS = ("D'après les données de l'hôtel , voici les informations demandées : "
+                "les clients présents , les réservations du jour et les points d'attention "
+                "pour la réception sont à jour .").split()
+
+_stats = {'requests': 0, 'streams': 0, 'tool_calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+_stats_lock = threading.Lock()
+
+def estimate_tokens(text):
+    """Estimation grossière du nombre de tokens (4 caractères par token)"""
+    return max(1, len(text or '') // 4)
+
+def prompt_tokens(messages):
+    """Tokens du prompt (contenus + appels d'outils)"""
+    total = 0
+    for message in messages:
+        total += 4 + estimate_tokens(message.get('content') or '')
+        for call in message.get('tool_calls') or []:
+            total += estimate_tokens(call.get('function', {}).get('arguments', ''))
+    return total
+
+def last_user_message(messages):
+    """Dernière question de l'utilisateur"""
+    for message in reversed(messages):
+        if message.get('role') == 'user':
+            return message.get('content') or ''
+    return ''
+
+def sample_arguments(tool, question):
+    """Arguments plausibles pour un outil d'après son schéma JSON"""
+    arguments = {}
+    for name in tool.get('parameters', {}).get('required', []):
+        if 'date' in name:
+            arguments[name] = date.today().isoformat()
+        elif 'room' in name:
+            arguments[name] = '101'
+        else:
+            arguments[name] = question[:80]
+    return arguments
+
+def choose_tool_call(body, config):
+    """Décider si le modèle simulé appelle un outil (déterministe pour une même question)"""
+    tools = body.get('tools') or []
+    messages = body.get('messages') or []
+    if not tools or body.get('tool_choice') == 'none':
+        return None
+    if any(message.get('role') == 'tool' for message in messages):
+        return None  # résultats déjà fournis : répondre
+    question = last_user_message(messages)
+    rng = random.Random(question)
+    if rng.random() >= config['tool_call_rate']:
+        return None
+    tool = rng.choice(tools)['function']
+    return {
+        'id': f"call_{uuid.uuid4().hex[:24]}",
+        'type': 'function',
+        'function': {'name': tool['name'], 'arguments': json.dumps(sample_arguments(tool, question))}
+    }
+
+def completion_words(body, config):
+    """Mots de la réponse simulée (longueur bornée par max_tokens)"""
+    count = min(config['completion_tokens'], body.get('max_tokens') or config['completion_tokens'])
+    return [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(max(1, count))]
+
+def record(**values):
+    """Mettre à jour les statistiques du serveur"""
+    with _stats_lock:
+        for key, value in values.items():
+            _stats[key] += value
+
+class OpenAIStubHandler(BaseHTTPRequestHandler):
+    """Gestionnaire HTTP : /v1/chat/completions, /v1/models, /stats"""
+    protocol_version = 'HTTP/1.1'
+    config = DEFAULT_CONFIG
+
+    def log_message(self, format, *args):
+        pass  # pas de log par requête pendant les benchmarks
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunk(self, payload):
+        data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n".encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self.send_json({'object': 'list', 'data': [{'id': 'gpt-3.5-turbo', 'object': 'model', 'owned_by': 'stub'}]})
+        elif self.path.rstrip('/') == '/stats':
+            with _stats_lock:
+                self.send_json(dict(_stats))
+        else:
+            self.send_json({'error': {'message': 'Not found'}}, 404)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json({'error': {'message': 'Not found'}}, 404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        config = self.config
+        tool_call = choose_tool_call(body, config)
+        words = [] if tool_call else completion_words(body, config)
+        usage = {
+            'prompt_tokens': prompt_tokens(body.get('messages') or []),
+            'completion_tokens': len(words) or estimate_tokens(tool_call['function']['arguments']),
+        }
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        record(requests=1, streams=int(bool(body.get('stream'))), tool_calls=int(bool(tool_call)),
+               prompt_tokens=usage['prompt_tokens'], completion_tokens=usage['completion_tokens'])
+
+        base = {'id': f"chatcmpl-{uuid.uuid4().hex[:24]}", 'created': int(time.time()),
+                'model': body.get('model', 'gpt-3.5-turbo')}
+        finish_reason = 'tool_calls' if tool_call else 'stop'
+        token_delay = 1 / config['tokens_per_second'] if config['tokens_per_second'] > 0 else 0
+        time.sleep(config['latency_ms'] / 1000)
+
+        if not body.get('stream'):
+            time.sleep(token_delay * usage['completion_tokens'])
+            message = {'role': 'assistant', 'content': None if tool_call else ' '.join(words)}
+            if tool_call:
+                message['tool_calls'] = [tool_call]
+            self.send_json(dict(base, object='chat.completion', usage=usage,
+                                choices=[{'index': 0, 'message': message, 'finish_reason': finish_reason}]))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def chunk(delta, finish=None):
+            return dict(base, object='chat.completion.chunk',
+                        choices=[{'index': 0, 'delta': delta, 'finish_reason': finish}])
+
+        self.send_chunk(chunk({'role': 'assistant', 'content': ''}))
+        if tool_call:
+            self.send_chunk(chunk({'tool_calls': [dict(tool_call, index=0)]}))
+        for i, word in enumerate(words):
+            self.send_chunk(chunk({'content': word if i == 0 else ' ' + word}))
+            time.sleep(token_delay)
+        self.send_chunk(chunk({}, finish_reason))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            self.send_chunk(dict(base, object='chat.completion.chunk', choices=[], usage=usage))
+        self.send_chunk('[DONE]')
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def parse_args(args):
+    """Options de la ligne de commande (--port, --latency-ms, ...)"""
+    config = dict(DEFAULT_CONFIG)
+    for key, value in DEFAULT_CONFIG.items():
+        flag = '--' + key.replace('_', '-')
+        if flag in args:
+            config[key] = type(value)(args[args.index(flag) + 1])
+    return config
+
+def run_stub(config):
+    """Démarrer le serveur (un thread par connexion)"""
+    OpenAIStubHandler.config = config
+    server = ThreadingHTTPServer(('127.0.0.1', config['port']), OpenAIStubHandler)
+    server.daemon_threads = True
+    print(f"🤖 Serveur OpenAI simulé sur http://127.0.0.1:{config['port']}/v1")
+    print(f"   Latence {config['latency_ms']:.0f} ms, {config['tokens_per_second']:.0f} tokens/s, "
+          f"{config['completion_tokens']} tokens par réponse, outils {config['tool_call_rate']:.0%}")
+    return server
+
+if __name__ == "__main__":
+    server = run_stub(parse_args(sys.argv[1:]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Arrêt du serveur")
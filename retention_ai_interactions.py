@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Job de rétention et de compaction de ai_interactions
+À planifier une fois par jour (cron / tâche planifiée de l'hébergeur).
+
+Politiques (variables d'environnement, en jours) :
+- AI_RETENTION_CONVERSATION_DAYS : les lignes d'historique (context_data.conversation)
+  doublent l'interaction correspondante et sont supprimées au-delà de ce délai
+- AI_RETENTION_SUMMARY_DAYS : au-delà, les interactions sont résumées par utilisateur
+  et par jour dans ai_conversation_summaries puis archivées ou supprimées
+  (AI_RETENTION_MODE) ; un résumé est réécrit, jamais dupliqué, si le job est relancé
+- AI_RETENTION_ARCHIVE_DAYS : durée de conservation de l'archive et des snapshots
+  de contexte qui ne sont plus référencés
+
+Prérequis : migrations supabase/migrations/20261019100000_ai_interactions_retention.sql
+et 20261019120000_ai_conversation_summaries_period.sql appliquées.
+Usage : python retention_ai_interactions.py [--dry-run]
+"""
+
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from app import supabase, normalize_question, parse_utc_timestamp, FAST_PATH_INTENTS
+
+CONVERSATION_DAYS = int(os.getenv('AI_RETENTION_CONVERSATION_DAYS', 7))
+SUMMARY_DAYS = int(os.getenv('AI_RETENTION_SUMMARY_DAYS', 30))
+ARCHIVE_DAYS = int(os.getenv('AI_RETENTION_ARCHIVE_DAYS', 365))
+RETENTION_MODE = os.getenv('AI_RETENTION_MODE', 'archive')  # 'archive' ou 'delete'
+BATCH_SIZE = 500
+RECENT_QUESTIONS = 5  # dernières questions reprises dans le résumé
+
+def cutoff(days):
+    """Date limite (ISO, UTC avec fuseau) pour un délai en jours"""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+def day_cutoff(days):
+    """Début (UTC) du jour situé à un délai en jours : une journée est traitée en entier"""
+    day = datetime.now(timezone.utc) - timedelta(days=days)
+    return day.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+
+def fetch_rows(table, columns, before, after_id=None, not_null=None):
+    """Page de lignes antérieures à une date (pagination par id)"""
+    query = supabase.table(table).select(columns)\
+        .lt('created_at', before)\
+        .order('id')\
+        .limit(BATCH_SIZE)
+    if after_id:
+        query = query.gt('id', after_id)
+    if not_null:
+        query = query.not_.is_(not_null, 'null')
+    return query.execute().data
+
+def iter_rows(table, columns, before, not_null=None):
+    """Parcourir toutes les lignes antérieures à une date, page par page"""
+    after_id = None
+    while True:
+        rows = fetch_rows(table, columns, before, after_id, not_null)
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1]['id']
+
+def is_conversation_row(row):
+    """Ligne d'historique (doublon d'une interaction), cf. save_conversation_message"""
+    return bool((row.get('context_data') or {}).get('conversation'))
+
+def delete_rows(table, ids):
+    """Supprimer des lignes par id, par lots"""
+    for i in range(0, len(ids), BATCH_SIZE):
+        supabase.table(table).delete().in_('id', ids[i:i + BATCH_SIZE]).execute()
+
+def question_topics(question):
+    """Thèmes d'une question (mêmes mots-clés que les réponses directes)"""
+    words = normalize_question(question or '').split()
+    topics = {intent for intent, (keywords, _) in FAST_PATH_INTENTS.items()
+              if any(word.startswith(keyword) for word in words for keyword in keywords)}
+    return topics or {'autre'}
+
+def purge_conversation_rows(dry_run):
+    """Étape 1 : supprimer les lignes d'historique anciennes"""
+    before = cutoff(CONVERSATION_DAYS)
+    ids = [row['id']
+           for rows in iter_rows('ai_interactions', 'id, context_data', before)
+           for row in rows if is_conversation_row(row)]
+    print(f"💬 {len(ids)} ligne(s) d'historique de plus de {CONVERSATION_DAYS} jours")
+    if ids and not dry_run:
+        delete_rows('ai_interactions', ids)
+    return len(ids)
+
+def summarize_old_interactions(dry_run):
+    """Étape 2 : résumer par utilisateur et par jour les interactions au-delà de l'horizon
+    Clé (staff_user_id, period_start) : un job relancé avant la compaction réécrit les
+    mêmes résumés au lieu d'en ajouter.
+    """
+    before = day_cutoff(SUMMARY_DAYS)
+    periods = {}
+    for rows in iter_rows('ai_interactions', 'id, staff_user_id, question, response_time_ms, context_data, created_at', before):
+        for row in rows:
+            if is_conversation_row(row):
+                continue
+            day = parse_utc_timestamp(row['created_at']).replace(hour=0, minute=0, second=0, microsecond=0)
+            stats = periods.setdefault((row['staff_user_id'], day), {
+                'count': 0, 'topics': Counter(), 'times': [], 'questions': []
+            })
+            stats['count'] += 1
+            stats['topics'].update(question_topics(row['question']))
+            if row.get('response_time_ms'):
+                stats['times'].append(row['response_time_ms'])
+            stats['questions'].append((row['created_at'], row['question']))
+
+    summaries = []
+    for (user_id, day), stats in periods.items():
+        recent = [question for _, question in sorted(stats['questions'])[-RECENT_QUESTIONS:] if question]
+        topics = ', '.join(f"{topic} ({count})" for topic, count in stats['topics'].most_common())
+        summaries.append({
+            'staff_user_id': user_id,
+            'period_start': day.isoformat(),
+            'period_end': (day + timedelta(days=1)).isoformat(),
+            'interactions_count': stats['count'],
+            'topics': dict(stats['topics']),
+            'summary': f"{stats['count']} question(s) — thèmes : {topics}. "
+                       f"Dernières questions : " + ' | '.join(recent),
+            'avg_response_time_ms': round(sum(stats['times']) / len(stats['times'])) if stats['times'] else None
+        })
+
+    print(f"📝 {len(summaries)} résumé(s) pour {sum(s['interactions_count'] for s in summaries)} interaction(s) de plus de {SUMMARY_DAYS} jours")
+    if summaries and not dry_run:
+        for i in range(0, len(summaries), BATCH_SIZE):
+            supabase.table('ai_conversation_summaries')\
+                .upsert(summaries[i:i + BATCH_SIZE], on_conflict='staff_user_id,period_start')\
+                .execute()
+    return len(summaries)
+
+def compact_old_interactions(dry_run):
+    """Étape 3 : archiver ou supprimer les interactions résumées"""
+    before = day_cutoff(SUMMARY_DAYS)
+    moved = 0
+    # Les lignes traitées disparaissent de la table : toujours relire la première page
+    after_id = None
+    while True:
+        rows = fetch_rows('ai_interactions', '*', before, after_id if dry_run else None)
+        if not rows:
+            break
+        if dry_run:
+            after_id = rows[-1]['id']
+            # Les lignes d'historique auraient été supprimées à l'étape 1
+            rows = [row for row in rows if not is_conversation_row(row)]
+        else:
+            if RETENTION_MODE == 'archive':
+                supabase.table('ai_interactions_archive').upsert(rows, on_conflict='id', ignore_duplicates=True).execute()
+            delete_rows('ai_interactions', [row['id'] for row in rows])
+        moved += len(rows)
+
+    action = 'archivée(s)' if RETENTION_MODE == 'archive' else 'supprimée(s)'
+    print(f"📦 {moved} interaction(s) {action}")
+    return moved
+
+def referenced_snapshot_hashes():
+    """Empreintes de contexte encore référencées (interactions et archive)
+    Seule l'empreinte est lue, et seulement sur les lignes qui en ont une.
+    """
+    hashes = set()
+    reference = 'context_data->>hotel_context_ref'
+    for table in ('ai_interactions', 'ai_interactions_archive'):
+        for rows in iter_rows(table, f'id, hotel_context_ref:{reference}', cutoff(0), not_null=reference):
+            hashes.update(row['hotel_context_ref'] for row in rows)
+    return hashes
+
+def purge_archive(dry_run):
+    """Étape 4 : purger l'archive et les snapshots de contexte orphelins"""
+    before = cutoff(ARCHIVE_DAYS)
+    archived_ids = [row['id'] for rows in iter_rows('ai_interactions_archive', 'id', before) for row in rows]
+    if archived_ids and not dry_run:
+        delete_rows('ai_interactions_archive', archived_ids)
+
+    referenced = referenced_snapshot_hashes()
+    orphans = []
+    after_hash = None
+    while True:
+        query = supabase.table('ai_context_snapshots').select('hash')\
+            .lt('created_at', before)\
+            .order('hash')\
+            .limit(BATCH_SIZE)
+        if after_hash:
+            query = query.gt('hash', after_hash)
+        rows = query.execute().data
+        if not rows:
+            break
+        after_hash = rows[-1]['hash']
+        orphans.extend(row['hash'] for row in rows if row['hash'] not in referenced)
+
+    if orphans and not dry_run:
+        for i in range(0, len(orphans), BATCH_SIZE):
+            supabase.table('ai_context_snapshots').delete().in_('hash', orphans[i:i + BATCH_SIZE]).execute()
+
+    print(f"🗑️ {len(archived_ids)} ligne(s) d'archive et {len(orphans)} snapshot(s) de plus de {ARCHIVE_DAYS} jours purgé(s)")
+
+def run_retention(dry_run=False):
+    """Exécuter toutes les étapes de rétention"""
+    print("🧹 Rétention de ai_interactions")
+    print("=" * 50)
+    print(f"   Historique: {CONVERSATION_DAYS} j — Résumé: {SUMMARY_DAYS} j ({RETENTION_MODE}) — Archive: {ARCHIVE_DAYS} j")
+    if RETENTION_MODE not in ('archive', 'delete'):
+        print(f"❌ AI_RETENTION_MODE invalide: {RETENTION_MODE}")
+        return False
+    if dry_run:
+        print("🔍 Mode simulation : aucune écriture")
+
+    try:
+        purge_conversation_rows(dry_run)
+        summarize_old_interactions(dry_run)
+        compact_old_interactions(dry_run)
+        purge_archive(dry_run)
+    except Exception as e:
+        print(f"❌ Erreur pendant la rétention: {e}")
+        return False
+
+    print("🎉 Rétention terminée")
+    return True
+
+if __name__ == "__main__":
+    success = run_retention(dry_run='--dry-run' in sys.argv[1:])
+    sys.exit(0 if success else 1)
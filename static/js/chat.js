@@ -0,0 +1,369 @@
+// Assistant AYORA : chargé à la première ouverture du chat (voir loadChatScript dans main.js)
+
+let chatMessages = []; // Historique des messages du chat
+let chatOpen = false; // État d'ouverture du chat
+
+// ===== CHAT BOT FUNCTIONS =====
+
+// Variables globales pour le chat
+let chatBotResponses = {
+    'gestion réservations': 'Pour gérer les réservations, allez dans l\'onglet "Réservations" depuis le menu principal. Vous pourrez voir toutes les réservations, les filtrer et modifier leurs statuts.',
+    'clients actuels': 'Les clients actuels sont visibles dans l\'onglet "Clients Actuels". Cette section affiche uniquement les chambres occupées avec des clients en séjour.',
+    'changement statut': 'Pour changer le statut d\'une réservation : 1) Allez sur le dashboard, 2) Dans "Arrivées et Départs Aujourd\'hui", cliquez sur "En séjour" ou "Départ" selon le cas, 3) Le statut se met à jour automatiquement.',
+    'réservations': 'Les réservations peuvent avoir 4 statuts : futures, jour (arrivée), en_cours (client installé), terminee (client parti). Seuls les changements manuels sont possibles.',
+    'vip': 'Les clients VIP sont classés par niveau de VIP1 à VIP8. VIP8 est le niveau le plus élevé. Ils apparaissent en premier dans l\'état des chambres.',
+    'chambres': 'L\'état des chambres affiche uniquement les chambres actuellement occupées avec des clients en séjour. Les chambres vides ne sont pas affichées.',
+    'dashboard': 'Le dashboard centralise toutes les informations importantes : arrivées/départs du jour, état des chambres, et permet de gérer les statuts des réservations.',
+    'aide': 'Je peux vous aider avec : la gestion des réservations, les clients actuels, les changements de statut, les niveaux VIP, l\'état des chambres, et le dashboard. Que souhaitez-vous savoir ?'
+};
+
+// Initialisation du chat
+function initializeChat() {
+    console.log('Initialisation du chat...');
+    console.log('chatMessages avant init:', chatMessages);
+    
+    // Vérifier que chatMessages est bien un tableau
+    if (!Array.isArray(chatMessages)) {
+        console.error('chatMessages n\'est pas un tableau, réinitialisation...');
+        chatMessages = [];
+    }
+    
+    // Définir l'heure du message de bienvenue
+    const now = new Date();
+    const timeString = now.toLocaleTimeString('fr-FR', { hour: '2-digit', minute: '2-digit' });
+    document.getElementById('bot-welcome-time').textContent = timeString;
+    
+    // Ajouter le message de bienvenue à l'historique
+    try {
+        chatMessages.push({
+            type: 'bot',
+            text: 'Bonjour ! Je suis votre assistant AYORA. Comment puis-je vous aider aujourd\'hui ?',
+            time: timeString
+        });
+        console.log('Message de bienvenue ajouté, taille chatMessages:', chatMessages.length);
+    } catch (error) {
+        console.error('Erreur lors de l\'ajout du message de bienvenue:', error);
+    }
+}
+
+// Initialiser les écouteurs d'événements du chat
+function initializeChatEventListeners() {
+    // Écouteur pour la touche Entrée
+    const chatInput = document.getElementById('chat-input-field');
+    if (chatInput) {
+        chatInput.addEventListener('keypress', handleChatInputKeyPress);
+        console.log('Écouteur Entrée ajouté au chat');
+    }
+
+    // Le bouton d'envoi utilise déjà onclick="sendMessage()" (pas de second écouteur)
+    
+    console.log('Chat event listeners initialisés avec succès');
+}
+
+// Ouvrir/Fermer le chat
+function toggleChat() {
+    const chatWidget = document.getElementById('chat-widget');
+    const chatToggle = document.querySelector('.chat-toggle-floating');
+    
+    if (chatOpen) {
+        // Fermer le chat
+        chatWidget.classList.add('closing');
+        setTimeout(() => {
+            chatWidget.classList.remove('open', 'closing');
+            chatOpen = false;
+        }, 300);
+        
+        // Changer l'icône
+        chatToggle.innerHTML = '<i class="fas fa-chevron-left"></i>';
+        chatToggle.title = 'Ouvrir le chat';
+    } else {
+        // Ouvrir le chat
+        chatWidget.classList.add('open');
+        chatOpen = true;
+        
+        // Changer l'icône
+        chatToggle.innerHTML = '<i class="fas fa-chevron-right"></i>';
+        chatToggle.title = 'Masquer le chat';
+        
+        // Focus sur l'input
+        document.getElementById('chat-input-field').focus();
+    }
+}
+
+// Fermer complètement le chat
+function closeChat() {
+    const chatWidget = document.getElementById('chat-widget');
+    const chatToggle = document.querySelector('.chat-toggle-floating');
+    
+    chatWidget.classList.add('closing');
+    setTimeout(() => {
+        chatWidget.classList.remove('open', 'closing');
+        chatOpen = false;
+    }, 300);
+    
+    // Remettre l'icône originale
+    chatToggle.innerHTML = '<i class="fas fa-chevron-left"></i>';
+    chatToggle.title = 'Ouvrir le chat';
+}
+
+// Envoyer un message
+async function sendMessage() {
+    const inputField = document.getElementById('chat-input-field');
+    const message = inputField.value.trim();
+    
+    if (message === '') return;
+    
+    console.log('Envoi du message:', message);
+    
+    // Ajouter le message utilisateur
+    addMessage('user', message);
+    
+    // Vider l'input
+    inputField.value = '';
+    
+    // Désactiver le bouton d'envoi pendant le traitement
+    const sendButton = document.querySelector('.send-button');
+    sendButton.disabled = true;
+    sendButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
+    
+    // Ajouter un indicateur "IA réfléchit..."
+    addMessage('bot', '🤔 <em>L\'IA réfléchit à votre question...</em>');
+    
+    try {
+        console.log('Appel de l\'API OpenAI (streaming)...');
+        
+        // Réponse en streaming : les morceaux s'affichent dès leur génération
+        const streamed = await streamChatbotAnswer(message);
+        
+        if (!streamed) {
+            // Navigateur sans streaming ou endpoint indisponible : réponse complète
+            const response = await fetch('/api/chatbot/query', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ question: message })
+            });
+            
+            console.log('Réponse reçue:', response.status);
+            
+            if (response.ok || response.status === 503) {
+                const result = await response.json();
+                console.log('Résultat:', result);
+                
+                if (result.success) {
+                    // Remplacer le message "IA réfléchit" par la vraie réponse
+                    replaceLastBotMessage(result.response);
+                } else if (result.busy) {
+                    replaceLastBotMessage(result.message);
+                } else {
+                    replaceLastBotMessage(`Erreur: ${result.message}`);
+                }
+            } else {
+                replaceLastBotMessage('Désolé, je ne peux pas traiter votre question pour le moment. Veuillez réessayer.');
+            }
+        }
+    } catch (error) {
+        console.error('Erreur lors de l\'envoi du message:', error);
+        replaceLastBotMessage('Désolé, une erreur est survenue. Veuillez réessayer.');
+    } finally {
+        // Réactiver le bouton d'envoi
+        sendButton.disabled = false;
+        sendButton.innerHTML = '<i class="fas fa-paper-plane"></i>';
+    }
+}
+
+// Lire la réponse du chatbot en streaming (Server-Sent Events via fetch)
+// Retourne false si le streaming n'est pas disponible (fallback vers /api/chatbot/query)
+async function streamChatbotAnswer(question) {
+    if (!window.ReadableStream || !window.TextDecoder) {
+        return false;
+    }
+    
+    const response = await fetch('/api/chatbot/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify({ question: question })
+    });
+    
+    if (response.status === 503) {
+        // Assistant saturé : message immédiat, pas de nouvel essai
+        const result = await response.json();
+        replaceLastBotMessage(result.message);
+        return true;
+    }
+    
+    if (!response.ok || !response.body) {
+        return false;
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Les événements SSE sont séparés par une ligne vide
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        
+        for (const event of events) {
+            if (!event.startsWith('data: ')) continue;
+            const payload = JSON.parse(event.slice(6));
+            
+            if (payload.type === 'token') {
+                answer += payload.content;
+                updateLastBotMessageText(answer);
+            } else if (payload.type === 'done') {
+                // Version formatée par le serveur une fois le flux terminé
+                replaceLastBotMessage(payload.response);
+            } else if (payload.type === 'error') {
+                replaceLastBotMessage(payload.message);
+            }
+        }
+    }
+    
+    return true;
+}
+
+// Envoyer une suggestion
+function sendSuggestion(text) {
+    console.log('Suggestion cliquée:', text);
+    const inputField = document.getElementById('chat-input-field');
+    inputField.value = text;
+    sendMessage();
+}
+
+// Ajouter un message au chat
+function addMessage(type, text) {
+    const chatMessagesElement = document.getElementById('chat-messages');
+    const now = new Date();
+    const timeString = now.toLocaleTimeString('fr-FR', { hour: '2-digit', minute: '2-digit' });
+    
+    // Vérifier que chatMessages est bien un tableau
+    if (!Array.isArray(chatMessages)) {
+        console.error('chatMessages n\'est pas un tableau:', chatMessages);
+        chatMessages = [];
+    }
+    
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${type}-message`;
+    messageDiv.dataset.type = type;
+    
+    const avatar = document.createElement('div');
+    avatar.className = 'message-avatar';
+    avatar.innerHTML = type === 'bot' ? '<i class="fas fa-robot"></i>' : '<i class="fas fa-user"></i>';
+    
+    const content = document.createElement('div');
+    content.className = 'message-content';
+    
+    const messageText = document.createElement('div');
+    messageText.className = 'message-text';
+    messageText.innerHTML = text; // Utiliser innerHTML pour supporter les balises HTML
+    
+    const messageTime = document.createElement('div');
+    messageTime.className = 'message-time';
+    messageTime.textContent = timeString;
+    
+    content.appendChild(messageText);
+    content.appendChild(messageTime);
+    messageDiv.appendChild(avatar);
+    messageDiv.appendChild(content);
+    
+    chatMessagesElement.appendChild(messageDiv);
+    
+    // Scroll vers le bas
+    chatMessagesElement.scrollTop = chatMessagesElement.scrollHeight;
+    
+    // Ajouter à l'historique
+    try {
+        chatMessages.push({
+            type: type,
+            text: text,
+            time: timeString
+        });
+        console.log('Message ajouté à l\'historique, taille:', chatMessages.length);
+    } catch (error) {
+        console.error('Erreur lors de l\'ajout à l\'historique:', error);
+    }
+}
+
+// Remplacer le dernier message du bot
+function replaceLastBotMessage(newText) {
+    const chatMessages = document.getElementById('chat-messages');
+    const botMessages = chatMessages.querySelectorAll('.bot-message');
+    
+    if (botMessages.length > 0) {
+        const lastBotMessage = botMessages[botMessages.length - 1];
+        const messageText = lastBotMessage.querySelector('.message-text');
+        if (messageText) {
+            messageText.innerHTML = newText;
+        }
+    }
+}
+
+// Mettre à jour le texte du dernier message du bot pendant le streaming
+function updateLastBotMessageText(text) {
+    const chatMessagesElement = document.getElementById('chat-messages');
+    const botMessages = chatMessagesElement.querySelectorAll('.bot-message');
+    
+    if (botMessages.length > 0) {
+        const messageText = botMessages[botMessages.length - 1].querySelector('.message-text');
+        if (messageText) {
+            messageText.textContent = text;
+            chatMessagesElement.scrollTop = chatMessagesElement.scrollHeight;
+        }
+    }
+}
+
+// Générer une réponse du bot
+function generateBotResponse(userMessage) {
+    const lowerMessage = userMessage.toLowerCase();
+    
+    // Rechercher des mots-clés dans le message
+    for (const [keyword, response] of Object.entries(chatBotResponses)) {
+        if (lowerMessage.includes(keyword.toLowerCase())) {
+            return response;
+        }
+    }
+    
+    // Réponses par défaut selon le contexte
+    if (lowerMessage.includes('bonjour') || lowerMessage.includes('salut') || lowerMessage.includes('hello')) {
+        return 'Bonjour ! Comment puis-je vous aider aujourd\'hui ?';
+    }
+    
+    if (lowerMessage.includes('merci') || lowerMessage.includes('thanks')) {
+        return 'De rien ! N\'hésitez pas si vous avez d\'autres questions.';
+    }
+    
+    if (lowerMessage.includes('au revoir') || lowerMessage.includes('bye')) {
+        return 'Au revoir ! Bonne journée !';
+    }
+    
+    // Réponse par défaut
+    return 'Je ne suis pas sûr de comprendre votre question. Pouvez-vous reformuler ou utiliser les suggestions ci-dessous ?';
+}
+
+// Gestion des touches dans l'input
+function handleChatInputKeyPress(event) {
+    if (event.key === 'Enter') {
+        sendMessage();
+    }
+}
+
+
+// Export des fonctions du chat
+window.toggleChat = toggleChat;
+window.closeChat = closeChat;
+window.sendMessage = sendMessage;
+window.sendSuggestion = sendSuggestion;
+
+initializeChat();
+initializeChatEventListeners();
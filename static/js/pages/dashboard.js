@@ -0,0 +1,652 @@
+// Tableau de bord : calendrier, état des chambres, arrivées et départs du jour
+
+// Initialisation uniquement si les blocs correspondants sont présents
+document.addEventListener('DOMContentLoaded', function() {
+    if (document.getElementById('calendar-widget-large')) {
+        initializeCalendar();
+    }
+    if (document.getElementById('rooms-list')) {
+        initializeRoomsStatus();
+    }
+    if (document.getElementById('briefing-container')) {
+        loadDailyBriefing();
+    }
+});
+
+// Briefing du jour (généré une fois côté serveur et partagé par toute l'équipe)
+async function loadDailyBriefing() {
+    const container = document.getElementById('briefing-container');
+    const loading = document.getElementById('briefing-loading');
+    const summary = document.getElementById('briefing-summary');
+    const content = document.getElementById('briefing-content');
+
+    try {
+        const response = await fetch('/api/briefing/today');
+        const result = await response.json();
+        if (!response.ok || !result.success) {
+            throw new Error(result.message || `HTTP error! status: ${response.status}`);
+        }
+
+        summary.textContent = result.summary || '';
+        summary.style.display = result.summary ? 'block' : 'none';
+        content.textContent = result.content;
+        content.style.display = 'block';
+    } catch (error) {
+        console.error('Erreur lors du chargement du briefing:', error);
+        summary.style.display = 'none';
+        content.textContent = container.dataset.empty;
+        content.style.display = 'block';
+    } finally {
+        loading.style.display = 'none';
+    }
+}
+
+// Variables globales pour le calendrier
+let currentCalendarYear = new Date().getFullYear();
+let currentCalendarMonth = new Date().getMonth() + 1;
+
+// Gérer les clics sur la modal
+function handleModalClick(event) {
+    if (event.target.id === 'guests-modal') {
+        closeGuestsModal();
+    }
+}
+
+// Fermer la modal des clients
+function closeGuestsModal() {
+    const modal = document.getElementById('guests-modal');
+    if (modal) {
+        modal.classList.remove('show');
+        setTimeout(() => modal.remove(), 300);
+    }
+}
+
+// Voir les détails d'un client
+function viewClientDetails(clientId) {
+    if (clientId) {
+        window.location.href = `/client/${clientId}`;
+    }
+}
+
+// Variables globales pour la vue actuelle
+let currentView = 'arrivals';
+let departuresData = [];
+
+// Fonction pour basculer entre arrivées et départs
+function switchView(view) {
+    currentView = view;
+    
+    // Mettre à jour les boutons
+    document.querySelectorAll('.toggle-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+    document.querySelector(`[data-view="${view}"]`).classList.add('active');
+    
+    // Mettre à jour le titre de la section
+    const sectionTitle = document.getElementById('section-title');
+    if (sectionTitle) {
+        sectionTitle.textContent = view === 'arrivals' ? 'Arrivées Aujourd\'hui' : 'Départs Aujourd\'hui';
+    }
+    
+    // Basculer entre les vues
+    document.querySelectorAll('.view-content').forEach(content => {
+        content.classList.remove('active');
+    });
+    
+    if (view === 'arrivals') {
+        document.getElementById('arrivals-view').classList.add('active');
+    } else {
+        document.getElementById('departures-view').classList.add('active');
+        loadDeparturesData();
+    }
+}
+
+// Fonction pour charger les données de départs
+async function loadDeparturesData() {
+    try {
+        const response = await fetch('/api/departures/today');
+        if (response.ok) {
+            departuresData = await response.json();
+            renderDepartures();
+        } else {
+            console.error('Erreur lors du chargement des départs');
+            showEmptyDeparturesState();
+        }
+    } catch (error) {
+        console.error('Erreur lors du chargement des départs:', error);
+        showEmptyDeparturesState();
+    }
+}
+
+// Fonction pour afficher les départs
+function renderDepartures() {
+    const departuresContainer = document.querySelector('.departures-list');
+    if (!departuresContainer) return;
+    
+    if (departuresData.length === 0) {
+        showEmptyDeparturesState();
+        return;
+    }
+    
+    departuresContainer.innerHTML = departuresData.map(departure => `
+        <div class="departure-item clickable" onclick="viewDepartureDetails('${departure.resv_name_id}')" style="margin: 0 16px 8px 16px !important; max-width: calc(100% - 32px) !important;">
+            <div class="departure-info">
+                <div class="guest-name">
+                    ${departure.client_principal?.guest_name || `Réservation ${departure.resv_name_id}`}
+                </div>
+                <div class="departure-details">
+                    <span class="room-number">
+                        <i class="fas fa-door-open"></i>
+                        Chambre ${departure.room_no || 'Non assignée'}
+                    </span>
+                    <span class="departure-time">
+                        <i class="fas fa-clock"></i>
+                        ${departure.departure_time || 'Heure non définie'}
+                    </span>
+                </div>
+            </div>
+            <div class="departure-status">
+                <div class="status-controls">
+                    ${departure.statut === 'futures' ? 
+                        `<div class="status-info">
+                            <i class="fas fa-clock"></i>
+                            <span>Arrivée prévue</span>
+                        </div>` : ''
+                    }
+                    ${departure.statut === 'jour' ? 
+                        `<button class="btn-status btn-status-info" onclick="changeReservationStatus('${departure.resv_name_id}', 'en_cours')" title="Client installé à l'hôtel">
+                            <i class="fas fa-bed"></i> En séjour
+                        </button>` : ''
+                    }
+                    ${departure.statut === 'en_cours' ? 
+                        `<button class="btn-status btn-status-warning" onclick="changeReservationStatus('${departure.resv_name_id}', 'terminee')" title="Client parti de l'hôtel">
+                            <i class="fas fa-sign-out-alt"></i> Départ
+                        </button>` : ''
+                    }
+                </div>
+                <span class="status-badge status-${departure.statut || 'unknown'}">
+                    ${(departure.statut || 'unknown').charAt(0).toUpperCase() + (departure.statut || 'unknown').slice(1)}
+                </span>
+                <i class="fas fa-chevron-right departure-arrow"></i>
+            </div>
+        </div>
+    `).join('');
+}
+
+// Fonction pour afficher l'état vide des départs
+function showEmptyDeparturesState() {
+    const departuresContainer = document.querySelector('.departures-list');
+    if (departuresContainer) {
+        departuresContainer.innerHTML = `
+            <div class="empty-state">
+                <i class="fas fa-calendar-times"></i>
+                <p>Aucun départ prévu aujourd'hui</p>
+            </div>
+        `;
+    }
+}
+
+// Fonction pour rafraîchir la vue actuelle
+function refreshCurrentView() {
+    if (currentView === 'arrivals') {
+        refreshArrivals();
+    } else {
+        loadDeparturesData();
+    }
+}
+
+// Fonction pour voir les détails d'un départ
+function viewDepartureDetails(reservationId) {
+    // Rediriger vers la page de détail de la réservation
+    window.location.href = `/reservation/${reservationId}`;
+}
+
+// Initialisation de l'état des chambres
+function initializeRoomsStatus() {
+    loadRoomsStatus();
+    // Recharger l'état des chambres toutes les 2 minutes
+    setInterval(loadRoomsStatus, 120000);
+}
+
+// Chargement de l'état des chambres
+async function loadRoomsStatus() {
+    try {
+        console.log('Chargement de l\'état des chambres...');
+        
+        // Afficher le chargement
+        showRoomsLoading();
+        
+        const response = await fetch('/api/rooms/status');
+        
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const rooms = await response.json();
+        console.log('Données des chambres reçues:', rooms);
+        
+        if (Array.isArray(rooms) && rooms.length > 0) {
+            displayRoomsList(rooms);
+        } else {
+            showNoRooms();
+        }
+        
+    } catch (error) {
+        console.error('Erreur lors du chargement des chambres:', error);
+        showRoomsError();
+    }
+}
+
+// Fonctions d'affichage des chambres
+function showRoomsLoading() {
+    const loadingElement = document.getElementById('rooms-loading');
+    const roomsListElement = document.getElementById('rooms-list');
+    const noRoomsElement = document.getElementById('no-rooms');
+    
+    if (loadingElement) loadingElement.style.display = 'flex';
+    if (roomsListElement) roomsListElement.style.display = 'none';
+    if (noRoomsElement) noRoomsElement.style.display = 'none';
+}
+
+function displayRoomsList(rooms) {
+    const loadingElement = document.getElementById('rooms-loading');
+    const roomsListElement = document.getElementById('rooms-list');
+    const noRoomsElement = document.getElementById('no-rooms');
+    
+    if (loadingElement) loadingElement.style.display = 'none';
+    if (noRoomsElement) noRoomsElement.style.display = 'none';
+    
+    if (roomsListElement) {
+        roomsListElement.style.display = 'flex';
+        roomsListElement.innerHTML = '';
+        
+        rooms.forEach(room => {
+            const roomElement = createRoomElement(room);
+            roomsListElement.appendChild(roomElement);
+        });
+    }
+}
+
+function createRoomElement(room) {
+    const roomElement = document.createElement('div');
+    roomElement.className = 'room-item';
+    roomElement.onclick = () => viewRoomDetails(room.reservation_id);
+    
+    // Déterminer la classe CSS pour le niveau VIP
+    let vipClass = 'vip-standard';
+    if (room.vip_level && room.vip_level !== 'Standard') {
+        if (room.vip_level.includes('VIP1')) vipClass = 'vip-vip1';
+        else if (room.vip_level.includes('VIP2')) vipClass = 'vip-vip2';
+        else if (room.vip_level.includes('VIP3')) vipClass = 'vip-vip3';
+        else if (room.vip_level.includes('VIP4')) vipClass = 'vip-vip4';
+        else if (room.vip_level.includes('VIP5')) vipClass = 'vip-vip5';
+        else if (room.vip_level.includes('VIP6')) vipClass = 'vip-vip6';
+        else if (room.vip_level.includes('VIP7')) vipClass = 'vip-vip7';
+        else if (room.vip_level.includes('VIP8')) vipClass = 'vip-vip8';
+    }
+    
+    roomElement.innerHTML = `
+        <div class="room-header">
+            <span class="room-number">Chambre ${room.room_no}</span>
+            <span class="vip-badge ${vipClass}">${room.vip_level}</span>
+        </div>
+        <div class="room-details">
+            <span class="client-name">${room.client_name}</span>
+            <span class="guests-count">
+                <i class="fas fa-users"></i>
+                ${room.num_guests} personne${room.num_guests > 1 ? 's' : ''}
+            </span>
+        </div>
+        <div class="room-click-hint">Cliquez pour voir les détails</div>
+    `;
+    
+    return roomElement;
+}
+
+function showNoRooms() {
+    const loadingElement = document.getElementById('rooms-loading');
+    const roomsListElement = document.getElementById('rooms-list');
+    const noRoomsElement = document.getElementById('no-rooms');
+    
+    if (loadingElement) loadingElement.style.display = 'none';
+    if (roomsListElement) roomsListElement.style.display = 'none';
+    if (noRoomsElement) noRoomsElement.style.display = 'flex';
+}
+
+function showRoomsError() {
+    const loadingElement = document.getElementById('rooms-loading');
+    const roomsListElement = document.getElementById('rooms-list');
+    const noRoomsElement = document.getElementById('no-rooms');
+    
+    if (loadingElement) loadingElement.style.display = 'none';
+    if (roomsListElement) roomsListElement.style.display = 'none';
+    if (noRoomsElement) {
+        noRoomsElement.style.display = 'flex';
+        noRoomsElement.innerHTML = `
+            <i class="fas fa-exclamation-triangle"></i>
+            <p>Erreur lors du chargement des chambres</p>
+            <button onclick="loadRoomsStatus()" class="btn btn-secondary">Réessayer</button>
+        `;
+    }
+}
+
+// Rafraîchir l'état des chambres
+function refreshRoomsStatus() {
+    const button = event.target.closest('button');
+    if (button) {
+        const icon = button.querySelector('i');
+        icon.classList.add('fa-spin');
+        
+        loadRoomsStatus().finally(() => {
+            setTimeout(() => {
+                icon.classList.remove('fa-spin');
+            }, 1000);
+        });
+    }
+}
+
+
+// Calendrier amélioré
+function initializeCalendar() {
+    loadCalendarData();
+}
+
+// Compteurs par jour déjà chargés (heatmap multi-mois) : {'YYYY-MM-DD': {arrivals, departures, in_house}}
+let calendarCounts = {};
+let calendarLoadedFrom = null;
+let calendarLoadedTo = null;
+
+// Formater une date locale en YYYY-MM-DD
+function formatDateKey(dateObj) {
+    const year = dateObj.getFullYear();
+    const month = String(dateObj.getMonth() + 1).padStart(2, '0');
+    const day = String(dateObj.getDate()).padStart(2, '0');
+    return `${year}-${month}-${day}`;
+}
+
+// Premier et dernier jour affichés dans la grille (6 semaines à partir du lundi)
+function getCalendarGridBounds(year, month) {
+    const firstDay = new Date(year, month - 1, 1);
+    let dayOfWeek = firstDay.getDay();
+    dayOfWeek = dayOfWeek === 0 ? 6 : dayOfWeek - 1;
+    const start = new Date(year, month - 1, 1 - dayOfWeek);
+    const end = new Date(start);
+    end.setDate(start.getDate() + 41);
+    return { start: start, end: end };
+}
+
+async function loadCalendarData(forceReload = false) {
+    try {
+        const bounds = getCalendarGridBounds(currentCalendarYear, currentCalendarMonth);
+        const gridFrom = formatDateKey(bounds.start);
+        const gridTo = formatDateKey(bounds.end);
+        
+        // Ne recharger que si la grille sort de la période déjà chargée
+        const covered = calendarLoadedFrom && calendarLoadedFrom <= gridFrom && gridTo <= calendarLoadedTo;
+        if (forceReload || !covered) {
+            // Charger le mois précédent, le mois courant et le suivant en une seule requête
+            const prev = getCalendarGridBounds(currentCalendarYear, currentCalendarMonth - 1);
+            const next = getCalendarGridBounds(currentCalendarYear, currentCalendarMonth + 1);
+            const from = formatDateKey(prev.start);
+            const to = formatDateKey(next.end);
+            
+            const response = await fetch(`/api/calendar/range?from=${from}&to=${to}`);
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            const data = await response.json();
+            calendarCounts = data.days || {};
+            calendarLoadedFrom = data.from;
+            calendarLoadedTo = data.to;
+        }
+        
+        renderCalendar({ year: currentCalendarYear, month: currentCalendarMonth, days: calendarCounts });
+        updateCalendarHeader();
+    } catch (error) {
+        console.error('Erreur lors du chargement du calendrier:', error);
+        // Afficher un message d'erreur dans le calendrier
+        const calendarContainer = document.getElementById('calendar-widget-large');
+        if (calendarContainer) {
+            calendarContainer.innerHTML = `
+                <div class="calendar-error">
+                    <i class="fas fa-exclamation-triangle"></i>
+                    <p>Erreur lors du chargement du calendrier</p>
+                    <button onclick="loadCalendarData(true)" class="btn btn-secondary">Réessayer</button>
+                </div>
+            `;
+        }
+    }
+}
+
+function renderCalendar(data) {
+    const calendarContainer = document.getElementById('calendar-widget-large');
+    if (!calendarContainer) return;
+    
+    const calendar = generateCalendarHTML(data);
+    calendarContainer.innerHTML = calendar;
+}
+
+function generateCalendarHTML(data) {
+    const year = data.year;
+    const month = data.month;
+    const days = data.days || {};
+    
+    const startDate = getCalendarGridBounds(year, month).start;
+    
+    let calendarHTML = `
+        <div class="calendar-header">
+            <div>Lun</div><div>Mar</div><div>Mer</div><div>Jeu</div><div>Ven</div><div>Sam</div><div>Dim</div>
+        </div>
+        <div class="calendar-grid">
+    `;
+    
+    const today = new Date();
+    today.setHours(0, 0, 0, 0);
+    
+    for (let i = 0; i < 42; i++) {
+        const currentDate = new Date(startDate);
+        currentDate.setDate(startDate.getDate() + i);
+        
+        const dateKey = formatDateKey(currentDate);
+        const dayData = days[dateKey] || { arrivals: 0, departures: 0, in_house: 0 };
+        
+        const isToday = currentDate.getTime() === today.getTime();
+        const isCurrentMonth = currentDate.getMonth() === month - 1;
+        const hasEvents = dayData.arrivals > 0 || dayData.departures > 0;
+        
+        let dayClass = 'calendar-day';
+        if (!isCurrentMonth) dayClass += ' other-month';
+        if (isToday) dayClass += ' today';
+        if (hasEvents) dayClass += ' has-events';
+        else if (dayData.in_house > 0) dayClass += ' has-guests';
+        
+        calendarHTML += `
+            <div class="${dayClass}" onclick="showDayDetails('${dateKey}')" style="cursor: pointer;" data-date="${dateKey}" data-day="${currentDate.getDate()}" data-in-house="${dayData.in_house}" title="+${dayData.arrivals} / -${dayData.departures} · ${dayData.in_house} présent(s)">
+                <div class="day-number">${currentDate.getDate()}</div>
+                ${hasEvents ? `<div class="day-events">
+                    ${dayData.arrivals > 0 ? `<div class="event-dot arrival"></div>` : ''}
+                    ${dayData.departures > 0 ? `<div class="event-dot departure"></div>` : ''}
+                </div>` : ''}
+            </div>
+        `;
+    }
+    
+    calendarHTML += '</div>';
+    return calendarHTML;
+}
+
+function updateCalendarHeader() {
+    const monthElement = document.getElementById('current-month');
+    if (monthElement) {
+        const monthNames = [
+            'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
+            'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre'
+        ];
+        monthElement.textContent = `${monthNames[currentCalendarMonth - 1]} ${currentCalendarYear}`;
+    }
+}
+
+function previousMonth() {
+    currentCalendarMonth--;
+    if (currentCalendarMonth < 1) {
+        currentCalendarMonth = 12;
+        currentCalendarYear--;
+    }
+    loadCalendarData();
+}
+
+function nextMonth() {
+    currentCalendarMonth++;
+    if (currentCalendarMonth > 12) {
+        currentCalendarMonth = 1;
+        currentCalendarYear++;
+    }
+    loadCalendarData();
+}
+
+async function showDayDetails(date) {
+    try {
+        // Charger la liste des clients uniquement pour le jour sélectionné
+        const response = await fetch(`/api/calendar/day/${date}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const dayData = await response.json();
+        
+        // Formater la date
+        const dateObj = new Date(date);
+        const dateStr = dateObj.toLocaleDateString('fr-FR', { 
+            weekday: 'long', 
+            year: 'numeric', 
+            month: 'long', 
+            day: 'numeric' 
+        });
+        
+        // Créer le contenu HTML pour le panneau
+        let detailsHTML = `
+            <div class="day-details-header">
+                <h4><i class="fas fa-calendar-day"></i> ${dateStr}</h4>
+            </div>
+        `;
+        
+        // Section Arrivées
+        if (dayData.arrivals && dayData.arrivals.length > 0) {
+            detailsHTML += `
+                <div class="activity-section">
+                    <h4 class="activity-title arrival-title">
+                        <i class="fas fa-sign-in-alt"></i> Arrivées (${dayData.arrivals.length})
+                    </h4>
+                    <div class="guests-list">
+            `;
+            
+            dayData.arrivals.forEach(guest => {
+                detailsHTML += `
+                    <div class="guest-item arrival-item" onclick="viewReservation('${guest.reservation_id}')">
+                        <div class="guest-info">
+                            <div class="guest-name">${guest.client_name}</div>
+                            <div class="guest-room">Chambre ${guest.room_no}</div>
+                        </div>
+                        <div class="guest-actions">
+                            <i class="fas fa-chevron-right"></i>
+                        </div>
+                    </div>
+                `;
+            });
+            
+            detailsHTML += `
+                    </div>
+                </div>
+            `;
+        }
+        
+        // Section Départs
+        if (dayData.departures && dayData.departures.length > 0) {
+            detailsHTML += `
+                <div class="activity-section">
+                    <h4 class="activity-title departure-title">
+                        <i class="fas fa-sign-out-alt"></i> Départs (${dayData.departures.length})
+                    </h4>
+                    <div class="guests-list">
+            `;
+            
+            dayData.departures.forEach(guest => {
+                detailsHTML += `
+                    <div class="guest-item departure-item" onclick="viewReservation('${guest.reservation_id}')">
+                        <div class="guest-info">
+                            <div class="guest-name">${guest.client_name}</div>
+                            <div class="guest-room">Chambre ${guest.room_no}</div>
+                        </div>
+                        <div class="guest-actions">
+                            <i class="fas fa-chevron-right"></i>
+                        </div>
+                    </div>
+                `;
+            });
+            
+            detailsHTML += `
+                    </div>
+                </div>
+            `;
+        }
+        
+
+        
+        // Si aucune activité
+        if ((!dayData.arrivals || dayData.arrivals.length === 0) && 
+            (!dayData.departures || dayData.departures.length === 0)) {
+            detailsHTML += `
+                <div class="empty-day">
+                    <i class="fas fa-calendar-times"></i>
+                    <p>Aucune activité prévue pour cette journée</p>
+                    <p><small>Date sélectionnée: ${date}</small></p>
+                </div>
+            `;
+        }
+        
+        // Mettre à jour le contenu du panneau
+        const detailsContent = document.getElementById('day-details-content');
+        if (detailsContent) {
+            detailsContent.innerHTML = detailsHTML;
+            console.log('Contenu du panneau mis à jour avec succès');
+        } else {
+            console.error('Panneau de détails non trouvé');
+        }
+        
+        console.log('showDayDetails terminé avec succès');
+        
+    } catch (error) {
+        console.error('Erreur lors du chargement des détails:', error);
+        showToast('Erreur lors du chargement des détails de la journée');
+    }
+}
+
+// Fermer le panneau de détails
+function closeDayDetails() {
+    const detailsContent = document.getElementById('day-details-content');
+    if (detailsContent) {
+        detailsContent.innerHTML = `
+            <div class="day-details-placeholder">
+                <i class="fas fa-calendar-plus"></i>
+                <p>Sélectionnez une date dans le calendrier pour voir les détails</p>
+            </div>
+        `;
+    }
+}
+
+// Export des fonctions principales du dashboard
+window.initializeCalendar = initializeCalendar;
+window.loadCalendarData = loadCalendarData;
+window.renderCalendar = renderCalendar;
+window.generateCalendarHTML = generateCalendarHTML;
+window.previousMonth = previousMonth;
+window.nextMonth = nextMonth;
+window.showDayDetails = showDayDetails;
+window.closeDayDetails = closeDayDetails;
+window.initializeRoomsStatus = initializeRoomsStatus;
+window.refreshRoomsStatus = refreshRoomsStatus;
+window.loadRoomsStatus = loadRoomsStatus;
+window.switchView = switchView;
+window.refreshCurrentView = refreshCurrentView;
+window.viewDepartureDetails = viewDepartureDetails;
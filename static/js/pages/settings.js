@@ -0,0 +1,220 @@
+// Page des paramètres : thème, langue, densité, notifications
+
+// ===== FONCTIONS POUR LA PAGE DES PARAMÈTRES =====
+
+// Fonction pour définir le thème
+function setTheme(theme) {
+    currentTheme = theme;
+    document.documentElement.setAttribute('data-theme', theme);
+    document.body.className = theme === 'dark' ? 'dark-theme' : '';
+    localStorage.setItem('theme', theme);
+    
+    // Mettre à jour l'état actif des boutons de thème (seulement s'ils existent)
+    const themeOptions = document.querySelectorAll('.theme-option-modern');
+    if (themeOptions.length > 0) {
+        themeOptions.forEach(btn => {
+            btn.classList.remove('active');
+        });
+        const activeThemeBtn = document.querySelector(`[data-theme="${theme}"]`);
+        if (activeThemeBtn) {
+            activeThemeBtn.classList.add('active');
+        }
+    }
+    
+    // Afficher une notification
+    showToast(`Thème ${theme === 'dark' ? 'sombre' : 'clair'} activé`);
+    
+    // Mettre à jour l'icône du thème dans le header si elle existe
+    const headerThemeToggle = document.getElementById('theme-toggle');
+    if (headerThemeToggle) {
+        const icon = headerThemeToggle.querySelector('i');
+        if (icon) {
+            icon.className = theme === 'dark' ? 'fas fa-sun' : 'fas fa-moon';
+        }
+    }
+}
+
+// Fonction pour définir la langue
+function setLanguage(language) {
+    // Rediriger vers la route de changement de langue
+    window.location.href = `/change-language/${language}`;
+}
+
+// Fonction pour définir la densité d'affichage
+function setDensity(density) {
+    // Mettre à jour l'état actif des options de densité (seulement si elles existent)
+    const densityOptions = document.querySelectorAll('.density-option');
+    if (densityOptions.length > 0) {
+        densityOptions.forEach(option => {
+            option.classList.remove('active');
+        });
+        const activeDensityOption = document.querySelector(`[data-density="${density}"]`);
+        if (activeDensityOption) {
+            activeDensityOption.classList.add('active');
+        }
+    }
+    
+    // Sauvegarder dans le localStorage
+    localStorage.setItem('density', density);
+    
+    // Appliquer la densité (exemple)
+    if (density === 'compact') {
+        document.body.classList.add('compact-mode');
+    } else {
+        document.body.classList.remove('compact-mode');
+    }
+    
+    showToast(`Mode ${density === 'compact' ? 'compact' : 'confortable'} activé`);
+}
+
+// Fonction pour activer/désactiver les notifications
+function toggleNotifications(enabled) {
+    if (enabled) {
+        // Demander la permission pour les notifications
+        if ('Notification' in window) {
+            Notification.requestPermission().then(permission => {
+                if (permission === 'granted') {
+                    showToast('Notifications push activées');
+                } else {
+                    showToast('Permission refusée pour les notifications');
+                    // Remettre le toggle à false
+                    document.getElementById('notifications-toggle').checked = false;
+                }
+            });
+        } else {
+            showToast('Notifications non supportées par ce navigateur');
+            document.getElementById('notifications-toggle').checked = false;
+        }
+    } else {
+        showToast('Notifications push désactivées');
+    }
+    
+    // Sauvegarder la préférence
+    localStorage.setItem('notifications', enabled);
+}
+
+// Fonction pour activer/désactiver les notifications email
+function toggleEmailNotifications(enabled) {
+    localStorage.setItem('emailNotifications', enabled);
+    showToast(`Notifications email ${enabled ? 'activées' : 'désactivées'}`);
+}
+
+// Fonction pour activer/désactiver les animations
+function toggleAnimations(enabled) {
+    if (enabled) {
+        document.body.classList.remove('no-animations');
+        showToast('Animations activées');
+    } else {
+        document.body.classList.add('no-animations');
+        showToast('Animations désactivées');
+    }
+    
+    localStorage.setItem('animations', enabled);
+}
+
+// Fonction pour activer/désactiver la sauvegarde automatique
+function toggleAutoSave(enabled) {
+    localStorage.setItem('autoSave', enabled);
+    showToast(`Sauvegarde automatique ${enabled ? 'activée' : 'désactivée'}`);
+}
+
+// Fonction pour sauvegarder tous les paramètres
+function saveSettings() {
+    // Collecter tous les paramètres
+    const settings = {
+        theme: currentTheme,
+        language: document.querySelector('.language-option .checkmark.active')?.parentElement.dataset.lang || 'fr',
+        density: document.querySelector('.density-option .checkmark.active')?.parentElement.dataset.density || 'comfortable',
+        notifications: document.getElementById('notifications-toggle')?.checked || false,
+        emailNotifications: document.getElementById('email-notifications-toggle')?.checked || false,
+        animations: document.getElementById('animations-toggle')?.checked || true,
+        autoSave: document.getElementById('auto-save-toggle')?.checked || true
+    };
+    
+    // Sauvegarder dans le localStorage
+    Object.entries(settings).forEach(([key, value]) => {
+        localStorage.setItem(key, value);
+    });
+    
+    // Afficher une notification de succès
+    showToast('Paramètres sauvegardés avec succès !', 'success');
+    
+    // Optionnel : envoyer au serveur
+    // saveSettingsToServer(settings);
+}
+
+// Fonction pour réinitialiser les paramètres
+function resetSettings() {
+    // Afficher le modal de confirmation
+    const modal = document.getElementById('reset-modal');
+    if (modal) {
+        modal.classList.add('active');
+    }
+}
+
+// Fonction pour fermer le modal de réinitialisation
+function closeResetModal() {
+    const modal = document.getElementById('reset-modal');
+    if (modal) {
+        modal.classList.remove('active');
+    }
+}
+
+// Fonction pour confirmer la réinitialisation
+function confirmReset() {
+    // Réinitialiser tous les paramètres aux valeurs par défaut
+    const defaultSettings = {
+        theme: 'light',
+        language: 'fr',
+        density: 'comfortable',
+        notifications: false,
+        emailNotifications: false,
+        animations: true,
+        autoSave: true
+    };
+    
+    // Appliquer les paramètres par défaut
+    Object.entries(defaultSettings).forEach(([key, value]) => {
+        localStorage.setItem(key, value);
+    });
+    
+    // Appliquer le thème par défaut
+    setTheme('light');
+    
+    // Remettre tous les toggles à leur état par défaut
+    if (document.getElementById('notifications-toggle')) {
+        document.getElementById('notifications-toggle').checked = false;
+    }
+    if (document.getElementById('email-notifications-toggle')) {
+        document.getElementById('email-notifications-toggle').checked = false;
+    }
+    if (document.getElementById('animations-toggle')) {
+        document.getElementById('animations-toggle').checked = true;
+    }
+    if (document.getElementById('auto-save-toggle')) {
+        document.getElementById('auto-save-toggle').checked = true;
+    }
+    
+    // Mettre à jour l'état actif des options
+    updateActiveStates();
+    
+    // Fermer le modal
+    closeResetModal();
+    
+    // Afficher une notification
+    showToast('Paramètres réinitialisés aux valeurs par défaut', 'success');
+}
+
+
+// Export des fonctions des paramètres
+window.setTheme = setTheme;
+window.setLanguage = setLanguage;
+window.setDensity = setDensity;
+window.toggleNotifications = toggleNotifications;
+window.toggleEmailNotifications = toggleEmailNotifications;
+window.toggleAnimations = toggleAnimations;
+window.toggleAutoSave = toggleAutoSave;
+window.saveSettings = saveSettings;
+window.resetSettings = resetSettings;
+window.closeResetModal = closeResetModal;
+window.confirmReset = confirmReset;
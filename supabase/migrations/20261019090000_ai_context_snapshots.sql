@@ -0,0 +1,17 @@
+-- Snapshots de contexte du chatbot, stockés une seule fois par contenu
+-- (ai_interactions.context_data.hotel_context_ref contient l'empreinte)
+
+create table if not exists public.ai_context_snapshots (
+    hash text primary key,              -- SHA-256 hexadécimal du contenu sérialisé
+    content jsonb not null,             -- contexte hôtel envoyé au modèle
+    size_chars integer not null,
+    created_at timestamptz not null default now()
+);
+
+alter table public.ai_context_snapshots enable row level security;
+
+-- Lecture pour les utilisateurs connectés ; les écritures passent par la clé serveur
+create policy "ai_context_snapshots_select_authenticated"
+    on public.ai_context_snapshots for select
+    to authenticated
+    using (true);
@@ -0,0 +1,38 @@
+-- Rétention de ai_interactions : index de l'historique, résumés et archive
+
+-- Historique du chatbot : dernières lignes d'un utilisateur
+create index if not exists ai_interactions_staff_user_created_idx
+    on public.ai_interactions (staff_user_id, created_at desc);
+
+-- Purge par ancienneté
+create index if not exists ai_interactions_created_idx
+    on public.ai_interactions (created_at);
+
+-- Résumé des conversations compactées, par utilisateur et par période
+create table if not exists public.ai_conversation_summaries (
+    id bigint generated always as identity primary key,
+    staff_user_id uuid not null,
+    period_start timestamptz not null,
+    period_end timestamptz not null,
+    interactions_count integer not null,
+    topics jsonb not null default '{}'::jsonb,   -- intention → nombre de questions
+    summary text not null,
+    avg_response_time_ms integer,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists ai_conversation_summaries_user_idx
+    on public.ai_conversation_summaries (staff_user_id, period_end desc);
+
+-- Lignes brutes déplacées par le job de rétention (AI_RETENTION_MODE=archive)
+create table if not exists public.ai_interactions_archive
+    (like public.ai_interactions including all);
+
+alter table public.ai_interactions_archive
+    add column if not exists archived_at timestamptz not null default now();
+
+create index if not exists ai_interactions_archive_created_idx
+    on public.ai_interactions_archive (created_at);
+
+alter table public.ai_conversation_summaries enable row level security;
+alter table public.ai_interactions_archive enable row level security;
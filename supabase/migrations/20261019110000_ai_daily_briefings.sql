@@ -0,0 +1,16 @@
+-- Briefing du jour partagé par le personnel (une ligne par date et par langue)
+
+create table if not exists public.ai_daily_briefings (
+    briefing_date date not null,
+    language text not null,
+    version text not null,                -- empreinte des données utilisées
+    content text not null,                -- arrivées, départs, VIP, allergies, alertes
+    data jsonb not null,
+    summary text,                         -- points d'attention rédigés par le modèle
+    summary_version text,
+    summary_generated_at timestamptz,
+    generated_at timestamptz not null default now(),
+    primary key (briefing_date, language)
+);
+
+alter table public.ai_daily_briefings enable row level security;
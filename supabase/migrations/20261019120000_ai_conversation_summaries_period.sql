@@ -0,0 +1,13 @@
+-- Résumés de conversations : un seul résumé par utilisateur et par jour
+-- Le job de rétention écrit ses résumés en upsert sur cette clé : relancé avant la
+-- compaction, il réécrit les mêmes lignes au lieu d'ajouter des doublons.
+
+-- Doublons laissés par les exécutions précédentes : garder le plus récent
+delete from public.ai_conversation_summaries older
+    using public.ai_conversation_summaries newer
+    where older.staff_user_id = newer.staff_user_id
+      and older.period_start = newer.period_start
+      and older.id < newer.id;
+
+create unique index if not exists ai_conversation_summaries_user_period_key
+    on public.ai_conversation_summaries (staff_user_id, period_start);
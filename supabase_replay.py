@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Enregistrement et rejeu du trafic Supabase (PostgREST)
+- Enregistrement (SUPABASE_RECORD_FILE) : chaque requête de l'application et sa
+  réponse sont écrites dans un fichier JSONL avec la latence mesurée. Sont
+  pseudonymisées avant l'écriture :
+  - les colonnes listées dans PII_FIELDS (motifs * acceptés, ex: preferences_*) ;
+  - dans les tables de PRIVATE_TABLES (chatbot, clients, réservations), tout texte
+    et tout JSON sauf les colonnes de CLEAR_FIELDS (identifiants, dates, statuts) :
+    une nouvelle colonne y est pseudonymisée par défaut ;
+  - les lignes passées aux fonctions enregistrées avec register_scrubber.
+- Rejeu (SUPABASE_BACKEND=replay, SUPABASE_REPLAY_FILE) : les réponses enregistrées
+  sont servies de façon déterministe, dans l'ordre d'enregistrement pour une même
+  requête, avec la latence d'origine multipliée par SUPABASE_REPLAY_LATENCY_SCALE
+  (0 = sans latence). Les dates du jour sont décalées vers le jour d'enregistrement.
+
+Les requêtes sont identifiées par une empreinte HMAC-SHA256 (méthode, table,
+paramètres, en-têtes Prefer/Accept, corps) calculée avec la clé de l'enregistrement,
+qui sert aussi aux pseudonymes : SUPABASE_RECORD_SALT, ou à défaut une clé aléatoire
+écrite à côté de l'enregistrement (fichier .key, droits 0600) et jamais dans
+l'enregistrement lui-même. Sans la clé, ni les recherches ni les valeurs
+pseudonymisées ne peuvent être retrouvées en essayant des valeurs connues.
+
+Usage : python supabase_replay.py enregistrement.jsonl — latences par table et requêtes les plus lentes
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hmac
+import hashlib
+import secrets
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import httpx
+
+DEFAULT_PII_FIELDS = [
+    # Identité et coordonnées des clients et du personnel
+    'guest_name', 'guest_name_id', 'first_name', 'last_name', 'email', 'telephone', 'date_naissance',
+    'nationalite', 'company_name',
+    # Préférences, demandes et remarques (santé, habitudes, texte libre)
+    'preferences_*', 'special_requests', 'remarques_sejour', 'notes_internes', 'remarques_internes',
+    # Texte libre généré ou saisi (chatbot, briefings, alertes, snapshots de contexte)
+    'question', 'response', 'ai_response', 'context_data', 'content', 'data', 'summary', 'message',
+]
+# Tables où tout texte et tout JSON est pseudonymisé, sauf les colonnes de CLEAR_FIELDS
+DEFAULT_PRIVATE_TABLES = ['ai_*', 'clients', 'reservations']
+DEFAULT_CLEAR_FIELDS = [
+    # Identifiants et empreintes (guest_name_id reste pseudonymisé : PII_FIELDS prime)
+    'id', '*_id', 'hash', '*_ref', 'version', '*_version',
+    # Dates et horodatages
+    '*_at', '*_date', 'arrival', 'departure', 'arrival_time', 'departure_time', 'period_start', 'period_end',
+    # Statuts et classements
+    'statut', 'status', 'vip', 'room_no', 'room_number', 'room_category*', 'rate_code',
+    'alert_type', 'priority', 'language', 'role', 'topics',
+]
+
+def env_list(name, default):
+    return [item.strip() for item in os.getenv(name, ','.join(default)).split(',') if item.strip()]
+
+def field_pattern(fields):
+    """Motifs de colonnes ('preferences_*') -> expression régulière"""
+    return '|'.join(re.escape(field).replace(r'\*', r'\w*') for field in fields) or r'(?!)'
+
+PII_FIELDS = env_list('SUPABASE_RECORD_PII_FIELDS', DEFAULT_PII_FIELDS)
+PRIVATE_TABLES = env_list('SUPABASE_RECORD_PRIVATE_TABLES', DEFAULT_PRIVATE_TABLES)
+CLEAR_FIELDS = env_list('SUPABASE_RECORD_CLEAR_FIELDS', DEFAULT_CLEAR_FIELDS)
+PII_FIELD_PATTERN = field_pattern(PII_FIELDS)
+PII_FIELD_RE = re.compile(rf'(?:{PII_FIELD_PATTERN})')
+PRIVATE_TABLE_RE = re.compile(rf'(?:{field_pattern(PRIVATE_TABLES)})')
+CLEAR_FIELD_RE = re.compile(rf'(?:{field_pattern(CLEAR_FIELDS)})')
+KEY_FILE_SUFFIX = '.key'
+QUERY_RESERVED_PARAMS = ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns')
+RECORDED_HEADERS = ('content-type', 'content-range')
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Fonctions de pseudonymisation supplémentaires : fn(table, ligne) -> ligne
+SCRUBBERS = []
+
+def register_scrubber(function):
+    """Ajouter une fonction de pseudonymisation (utilisable comme décorateur)"""
+    SCRUBBERS.append(function)
+    return function
+
+# ============================================================================
+# PSEUDONYMISATION
+# ============================================================================
+
+def is_pii_field(name, table=None):
+    """Colonne à pseudonymiser : motif de PII_FIELDS, ou colonne d'une table de
+    PRIVATE_TABLES absente de CLEAR_FIELDS"""
+    if PII_FIELD_RE.fullmatch(name):
+        return True
+    return bool(table) and PRIVATE_TABLE_RE.fullmatch(table) is not None \
+        and CLEAR_FIELD_RE.fullmatch(name) is None
+
+def keyed_digest(key, text):
+    """HMAC-SHA256 hexadécimal d'un texte avec la clé de l'enregistrement"""
+    return hmac.new(key.encode('utf-8'), text.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def pseudonym(value, salt):
+    """Remplacement stable (même valeur = même pseudonyme dans un enregistrement)"""
+    digest = keyed_digest(salt, value)
+    if '@' in value:
+        return f"{digest[:12]}@example.invalid"
+    return (digest * (len(value) // 64 + 1))[:max(len(value), 8)]
+
+def scrub_value(value, salt):
+    """Pseudonymiser toutes les chaînes d'une valeur (y compris JSON imbriqué)"""
+    if isinstance(value, str):
+        return pseudonym(value, salt)
+    if isinstance(value, dict):
+        return {key: scrub_value(item, salt) for key, item in value.items()}
+    if isinstance(value, list):
+        return [scrub_value(item, salt) for item in value]
+    return value
+
+def scrub_rows(table, body, salt):
+    """Pseudonymiser les lignes d'une réponse ou d'un corps de requête"""
+    if isinstance(body, list):
+        return [scrub_rows(table, row, salt) for row in body]
+    if not isinstance(body, dict):
+        return body
+    row = {key: scrub_value(value, salt) if is_pii_field(key, table) else value for key, value in body.items()}
+    for scrubber in SCRUBBERS:
+        row = scrubber(table, row)
+    return row
+
+def scrub_query(query, salt, table=None):
+    """Masquer les opérandes des filtres sur des champs PII (cf. is_pii_field) et des
+    recherches texte (like/ilike), y compris dans les groupes or=(...)"""
+    def mask(match):
+        column, operator, operand = match.groups()
+        root = re.split(r'->>?', column)[0]  # chemin JSON : colonne d'origine
+        if root in QUERY_RESERVED_PARAMS or not (is_pii_field(root, table) or operator.endswith('like.')):
+            return match.group(0)
+        return f"{column}{operator}{pseudonym(operand, salt)[:12]}"
+    return re.sub(r'(?<![\w.>:])(\w+(?:->>?\w+)*)((?:=|\.)(?:not\.)?\w+\.)(\([^)]*\)|[^,&)]*)', mask, query)
+
+# ============================================================================
+# IDENTIFICATION DES REQUÊTES
+# ============================================================================
+
+def shift_dates(text, days):
+    """Décaler toutes les dates ISO d'un texte (rejeu un autre jour)"""
+    if not days:
+        return text
+    def shift(match):
+        try:
+            return (date.fromisoformat(match.group(0)) + timedelta(days=days)).isoformat()
+        except ValueError:
+            return match.group(0)
+    return DATE_PATTERN.sub(shift, text)
+
+def describe_request(request, date_shift=0):
+    """(méthode, table, paramètres triés, en-têtes, corps canonique)"""
+    path = request.url.path.split('/rest/v1/', 1)[-1].rstrip('/')
+    query = shift_dates('&'.join(f"{key}={value}" for key, value in sorted(request.url.params.multi_items())), date_shift)
+    headers = f"{request.headers.get('Prefer', '')}|{request.headers.get('Accept', '')}"
+    body = request.content.decode('utf-8') if request.content else ''
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True) if body else ''
+    except ValueError:
+        pass
+    return request.method, path, query, headers, shift_dates(body, date_shift)
+
+def request_keys(request, key, date_shift=0):
+    """Empreinte exacte et empreinte sans le corps (écritures horodatées), avec la clé
+    de l'enregistrement"""
+    method, path, query, headers, body = describe_request(request, date_shift)
+    loose = f"{method} {path}?{query} {headers}"
+    return keyed_digest(key, f"{loose} {body}"), keyed_digest(key, loose)
+
+def key_fingerprint(key):
+    """Identifiant de la clé, écrit dans l'en-tête pour détecter une clé erronée au rejeu"""
+    return keyed_digest(key, 'supabase-recording')[:16]
+
+def load_recording_key(path, create=False):
+    """Clé d'un enregistrement : SUPABASE_RECORD_SALT, sinon le fichier <enregistrement>.key
+    (créé avec des droits 0600 si create) ; None si introuvable"""
+    key = os.getenv('SUPABASE_RECORD_SALT')
+    if key:
+        return key
+    key_path = f"{path}{KEY_FILE_SUFFIX}"
+    if os.path.exists(key_path):
+        with open(key_path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    if not create:
+        return None
+    key = secrets.token_hex(32)
+    with os.fdopen(os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w', encoding='utf-8') as f:
+        f.write(key + '\n')
+    print(f"🔑 Clé de l'enregistrement écrite dans {key_path} (nécessaire au rejeu, à ne pas partager avec lui)")
+    return key
+
+# ============================================================================
+# ENREGISTREMENT
+# ============================================================================
+
+class RecordingTransport(httpx.BaseTransport):
+    """Transport httpx qui transmet les requêtes et enregistre les échanges"""
+
+    def __init__(self, path, inner, salt=None):
+        self.path = path
+        self.inner = inner
+        self.salt = salt or load_recording_key(path, create=True)
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        with self.lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'type': 'header', 'recorded_on': date.today().isoformat(),
+                                'started_at': datetime.now().isoformat(),
+                                'key_fingerprint': key_fingerprint(self.salt),
+                                'scrubbed_fields': PII_FIELDS, 'private_tables': PRIVATE_TABLES,
+                                'clear_fields': CLEAR_FIELDS}) + '\n')
+
+    def handle_request(self, request):
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        latency_ms = (time.perf_counter() - started) * 1000
+        response.close()
+
+        method, table, query, _, _ = describe_request(request)
+        exact_key, loose_key = request_keys(request, self.salt)
+        try:
+            body = json.loads(content) if content else None
+        except ValueError:
+            body = content.decode('utf-8', errors='replace')
+        try:
+            request_body = json.loads(request.content) if request.content else None
+        except ValueError:
+            request_body = None
+
+        exchange = {
+            'type': 'exchange',
+            'key': exact_key,
+            'loose_key': loose_key,
+            'method': method,
+            'table': table,
+            'query': scrub_query(query, self.salt, table),
+            'request_body': scrub_rows(table, request_body, self.salt),
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            'body': scrub_rows(table, body, self.salt),
+            'bytes': len(content),
+            'latency_ms': round(latency_ms, 2),
+            'at_s': round(started - self.started, 3),
+        }
+        with self.lock:
+            self.calls[(method, table)] += 1
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(exchange, ensure_ascii=False, default=str) + '\n')
+
+        # Corps déjà décompressé par read() : ne pas retransmettre l'encodage d'origine
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+def record_supabase_traffic(client, path):
+    """Enregistrer tout le trafic PostgREST d'un client (réel ou en mémoire)"""
+    from fake_supabase import use_postgrest_transport
+    inner = getattr(client, 'fake_transport', None) or httpx.HTTPTransport(http2=True)
+    transport = RecordingTransport(path, inner)
+    use_postgrest_transport(client, transport)
+    return transport
+
+# ============================================================================
+# REJEU
+# ============================================================================
+
+def load_recording(path):
+    """(en-tête, échanges) d'un fichier d'enregistrement"""
+    header, exchanges = {}, []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('type') == 'header':
+                header = header or entry
+            else:
+                exchanges.append(entry)
+    return header, exchanges
+
+class ReplayTransport(httpx.BaseTransport):
+    """Transport httpx qui sert les réponses d'un enregistrement"""
+
+    def __init__(self, path, latency_scale=0, salt=None):
+        header, exchanges = load_recording(path)
+        self.salt = salt or load_recording_key(path)
+        if not self.salt:
+            raise RuntimeError(f"Clé de l'enregistrement introuvable : SUPABASE_RECORD_SALT ou {path}{KEY_FILE_SUFFIX}")
+        if header.get('key_fingerprint') != key_fingerprint(self.salt):
+            raise RuntimeError(f"La clé ne correspond pas à l'enregistrement {path} (SUPABASE_RECORD_SALT ou {path}{KEY_FILE_SUFFIX})")
+        self.latency_scale = latency_scale
+        recorded_on = header.get('recorded_on')
+        self.date_shift = (date.fromisoformat(recorded_on) - date.today()).days if recorded_on else 0
+        self.exact, self.loose = {}, {}
+        for exchange in exchanges:
+            self.exact.setdefault(exchange['key'], []).append(exchange)
+            self.loose.setdefault(exchange['loose_key'], []).append(exchange)
+        self.served = Counter()   # empreinte -> nombre de réponses servies
+        self.calls = Counter()
+        self.misses = Counter()
+        self.lock = threading.Lock()
+        print(f"📼 Rejeu Supabase: {len(exchanges)} échange(s) de {path}"
+              f"{f' (dates décalées de {self.date_shift} j)' if self.date_shift else ''}")
+
+    def next_exchange(self, request):
+        """Réponse suivante pour cette requête (la dernière est répétée une fois épuisées)"""
+        exact_key, loose_key = request_keys(request, self.salt, self.date_shift)
+        for index, key in ((self.exact, exact_key), (self.loose, loose_key)):
+            if key in index:
+                with self.lock:
+                    position = self.served[key]
+                    self.served[key] += 1
+                recordings = index[key]
+                return recordings[min(position, len(recordings) - 1)]
+        return None
+
+    def handle_request(self, request):
+        method, table, query, _, _ = describe_request(request)
+        exchange = self.next_exchange(request)
+        with self.lock:
+            self.calls[(method, table)] += 1
+            if exchange is None:
+                self.misses[f"{method} {table}"] += 1
+                first_miss = self.misses[f"{method} {table}"] == 1
+        if exchange is None:
+            if first_miss:
+                print(f"⚠️ Requête absente de l'enregistrement: {method} {table}?{query[:120]}")
+            payload = {'code': 'REPLAY', 'message': "Requête absente de l'enregistrement", 'details': None, 'hint': None}
+            return httpx.Response(404, json=payload, request=request)
+
+        if self.latency_scale:
+            time.sleep(exchange['latency_ms'] * self.latency_scale / 1000)
+        content = b'' if exchange['body'] is None else json.dumps(exchange['body']).encode('utf-8')
+        return httpx.Response(exchange['status'], headers=exchange['headers'], content=content, request=request)
+
+# ============================================================================
+# ANALYSE D'UN ENREGISTREMENT
+# ============================================================================
+
+def summarize_recording(path, slowest=10):
+    """Latences par (méthode, table) et requêtes les plus lentes"""
+    from bench_chatbot import latency_summary
+    header, exchanges = load_recording(path)
+    print(f"📼 {len(exchanges)} échange(s) enregistré(s) le {header.get('recorded_on', '?')}")
+    groups = {}
+    for exchange in exchanges:
+        groups.setdefault(f"{exchange['method']} {exchange['table']}", []).append(exchange)
+    print(f"   {'requête':<36} {'nb':>6} {'p50':>8} {'p95':>8} {'max':>8} {'Ko':>8}")
+    for name, items in sorted(groups.items(), key=lambda item: -sum(e['latency_ms'] for e in item[1])):
+        summary = latency_summary([e['latency_ms'] for e in items])
+        print(f"   {name:<36} {summary['count']:>6} {summary['p50']:>8.1f} {summary['p95']:>8.1f} "
+              f"{summary['max']:>8.1f} {sum(e['bytes'] for e in items) // 1024:>8}")
+    print("🐢 Requêtes les plus lentes")
+    for exchange in sorted(exchanges, key=lambda e: -e['latency_ms'])[:slowest]:
+        print(f"   {exchange['latency_ms']:>8.1f} ms  {exchange['method']} {exchange['table']}?{exchange['query'][:100]}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage : python supabase_replay.py enregistrement.jsonl")
+        sys.exit(1)
+    summarize_recording(sys.argv[1])
+    sys.exit(0)
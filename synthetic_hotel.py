@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Générateur d'hôtel synthétique pour le backend en mémoire (fake_supabase.py)
+Produit des tables au format Supabase : clients, reservations, ai_alerts,
+staff_directory, ai_interactions et ai_context_snapshots. Les réservations
+couvrent plusieurs années chambre par chambre (sans chevauchement) et leur statut
+est cohérent avec la date du jour. Même graine = mêmes données.
+
+Usage : python synthetic_hotel.py [--rooms 120] [--years 3] [--clients 20000]
+                                  [--seed 42] [--output hotel.json]
+"""
+
+import sys
+import json
+import uuid
+import random
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+
+FIRST_NAMES = ['Jean', 'Marie', 'Pierre', 'Sophie', 'Luca', 'Giulia', 'John', 'Emma', 'Hans', 'Anna',
+               'Carlos', 'Lucia', 'Yuki', 'Kenji', 'Fatima', 'Omar', 'Olga', 'Ivan', 'Chloé', 'Louis']
+LAST_NAMES = ['Martin', 'Bernard', 'Dubois', 'Rossi', 'Bianchi', 'Smith', 'Johnson', 'Müller', 'Schmidt',
+              'Garcia', 'Lopez', 'Tanaka', 'Sato', 'Haddad', 'Petrov', 'Ivanova', 'Laurent', 'Moreau']
+TITLES = ['M.', 'Mme', 'Dr', 'Mr', 'Mrs']
+NATIONALITIES = ['FR', 'IT', 'GB', 'US', 'DE', 'ES', 'JP', 'AE', 'RU', 'CH']
+ROOM_CATEGORIES = ['Chambre Deluxe', 'Chambre Supérieure', 'Junior Suite', 'Suite', 'Suite Présidentielle']
+RATE_CODES = ['BAR', 'BB', 'CORP', 'PKG', 'ADV']
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella', 'Stark Industries']
+
+DIETARY = ['Allergie aux fruits à coque', 'Végétarien', 'Sans gluten', 'Allergie aux crustacés',
+           'Végan', 'Sans lactose', 'Halal', 'Casher']
+ROOM_PREFERENCES = ['Étage élevé', 'Lit king size', 'Chambre calme', 'Vue mer', 'Oreillers en plumes',
+                    'Chambre proche ascenseur', 'Baignoire']
+OPERA = ['Loge privée', 'Places orchestre', 'Ballet', 'Opéra italien']
+TRANSPORT = ['Transfert aéroport', 'Limousine', 'Voiture électrique', 'Chauffeur privé']
+SERVICES = ['Spa', 'Majordome', 'Pressing', 'Réveil 6h', 'Journal Le Monde']
+SPECIAL_REQUESTS = ['Champagne à l\'arrivée', 'Lit bébé', 'Arrivée tardive', 'Fleurs dans la chambre',
+                    'Anniversaire', 'Early check-in', 'Late check-out', 'Chambres communicantes']
+ALERT_TYPES = [('maintenance', 'Climatisation en panne'), ('housekeeping', 'Chambre à préparer en priorité'),
+               ('vip', 'Arrivée VIP'), ('security', 'Objet trouvé'), ('guest', 'Réclamation client')]
+DEPARTMENTS = {
+    'Réception': ['Réceptionniste', 'Chef de réception', 'Night auditor'],
+    'Conciergerie': ['Concierge', 'Chef concierge'],
+    'Housekeeping': ['Gouvernante', 'Femme de chambre', 'Valet'],
+    'Restauration': ['Maître d\'hôtel', 'Chef de rang', 'Sommelier'],
+    'Maintenance': ['Technicien', 'Responsable technique'],
+}
+
+def maybe(rng, probability, choices):
+    """Valeur choisie avec une probabilité donnée, sinon None"""
+    return rng.choice(choices) if rng.random() < probability else None
+
+def generate_clients(rng, count, today):
+    clients = []
+    for client_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created = today - timedelta(days=rng.randint(0, 3650))
+        clients.append({
+            'id': client_id,
+            'guest_name': f"{last.upper()} {first}",
+            'guest_title': rng.choice(TITLES),
+            'guest_name_id': f"G{100000 + client_id}",
+            'vip': maybe(rng, 0.08, [f"VIP{level}" for level in range(1, 9)]),
+            'statut': 'ancien',
+            'nombre_sejours': 0,
+            'preferences_alimentaires': maybe(rng, 0.15, DIETARY),
+            'preferences_chambre': maybe(rng, 0.2, ROOM_PREFERENCES),
+            'preferences_opera': maybe(rng, 0.03, OPERA),
+            'preferences_transport': maybe(rng, 0.1, TRANSPORT),
+            'preferences_services': maybe(rng, 0.1, SERVICES),
+            'email': f"{first.lower()}.{last.lower()}{client_id}@example.com",
+            'telephone': f"+33 6 {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}",
+            'nationalite': rng.choice(NATIONALITIES),
+            'date_naissance': (date(1940, 1, 1) + timedelta(days=rng.randint(0, 23000))).isoformat(),
+            'notes_internes': maybe(rng, 0.05, ['Client fidèle', 'Attention particulière', 'Ne pas déranger le matin']),
+            'created_at': f"{created.isoformat()}T10:00:00",
+            'updated_at': f"{created.isoformat()}T10:00:00",
+        })
+    return clients
+
+def reservation_status(arrival, departure, today):
+    if departure < today:
+        return 'terminee'
+    if arrival == today:
+        return 'jour'
+    if arrival < today:
+        return 'en_cours'
+    return 'futures'
+
+def generate_reservations(rng, rooms, years, clients, today):
+    """Séjours successifs par chambre, de `years` ans en arrière à 90 jours en avant"""
+    reservations = []
+    start, end = today - timedelta(days=365 * years), today + timedelta(days=90)
+    for index, room_no in enumerate(rooms):
+        category = ROOM_CATEGORIES[min(index * len(ROOM_CATEGORIES) // len(rooms), len(ROOM_CATEGORIES) - 1)]
+        day = start + timedelta(days=rng.randint(0, 3))
+        while day < end:
+            nights = rng.choice([1, 1, 2, 2, 3, 3, 4, 5, 7, 10])
+            arrival, departure = day, day + timedelta(days=nights)
+            principal = rng.choice(clients)
+            secondaire = rng.choice(clients) if rng.random() < 0.35 else None
+            statut = reservation_status(arrival, departure, today)
+            if statut != 'terminee' and rng.random() < 0.03:
+                statut = 'annulee'
+            reservations.append({
+                'resv_name_id': str(1000000 + len(reservations)),
+                'room_no': room_no,
+                'room_category_label': category,
+                'arrival': arrival.isoformat(),
+                'departure': departure.isoformat(),
+                'arrival_time': f"{rng.randint(12, 22)}:00",
+                'departure_time': f"{rng.randint(7, 12)}:00",
+                'statut': statut,
+                'vip': principal['vip'],
+                'adults': 2 if secondaire else rng.choice([1, 1, 2]),
+                'children': rng.choice([0, 0, 0, 1, 2]),
+                'client_principal_id': principal['id'],
+                'client_secondaire_id': secondaire['id'] if secondaire else None,
+                'special_requests': maybe(rng, 0.2, SPECIAL_REQUESTS),
+                'remarques_sejour': maybe(rng, 0.05, ['Séjour d\'affaires', 'Lune de miel', 'Séminaire']),
+                'remarques_internes': maybe(rng, 0.05, ['Paiement à vérifier', 'Surclassement offert']),
+                'rate_code': rng.choice(RATE_CODES),
+                'company_name': maybe(rng, 0.15, COMPANIES),
+                'list_g_comment_resv_name_id': None,
+            })
+            principal['nombre_sejours'] += 1
+            if statut in ('en_cours', 'jour', 'futures'):
+                status = {'en_cours': 'actuel', 'jour': 'arrive', 'futures': 'nouveau'}[statut]
+                for client in (principal, secondaire):
+                    if client and client['statut'] != 'actuel':
+                        client['statut'] = status
+            day = departure + timedelta(days=rng.choice([0, 0, 0, 1, 1, 2, 3, 5]))
+    return reservations
+
+def generate_alerts(rng, rooms, count, now):
+    alerts = []
+    for alert_id in range(1, count + 1):
+        alert_type, title = rng.choice(ALERT_TYPES)
+        created = now - timedelta(hours=rng.randint(0, 72))
+        alerts.append({
+            'id': alert_id,
+            'alert_type': alert_type,
+            'priority': rng.choice(['low', 'medium', 'high']),
+            'title': title,
+            'message': f"{title} — chambre {rng.choice(rooms)}",
+            'room_number': rng.choice(rooms),
+            'is_read': rng.random() < 0.6,
+            'created_at': created.isoformat(),
+        })
+    return alerts
+
+def generate_staff(rng, count):
+    staff = []
+    departments = list(DEPARTMENTS)
+    for staff_id in range(1, count + 1):
+        department = departments[staff_id % len(departments)]
+        staff.append({
+            'id': staff_id,
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'position': rng.choice(DEPARTMENTS[department]),
+            'department': department,
+            'available': rng.random() < 0.7,
+            'status': rng.choice(['en service', 'en pause', 'repos']),
+        })
+    return staff
+
+def generate_interactions(rng, count, now, contexts=20):
+    """Échanges du chatbot écrits comme par app.py (lignes de ai_interactions et ai_context_snapshots)
+
+    Chaque échange donne trois lignes : la question et la réponse pour l'historique
+    (context_data.conversation) puis l'interaction complète. Les réponses directes
+    gardent leur petit contexte dans la ligne ; les autres référencent un contexte
+    hôtel partagé stocké une fois dans ai_context_snapshots.
+    """
+    questions = [('Quels sont les clients VIP ?', 'vip'), ('Y a-t-il des alertes ?', 'alertes'),
+                 ('Y a-t-il des allergies ?', None), ('Qui est dans la chambre 101 ?', None),
+                 ('Quelles arrivées sont prévues demain ?', None), ('Que dois-je savoir aujourd\'hui ?', None)]
+    users = [f"00000000-0000-4000-8000-{user:012d}" for user in range(1, 11)]
+    now = now.astimezone(timezone.utc)  # horodatages écrits en UTC avec fuseau, comme app.py
+    snapshots = []
+    for index in range(contexts if count else 0):
+        content = "\n".join(f"chambre {100 + room} | {rng.choice(TITLES)} {rng.choice(LAST_NAMES).upper()} "
+                            f"{rng.choice(FIRST_NAMES)} | {rng.choice(['VIP1', 'VIP2', '-'])}" for room in range(40))
+        serialized = json.dumps(content, sort_keys=True, ensure_ascii=False)  # cf. serialize_context
+        snapshots.append({
+            'hash': hashlib.sha256(serialized.encode('utf-8')).hexdigest(),
+            'content': content,
+            'size_chars': len(serialized),
+            'created_at': (now - timedelta(days=index * 3)).isoformat(),
+        })
+
+    def new_id():
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    rows = []
+    for _ in range(count):
+        user_id = rng.choice(users)
+        question, fast_path = rng.choice(questions)
+        answer = 'Réponse synthétique.'
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+        response_time_ms = rng.randint(5, 60) if fast_path else rng.randint(800, 4000)
+        # Même ordre d'écriture que l'application : question, réponse, interaction
+        for offset, role in enumerate(('user', 'assistant')):
+            rows.append({
+                'id': new_id(), 'staff_user_id': user_id,
+                'question': question if role == 'user' else '',
+                'ai_response': answer if role == 'assistant' else '',
+                'context_data': {'role': role, 'conversation': True},
+                'response_time_ms': 0,
+                'created_at': (created + timedelta(milliseconds=offset)).isoformat(),
+            })
+        created += timedelta(milliseconds=2)
+        if fast_path:
+            context = {'hotel_context': {'fast_path': fast_path}}
+            timings = {'stages': {'fast_path': response_time_ms}, 'details': {}}
+        else:
+            context = {'hotel_context_ref': rng.choice(snapshots)['hash']}
+            timings = {'stages': {'context': response_time_ms // 4, 'openai': response_time_ms // 2}, 'details': {}}
+        rows.append({
+            'id': new_id(), 'staff_user_id': user_id,
+            'question': question,
+            'ai_response': answer,
+            'context_data': {'source': 'web_chatbot', **context, 'timings': timings,
+                             'timestamp': created.isoformat()},
+            'response_time_ms': response_time_ms,
+            'created_at': created.isoformat(),
+        })
+    return rows, snapshots
+
+def generate_hotel(rooms=120, years=3, clients=20000, seed=42, today=None,
+                   alerts=40, staff=60, interactions=2000):
+    """Toutes les tables d'un hôtel synthétique {table: [lignes]}"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    now = datetime.combine(today, datetime.now().time())
+    floors = max(1, (rooms + 29) // 30)
+    room_numbers = [f"{floor}{number:02d}" for floor in range(1, floors + 1) for number in range(1, 31)][:rooms]
+
+    client_rows = generate_clients(rng, clients, today)
+    interaction_rows, snapshot_rows = generate_interactions(rng, interactions, now)
+    return {
+        'clients': client_rows,
+        'reservations': generate_reservations(rng, room_numbers, years, client_rows, today),
+        'ai_alerts': generate_alerts(rng, room_numbers, alerts, now),
+        'staff_directory': generate_staff(rng, staff),
+        'ai_interactions': interaction_rows,
+        'ai_context_snapshots': snapshot_rows,
+    }
+
+def parse_args(args):
+    """Options de la ligne de commande"""
+    def value(flag, default, cast=int):
+        return cast(args[args.index(flag) + 1]) if flag in args else default
+    return {
+        'rooms': value('--rooms', 120),
+        'years': value('--years', 3),
+        'clients': value('--clients', 20000),
+        'seed': value('--seed', 42),
+    }, value('--output', None, str)
+
+if __name__ == "__main__":
+    options, output = parse_args(sys.argv[1:])
+    print("🏨 Génération d'un hôtel synthétique")
+    print("=" * 50)
+    tables = generate_hotel(**options)
+    for name, rows in tables.items():
+        print(f"   {name:<24} {len(rows):>8} ligne(s)")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(tables, f, ensure_ascii=False)
+        print(f"💾 Données écrites dans {output} (SUPABASE_FAKE_DATA={output})")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test des lectures paginées du calendrier (backend en mémoire)
+Avec un plafond de lignes par lecture (max-rows de PostgREST) plus petit que le
+nombre de réservations, la vue par période et le détail d'un jour doivent rester
+identiques à une lecture sans plafond.
+
+Usage : python test_calendar_pagination.py (ou python -m pytest test_calendar_pagination.py)
+"""
+
+from datetime import date, timedelta
+
+from fake_supabase import load_test_app
+
+PAGE_SIZE = 100  # pas moins : les clients sont lus par lots de 100 identifiants
+
+def read_with_max_rows(app, max_rows, call):
+    """Exécuter call() avec un plafond de lignes par lecture (et des pages de même taille)"""
+    transport = app.supabase.fake_transport
+    saved = transport.max_rows, app.SUPABASE_PAGE_SIZE
+    transport.max_rows, app.SUPABASE_PAGE_SIZE = max_rows, max_rows or saved[1]
+    try:
+        app.clear_cache()
+        return call()
+    finally:
+        transport.max_rows, app.SUPABASE_PAGE_SIZE = saved
+
+def test_calendar_day_details_paginated():
+    """Le détail d'un jour ne perd aucun client au-delà d'une page"""
+    app = load_test_app(rooms=150, seed=3)
+    today = date.today()
+    expected = read_with_max_rows(app, 0, lambda: app.get_calendar_day_details(today))
+    paged = read_with_max_rows(app, PAGE_SIZE, lambda: app.get_calendar_day_details(today))
+    assert len(expected['guests']) > PAGE_SIZE, "hôtel trop petit pour couvrir plusieurs pages"
+    assert paged == expected
+
+def test_calendar_range_counts_paginated():
+    """Les compteurs par jour d'une période ne perdent aucune réservation"""
+    app = load_test_app(rooms=150, seed=3)
+    start, end = date.today(), date.today() + timedelta(days=30)
+    expected = read_with_max_rows(app, 0, lambda: app.get_calendar_range_counts(start, end))
+    paged = read_with_max_rows(app, PAGE_SIZE, lambda: app.get_calendar_range_counts(start, end))
+    assert paged == expected
+
+if __name__ == "__main__":
+    print("🧪 Test de la pagination du calendrier")
+    print("=" * 40)
+    test_calendar_day_details_paginated()
+    print("✅ Détail d'un jour identique avec des pages de", PAGE_SIZE)
+    test_calendar_range_counts_paginated()
+    print("✅ Compteurs de la période identiques avec des pages de", PAGE_SIZE)
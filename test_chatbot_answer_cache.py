@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test du cache des réponses du chatbot (backend en mémoire, openai_stub.py)
+- une question déjà posée est resservie depuis le cache, y compris à un utilisateur
+  qui a déjà un historique de conversation ;
+- les relances (« et pour demain ? ») ne lisent ni n'alimentent le cache ;
+- une réponse est invalidée quand les données de l'outil utilisé changent.
+
+Usage : python test_chatbot_answer_cache.py (ou python -m pytest test_chatbot_answer_cache.py)
+"""
+
+import threading
+from contextlib import contextmanager
+
+import openai
+
+import openai_stub
+from fake_supabase import load_test_app
+
+QUESTION = "Combien de chambres sont occupées ce week-end ?"
+
+@contextmanager
+def stub_openai(app):
+    """Serveur OpenAI simulé sans latence (un outil par question) branché sur l'application"""
+    server = openai_stub.run_stub(dict(openai_stub.DEFAULT_CONFIG, port=0, latency_ms=0,
+                                       tokens_per_second=0, completion_tokens=20, tool_call_rate=1.0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = app.openai_client
+    app.openai_client = openai.OpenAI(api_key='stub', base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        yield
+    finally:
+        app.openai_client = client
+        server.shutdown()
+        server.server_close()
+
+def logged_in(app, user_id):
+    """Client de test Flask connecté comme un membre du personnel"""
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_email'] = f"{user_id}@layana.com"
+    return client
+
+def ask(client, question):
+    response = client.post('/api/chatbot/query', json={'question': question})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+def test_follow_up_detection():
+    """Relances repérées sans lecture de l'historique"""
+    app = load_test_app()
+    for question in ["Et pour demain ?", "et lui ?", "What about room 204?", "Demain ?",
+                     "Quelle est sa chambre, à elle ?"]:
+        assert not app.answer_cache_allowed(question), question
+    for question in [QUESTION, "Quels clients VIP arrivent demain ?", "Qui est dans la chambre 101 ?"]:
+        assert app.answer_cache_allowed(question), question
+
+def test_answer_cache_key_is_normalized():
+    """Casse, accents et ponctuation ne changent pas la clé ; la question, si"""
+    app = load_test_app()
+    assert app.get_answer_cache_key(QUESTION) == app.get_answer_cache_key("combien de CHAMBRES sont occupees ce week end")
+    assert app.get_answer_cache_key(QUESTION) != app.get_answer_cache_key("Combien de chambres sont libres ce week-end ?")
+
+def test_same_user_gets_cache_hit_despite_history():
+    """Deuxième question identique du même utilisateur : servie depuis le cache"""
+    app = load_test_app()
+    assert app.get_fast_path_response(QUESTION) == (None, None)
+    with stub_openai(app):
+        client = logged_in(app, 'cache-user-1')
+        assert not ask(client, "Bonjour").get('cached')
+        assert not ask(client, QUESTION).get('cached')
+        assert ask(client, QUESTION).get('cached')
+        assert ask(logged_in(app, 'cache-user-2'), QUESTION).get('cached')
+
+def test_follow_up_bypasses_cache():
+    """Une relance n'est ni servie depuis le cache ni mise en cache"""
+    app = load_test_app()
+    with stub_openai(app):
+        client = logged_in(app, 'cache-user-3')
+        ask(client, QUESTION)
+        assert not ask(client, "Et pour demain ?").get('cached')
+        assert app.get_answer_cache_key("Et pour demain ?") not in app._cache
+        assert not ask(client, "Et pour demain ?").get('cached')
+
+def test_cached_answer_invalidated_when_tool_data_changes():
+    """Modifier un client VIP invalide la réponse qui a utilisé la liste des VIP"""
+    app = load_test_app()
+    question = "Quels sont nos clients les plus importants ?"
+    result = app.execute_chatbot_tool('get_vip_clients', '{}')
+    app.store_cached_answer(question, "Voici les clients VIP.", None, [
+        {'outil': 'get_vip_clients', 'arguments': '{}', 'taille': len(result), 'empreinte': app.content_hash(result)}])
+    assert app.get_cached_answer(question)
+
+    store = app.supabase.fake_transport.store
+    client_id = next(row['id'] for row in store.rows('clients').values() if row.get('vip'))
+    response = logged_in(app, 'cache-user-4').put(f'/api/client/{client_id}', json={'vip': 'VIP8', 'guest_name': 'NOUVEAU Nom'})
+    assert response.status_code == 200
+    assert app.get_cached_answer(question) is None
+
+if __name__ == "__main__":
+    print("🧪 Test du cache des réponses du chatbot")
+    print("=" * 40)
+    test_follow_up_detection()
+    print("✅ Relances repérées")
+    test_answer_cache_key_is_normalized()
+    print("✅ Clé normalisée")
+    test_same_user_gets_cache_hit_despite_history()
+    print("✅ Cache utilisé malgré l'historique")
+    test_follow_up_bypasses_cache()
+    print("✅ Relances hors cache")
+    test_cached_answer_invalidated_when_tool_data_changes()
+    print("✅ Réponse invalidée quand les données changent")
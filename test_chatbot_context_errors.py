@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test des erreurs de lecture du contexte du chatbot (backend en mémoire)
+Une catégorie dont la lecture échoue doit être marquée indisponible (snapshot
+reconstruit plus tôt), jamais mise en cache comme résultat d'outil, et une réponse
+construite sans ces données ne doit pas entrer dans le cache des réponses.
+
+Usage : python test_chatbot_context_errors.py (ou python -m pytest test_chatbot_context_errors.py)
+"""
+
+from fake_supabase import load_test_app, failing_table
+
+def test_snapshot_marks_failed_category_unavailable():
+    """Une panne de table rend la catégorie indisponible au lieu d'un texte d'erreur"""
+    app = load_test_app()
+    with failing_table(app.supabase.fake_transport, 'staff_directory'):
+        snapshot = app.build_hotel_context_snapshot()
+    assert 'personnel' in snapshot['unavailable']
+    assert snapshot['categories']['personnel'] == app.CONTEXT_UNAVAILABLE
+    assert 'clients_actuels' not in snapshot['unavailable']
+
+def test_tool_error_is_not_cached():
+    """Un outil en erreur renvoie CONTEXT_UNAVAILABLE sans le garder en cache"""
+    app = load_test_app()
+    with failing_table(app.supabase.fake_transport, 'staff_directory'):
+        assert app.execute_chatbot_tool('get_staff', '{}') == app.CONTEXT_UNAVAILABLE
+    assert not any(key.startswith('hotel_context_tool_get_staff') for key in app._cache)
+    assert app.execute_chatbot_tool('get_staff', '{}') != app.CONTEXT_UNAVAILABLE
+
+def test_answer_built_on_unavailable_data_is_not_cached():
+    """Pas de réponse en cache quand un outil utilisé était indisponible"""
+    app = load_test_app()
+    question = "Qui est de service ce soir ?"
+    tool_call = {'outil': 'get_staff', 'arguments': '{}', 'taille': 0,
+                 'empreinte': app.content_hash(app.CONTEXT_UNAVAILABLE)}
+    app.store_cached_answer(question, "Je n'ai pas accès au planning.", None, [tool_call])
+    assert app.get_answer_cache_key(question) not in app._cache
+
+if __name__ == "__main__":
+    print("🧪 Test des erreurs de contexte du chatbot")
+    print("=" * 40)
+    test_snapshot_marks_failed_category_unavailable()
+    print("✅ Catégorie en erreur marquée indisponible")
+    test_tool_error_is_not_cached()
+    print("✅ Erreur d'outil non mise en cache")
+    test_answer_built_on_unavailable_data_is_not_cached()
+    print("✅ Réponse sans données non mise en cache")
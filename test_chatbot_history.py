@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test de l'historique du chatbot enregistré dans ai_interactions (backend en mémoire)
+Un échange y est écrit trois fois (question, réponse, interaction complète) : une
+fois rechargé après un redémarrage, l'historique ne doit contenir chaque message
+qu'une seule fois, et les horodatages écrits doivent être en UTC avec fuseau.
+
+Usage : python test_chatbot_history.py (ou python -m pytest test_chatbot_history.py)
+"""
+
+import time
+from datetime import datetime
+
+from fake_supabase import load_test_app
+
+EXCHANGES = [("Quels sont les clients VIP ?", "Trois clients VIP sont présents."),
+             ("Y a-t-il des allergies ?", "Deux clients sont allergiques aux fruits à coque.")]
+
+def stored_rows(app, user_id, expected, timeout=5):
+    """Attendre l'écriture différée des lignes d'un utilisateur"""
+    deadline = time.time() + timeout
+    while True:
+        rows = [row for row in app.supabase.fake_transport.store.rows('ai_interactions').values()
+                if row.get('staff_user_id') == user_id]
+        if len(rows) >= expected or time.time() > deadline:
+            return rows
+        time.sleep(0.05)
+
+def record_exchanges(app, user_id):
+    """Enregistrer les échanges comme les routes du chatbot"""
+    app.CHATBOT_WRITE_FLUSH_INTERVAL = 0.05
+    for question, response in EXCHANGES:
+        app.save_conversation_exchange(user_id, question, response)
+        app.save_ai_interaction(user_id, question, response, {'fast_path': 'test'}, 12)
+    return stored_rows(app, user_id, 3 * len(EXCHANGES))
+
+def test_reloaded_history_has_no_duplicates():
+    """Après redémarrage, chaque question et chaque réponse n'apparaît qu'une fois"""
+    app = load_test_app()
+    user_id = 'history-user-1'
+    assert len(record_exchanges(app, user_id)) == 3 * len(EXCHANGES)
+    with app._conversations_lock:
+        app._conversations.pop(user_id, None)   # processus redémarré : mémoire vide
+
+    expected = [message for question, response in EXCHANGES
+                for message in ({'role': 'user', 'content': question}, {'role': 'assistant', 'content': response})]
+    assert list(app.get_user_conversation(user_id)) == expected
+
+def test_interaction_timestamps_are_utc():
+    """created_at et context_data.timestamp sont des horodatages UTC avec fuseau"""
+    app = load_test_app()
+    for row in record_exchanges(app, 'history-user-2'):
+        assert datetime.fromisoformat(row['created_at']).utcoffset().total_seconds() == 0
+        if 'timestamp' in row['context_data']:
+            assert datetime.fromisoformat(row['context_data']['timestamp']).utcoffset().total_seconds() == 0
+
+if __name__ == "__main__":
+    print("🧪 Test de l'historique du chatbot")
+    print("=" * 40)
+    test_reloaded_history_has_no_duplicates()
+    print("✅ Historique rechargé sans doublon")
+    test_interaction_timestamps_are_utc()
+    print("✅ Horodatages en UTC")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test des snapshots de contexte du chatbot (backend en mémoire)
+Un contexte volumineux est stocké une seule fois dans ai_context_snapshots et les
+interactions le référencent par empreinte ; un petit contexte reste dans la ligne,
+et si le snapshot ne peut pas être écrit, le contexte est gardé dans la ligne.
+
+Usage : python test_context_snapshots.py (ou python -m pytest test_context_snapshots.py)
+"""
+
+import time
+
+from fake_supabase import load_test_app, failing_table
+
+def large_context(label):
+    return {'clients_actuels': f"{label} " + "chambre 101 | DUPONT Jean | VIP2\n" * 60}
+
+def interactions_of(app, user_id, expected, timeout=5):
+    """Attendre l'écriture différée des interactions d'un utilisateur"""
+    deadline = time.time() + timeout
+    while True:
+        rows = [row for row in app.supabase.fake_transport.store.rows('ai_interactions').values()
+                if row.get('staff_user_id') == user_id]
+        if len(rows) >= expected or time.time() > deadline:
+            return rows
+        time.sleep(0.05)
+
+def fresh_app():
+    app = load_test_app(interactions=0)  # aucun snapshot synthétique
+    app.CHATBOT_WRITE_FLUSH_INTERVAL = 0.05
+    with app._known_context_hashes_lock:
+        app._known_context_hashes.clear()
+    return app
+
+def test_identical_contexts_stored_once():
+    """Trois interactions, deux contextes distincts : deux snapshots référencés"""
+    app = fresh_app()
+    for label in ('matin', 'matin', 'soir'):
+        app.save_ai_interaction('snapshot-user-1', 'Qui est présent ?', 'Réponse', large_context(label), 10)
+    rows = interactions_of(app, 'snapshot-user-1', 3)
+    snapshots = app.supabase.fake_transport.store.rows('ai_context_snapshots')
+    assert len(snapshots) == 2
+    assert all('hotel_context_ref' in row['context_data'] and 'hotel_context' not in row['context_data'] for row in rows)
+    contents = [app.resolve_interaction_context(row['context_data']) for row in rows]
+    assert sorted(content['clients_actuels'].split()[0] for content in contents) == ['matin', 'matin', 'soir']
+
+def test_small_context_stays_inline():
+    """Sous CONTEXT_SNAPSHOT_MIN_CHARS, pas de snapshot"""
+    app = fresh_app()
+    app.save_ai_interaction('snapshot-user-2', 'Bonjour', 'Bonjour !', {'clients_actuels': 'chambre 101'}, 10)
+    row, = interactions_of(app, 'snapshot-user-2', 1)
+    assert row['context_data']['hotel_context'] == {'clients_actuels': 'chambre 101'}
+    assert not app.supabase.fake_transport.store.rows('ai_context_snapshots')
+
+def test_context_kept_inline_when_snapshot_write_fails():
+    """Snapshot impossible à écrire : aucune référence vers une empreinte absente"""
+    app = fresh_app()
+    with failing_table(app.supabase.fake_transport, 'ai_context_snapshots'):
+        app.save_ai_interaction('snapshot-user-3', 'Qui est présent ?', 'Réponse', large_context('nuit'), 10)
+        row, = interactions_of(app, 'snapshot-user-3', 1)
+    assert 'hotel_context_ref' not in row['context_data']
+    assert row['context_data']['hotel_context'] == large_context('nuit')
+
+if __name__ == "__main__":
+    print("🧪 Test des snapshots de contexte")
+    print("=" * 40)
+    test_identical_contexts_stored_once()
+    print("✅ Contexte identique stocké une seule fois")
+    test_small_context_stays_inline()
+    print("✅ Petit contexte gardé dans la ligne")
+    test_context_kept_inline_when_snapshot_write_fails()
+    print("✅ Contexte gardé dans la ligne si le snapshot échoue")
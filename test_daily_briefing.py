@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test du briefing du jour (backend en mémoire, openai_stub.py)
+- le tableau de bord reçoit le texte à jour sans attendre le modèle : le résumé IA
+  est rédigé en arrière-plan puis servi aux requêtes suivantes ;
+- un résumé qui échoue n'est pas marqué à jour et n'est pas retenté à chaque requête ;
+- generate_briefing.py attend le résumé.
+
+Usage : python test_daily_briefing.py (ou python -m pytest test_daily_briefing.py)
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+import openai
+
+import openai_stub
+from fake_supabase import load_test_app
+
+STUB_LATENCY_MS = 600
+
+@contextmanager
+def briefing_model(app, base_url=None, latency_ms=STUB_LATENCY_MS):
+    """Modèle du briefing : serveur OpenAI simulé (lent) ou adresse injoignable"""
+    server = None
+    if base_url is None:
+        server = openai_stub.run_stub(dict(openai_stub.DEFAULT_CONFIG, port=0, latency_ms=latency_ms,
+                                           tokens_per_second=0, completion_tokens=20, tool_call_rate=0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    client, enabled = app.openai_client, app.BRIEFING_LLM
+    app.openai_client = openai.OpenAI(api_key='stub', base_url=base_url, max_retries=0, timeout=5)
+    app.BRIEFING_LLM = True
+    app._briefings.clear()
+    try:
+        yield
+    finally:
+        app.openai_client, app.BRIEFING_LLM = client, enabled
+        if server:
+            server.shutdown()
+            server.server_close()
+
+def wait_for_summary(app, language, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with app._briefing_lock:
+            generating = bool(app._briefing_generating)
+        if not generating:
+            break
+        time.sleep(0.05)
+    return app.get_daily_briefing(language)
+
+def test_dashboard_does_not_wait_for_the_model():
+    app = load_test_app()
+    with briefing_model(app):
+        started = time.time()
+        briefing = app.get_daily_briefing('fr')
+        assert time.time() - started < STUB_LATENCY_MS / 1000
+        assert briefing['summary'] is None and briefing['content']
+
+        briefing = wait_for_summary(app, 'fr')
+        assert briefing['summary']
+        assert briefing['summary_version'] == briefing['version']
+        stored, = app.supabase.fake_transport.store.rows('ai_daily_briefings').values()
+        assert stored['summary'] == briefing['summary']
+
+def test_failed_summary_is_not_marked_current():
+    app = load_test_app()
+    with briefing_model(app, base_url='http://127.0.0.1:9/v1'):
+        app.get_daily_briefing('en')
+        briefing = wait_for_summary(app, 'en')
+        assert briefing['summary'] is None
+        assert briefing['summary_version'] is None
+        assert briefing['summary_generated_at']  # tentative datée : pas de nouvel essai immédiat
+        app.get_daily_briefing('en')
+        with app._briefing_lock:
+            assert not app._briefing_generating
+
+def test_scheduled_generation_waits_for_the_summary():
+    app = load_test_app()
+    with briefing_model(app, latency_ms=0):
+        briefing = app.get_daily_briefing('fr', wait_summary=True)
+        assert briefing['summary']
+        assert briefing['summary_version'] == briefing['version']
+
+if __name__ == "__main__":
+    print("🧪 Test du briefing du jour")
+    print("=" * 40)
+    test_dashboard_does_not_wait_for_the_model()
+    print("✅ Texte servi sans attendre le modèle, résumé rédigé en arrière-plan")
+    test_failed_summary_is_not_marked_current()
+    print("✅ Résumé en échec ni marqué à jour ni retenté à chaque requête")
+    test_scheduled_generation_waits_for_the_summary()
+    print("✅ Génération planifiée avec résumé")
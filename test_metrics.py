@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test de /metrics (backend en mémoire)
+Sans METRICS_TOKEN la route n'existe pas (404) ; avec, seul le porteur du jeton lit
+les métriques Prometheus, sans session.
+
+Usage : python test_metrics.py (ou python -m pytest test_metrics.py)
+"""
+
+from contextlib import contextmanager
+
+from fake_supabase import load_test_app
+
+TOKEN = 'jeton-de-test'
+
+@contextmanager
+def metrics_token(app, token):
+    previous = app.METRICS_TOKEN
+    app.METRICS_TOKEN = token
+    try:
+        yield app.app.test_client()
+    finally:
+        app.METRICS_TOKEN = previous
+
+def test_metrics_disabled_without_token():
+    app = load_test_app()
+    with metrics_token(app, None) as client:
+        assert client.get('/metrics').status_code == 404
+        assert client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code == 404
+
+def test_metrics_require_the_token():
+    app = load_test_app()
+    with metrics_token(app, TOKEN) as client:
+        assert client.get('/metrics').status_code == 401
+        response = client.get('/metrics', headers={'Authorization': 'Bearer autre-jeton'})
+        assert response.status_code == 401
+        assert response.headers['WWW-Authenticate'] == 'Bearer'
+
+        client.get('/api/system/status')  # au moins une requête mesurée
+        response = client.get('/metrics', headers={'Authorization': f'Bearer {TOKEN}'})
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE' in response.get_data(as_text=True)
+
+if __name__ == "__main__":
+    print("🧪 Test de /metrics")
+    print("=" * 40)
+    test_metrics_disabled_without_token()
+    print("✅ /metrics désactivé sans jeton")
+    test_metrics_require_the_token()
+    print("✅ /metrics réservé au porteur du jeton")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test des budgets d'appels Supabase par route (backend en mémoire)
+Les routes de QUERY_BUDGETS (bench_routes.py) ne doivent pas dépasser leur nombre
+d'appels, cache vidé, sur un hôtel de 120 chambres ; une capture ne compte que les
+appels du thread qui l'a ouverte (et des catégories de contexte qu'il fait récupérer).
+
+Usage : python test_query_budgets.py (ou python -m pytest test_query_budgets.py)
+"""
+
+import threading
+from datetime import date, timedelta
+
+from bench_routes import QUERY_BUDGETS
+from fake_supabase import load_test_app
+
+def logged_in(app):
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 'budget-user'
+        session['user_email'] = 'budget@layana.com'
+    return client
+
+def budget_paths():
+    today = date.today()
+    return {
+        '/api/rooms/status': '/api/rooms/status',
+        '/api/system/status': '/api/system/status',
+        '/api/calendar/range': f"/api/calendar/range?from={today.isoformat()}&to={(today + timedelta(days=41)).isoformat()}",
+        '/api/calendar/day': f"/api/calendar/day/{today.isoformat()}",
+        '/clients': '/clients?page=2',
+    }
+
+def test_routes_stay_within_budget():
+    app = load_test_app(rooms=120)
+    client = logged_in(app)
+    paths = budget_paths()
+    assert set(paths) == set(QUERY_BUDGETS)
+    for route, budget in QUERY_BUDGETS.items():
+        app.clear_cache()
+        response = app.assert_max_queries(client, paths[route], budget)
+        assert response.status_code == 200, f"{route}: {response.status_code}"
+
+def test_budget_overrun_is_reported():
+    app = load_test_app()
+    app.clear_cache()
+    try:
+        app.assert_max_queries(logged_in(app), '/api/rooms/status', 0)
+    except AssertionError as e:
+        assert 'appels Supabase (maximum 0)' in str(e)
+    else:
+        raise AssertionError("dépassement de budget non signalé")
+
+def test_capture_is_limited_to_its_thread():
+    app = load_test_app()
+    other_thread = threading.Thread(target=lambda: app.supabase.table('clients').select('id').limit(1).execute())
+    with app.capture_supabase_queries() as queries:
+        other_thread.start()
+        other_thread.join()
+        assert queries == []
+        app.fetch_context_categories([('vip', app.get_vip_info_raw), ('alertes', app.get_alerts_info_raw)])
+    assert {query['table'] for query in queries} >= {'clients', 'ai_alerts'}
+
+if __name__ == "__main__":
+    print("🧪 Test des budgets d'appels Supabase")
+    print("=" * 40)
+    test_routes_stay_within_budget()
+    print("✅ Routes dans leur budget")
+    test_budget_overrun_is_reported()
+    print("✅ Dépassement signalé")
+    test_capture_is_limited_to_its_thread()
+    print("✅ Capture limitée à son thread")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test du job de rétention de ai_interactions (backend en mémoire)
+Dates limites en UTC avec fuseau, simulation sans écriture, résumés non dupliqués
+quand le job est relancé, et snapshots de contexte encore référencés conservés.
+
+Usage : python test_retention_ai_interactions.py (ou python -m pytest test_retention_ai_interactions.py)
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from fake_supabase import load_test_app
+
+USER_ID = '00000000-0000-4000-8000-000000000777'
+
+def load_retention():
+    """App sur un hôtel neuf, sans interactions synthétiques, et module de rétention"""
+    app = load_test_app(interactions=0)
+    import retention_ai_interactions
+    return app, retention_ai_interactions
+
+def old_interaction(days, question, **context):
+    created = datetime.now(timezone.utc) - timedelta(days=days)
+    return {'staff_user_id': USER_ID, 'question': question, 'ai_response': 'Réponse',
+            'context_data': {'source': 'web_chatbot', **context}, 'response_time_ms': 100,
+            'created_at': created.isoformat()}
+
+def table(app, name):
+    return list(app.supabase.fake_transport.store.rows(name).values())
+
+def test_cutoffs_are_aware_utc():
+    """Les dates limites se comparent aux created_at de la base (timestamptz)"""
+    _, retention = load_retention()
+    for value in (retention.cutoff(7), retention.day_cutoff(30)):
+        assert datetime.fromisoformat(value).utcoffset() == timedelta(0)
+    day = datetime.fromisoformat(retention.day_cutoff(30))
+    assert (day.hour, day.minute, day.second, day.microsecond) == (0, 0, 0, 0)
+
+def test_dry_run_writes_nothing():
+    app, retention = load_retention()
+    store = app.supabase.fake_transport.store
+    store.insert('ai_interactions', [old_interaction(60, 'Quels sont les clients VIP ?'),
+                                     old_interaction(60, 'Quels sont les clients VIP ?', conversation=True)])
+    assert retention.run_retention(dry_run=True)
+    assert len(table(app, 'ai_interactions')) == 2
+    assert not table(app, 'ai_conversation_summaries')
+    assert not table(app, 'ai_interactions_archive')
+
+def test_rerun_does_not_duplicate_summaries():
+    """Job interrompu avant la compaction puis relancé : un résumé par utilisateur et par jour"""
+    app, retention = load_retention()
+    store = app.supabase.fake_transport.store
+    store.insert('ai_interactions', [old_interaction(60, 'Quels sont les clients VIP ?'),
+                                     old_interaction(60, 'Y a-t-il des allergies ?'),
+                                     old_interaction(45, 'Quels sont les clients VIP ?'),
+                                     old_interaction(1, 'Question récente')])
+    assert retention.summarize_old_interactions(dry_run=False) == 2
+    assert retention.summarize_old_interactions(dry_run=False) == 2
+    summaries = table(app, 'ai_conversation_summaries')
+    assert sorted(summary['interactions_count'] for summary in summaries) == [1, 2]
+
+    assert retention.run_retention()
+    assert len(table(app, 'ai_conversation_summaries')) == 2
+    assert [row['question'] for row in table(app, 'ai_interactions')] == ['Question récente']
+    assert len(table(app, 'ai_interactions_archive')) == 3
+
+def test_referenced_snapshots_are_kept():
+    """Seuls les snapshots anciens et plus référencés nulle part sont purgés"""
+    app, retention = load_retention()
+    store = app.supabase.fake_transport.store
+    long_ago = (datetime.now(timezone.utc) - timedelta(days=retention.ARCHIVE_DAYS + 10)).isoformat()
+    store.insert('ai_context_snapshots', [{'hash': name, 'content': {}, 'created_at': long_ago}
+                                          for name in ('recent-ref', 'archive-ref', 'orphan')])
+    store.insert('ai_interactions', [old_interaction(1, 'Qui est présent ?', hotel_context_ref='recent-ref'),
+                                     old_interaction(1, 'Bonjour')])
+    store.insert('ai_interactions_archive', [dict(old_interaction(100, 'Qui est présent ?', hotel_context_ref='archive-ref'), id=1)])
+
+    assert retention.referenced_snapshot_hashes() == {'recent-ref', 'archive-ref'}
+    retention.purge_archive(dry_run=False)
+    assert sorted(row['hash'] for row in table(app, 'ai_context_snapshots')) == ['archive-ref', 'recent-ref']
+
+def test_synthetic_interactions():
+    """Les échanges de synthetic_hotel.py sont écrits comme ceux de l'application"""
+    app = load_test_app(interactions=200)
+    import retention_ai_interactions as retention
+    rows = table(app, 'ai_interactions')
+    assert all('ai_response' in row and 'response' not in row for row in rows)
+    exchanges = [row for row in rows if not retention.is_conversation_row(row)]
+    assert len(rows) == 3 * len(exchanges) == 600
+    snapshots = {row['hash'] for row in table(app, 'ai_context_snapshots')}
+    references = {row['context_data']['hotel_context_ref'] for row in exchanges if 'hotel_context_ref' in row['context_data']}
+    assert references and references <= snapshots
+
+    user_id = exchanges[0]['staff_user_id']
+    history = app.load_conversation_history(user_id)
+    assert history and history[0]['role'] == 'user'
+    assert all(first['role'] != second['role'] for first, second in zip(history, history[1:]))
+
+    assert retention.run_retention()
+    assert not [row for row in table(app, 'ai_interactions') if row['created_at'] < retention.day_cutoff(retention.SUMMARY_DAYS)]
+    assert table(app, 'ai_conversation_summaries')
+    assert retention.referenced_snapshot_hashes() <= snapshots
+
+if __name__ == "__main__":
+    print("🧪 Test de la rétention de ai_interactions")
+    print("=" * 40)
+    test_cutoffs_are_aware_utc()
+    print("✅ Dates limites en UTC")
+    test_dry_run_writes_nothing()
+    print("✅ Simulation sans écriture")
+    test_rerun_does_not_duplicate_summaries()
+    print("✅ Résumés non dupliqués quand le job est relancé")
+    test_referenced_snapshots_are_kept()
+    print("✅ Snapshots référencés conservés")
+    test_synthetic_interactions()
+    print("✅ Échanges synthétiques au format de l'application")
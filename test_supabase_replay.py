@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test de l'enregistrement et du rejeu du trafic Supabase (backend en mémoire)
+- texte libre des tables du chatbot, des clients et des réservations pseudonymisé
+  par défaut, identifiants, dates et statuts gardés en clair ;
+- empreintes des requêtes calculées avec la clé de l'enregistrement (fichier .key en
+  0600, jamais dans l'enregistrement) : une recherche ne se retrouve pas en essayant
+  des valeurs connues ;
+- un enregistrement se rejoue avec sa clé, et seulement avec elle.
+
+Usage : python test_supabase_replay.py (ou python -m pytest test_supabase_replay.py)
+"""
+
+import os
+import stat
+import hashlib
+import tempfile
+
+import httpx
+
+import supabase_replay
+from fake_supabase import create_fake_client, create_offline_client, load_fake_store
+
+def test_private_tables_are_scrubbed_by_default():
+    salt = 'cle-de-test'
+    interaction = supabase_replay.scrub_rows('ai_interactions', {
+        'id': 'a1', 'staff_user_id': 'u1', 'question': 'Chambre de Mme DUBOIS ?',
+        'ai_response': 'Mme DUBOIS Emma est en 204.', 'context_data': {'hotel_context': 'DUBOIS Emma'},
+        'response_time_ms': 120, 'created_at': '2026-10-19T08:00:00+00:00'}, salt)
+    assert 'DUBOIS' not in str(interaction)
+    assert (interaction['id'], interaction['staff_user_id'], interaction['created_at']) == ('a1', 'u1', '2026-10-19T08:00:00+00:00')
+    assert interaction['response_time_ms'] == 120
+
+    briefing = supabase_replay.scrub_rows('ai_daily_briefings', {
+        'briefing_date': '2026-10-19', 'language': 'fr', 'version': 'v1',
+        'content': 'Arrivée : Mme DUBOIS', 'data': {'vip': [{'guest_name': 'DUBOIS'}]}}, salt)
+    assert 'DUBOIS' not in str(briefing)
+    assert (briefing['briefing_date'], briefing['language'], briefing['version']) == ('2026-10-19', 'fr', 'v1')
+
+    # Nouvelle colonne non répertoriée : pseudonymisée par défaut dans une table privée
+    reservation = supabase_replay.scrub_rows('reservations', {
+        'resv_name_id': 7, 'arrival': '2026-10-19', 'statut': 'jour', 'room_no': '204',
+        'nouveau_commentaire': 'client difficile'}, salt)
+    assert reservation['nouveau_commentaire'] != 'client difficile'
+    assert (reservation['arrival'], reservation['statut'], reservation['room_no']) == ('2026-10-19', 'jour', '204')
+
+    staff = supabase_replay.scrub_rows('staff_directory', {'first_name': 'Jean', 'department': 'Réception'}, salt)
+    assert staff['first_name'] != 'Jean' and staff['department'] == 'Réception'
+
+def test_query_filters_are_scrubbed():
+    query = supabase_replay.scrub_query(
+        'guest_title=eq.Mme&id=in.(1,2)&or=(guest_name.ilike.%dubois%)&order=guest_name.asc', 'cle', 'clients')
+    assert 'Mme' not in query and 'dubois' not in query
+    assert 'id=in.(1,2)' in query and 'order=guest_name.asc' in query
+
+def test_request_keys_need_the_recording_key():
+    request = httpx.Request('GET', 'https://fake.supabase.co/rest/v1/clients?guest_name=ilike.%25DUBOIS%25')
+    exact, loose = supabase_replay.request_keys(request, 'cle-1')
+    assert supabase_replay.request_keys(request, 'cle-1') == (exact, loose)
+    assert supabase_replay.request_keys(request, 'cle-2')[0] != exact
+    method, path, query, headers, body = supabase_replay.describe_request(request)
+    assert hashlib.sha256(f"{method} {path}?{query} {headers} {body}".encode('utf-8')).hexdigest() != exact
+
+def test_record_and_replay_with_key_file():
+    os.environ.pop('SUPABASE_RECORD_SALT', None)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'supabase_recording.jsonl')
+        client = create_fake_client(load_fake_store(rooms=30, years=1, clients=50, interactions=20))
+        supabase_replay.record_supabase_traffic(client, path)
+        guests = client.table('clients').select('id, guest_name, statut').order('id').limit(10).execute().data
+        interactions = client.table('ai_interactions').select('*').limit(10).execute().data
+
+        key_path = path + supabase_replay.KEY_FILE_SUFFIX
+        assert stat.S_IMODE(os.stat(key_path).st_mode) == 0o600
+        with open(key_path, encoding='utf-8') as f:
+            key = f.read().strip()
+        with open(path, encoding='utf-8') as f:
+            recording = f.read()
+        assert key not in recording
+        assert not any(guest['guest_name'] in recording for guest in guests)
+        assert not any(row['question'] and row['question'] in recording for row in interactions)
+
+        replayed = create_offline_client(supabase_replay.ReplayTransport(path))
+        replayed_guests = replayed.table('clients').select('id, guest_name, statut').order('id').limit(10).execute().data
+        assert [(g['id'], g['statut']) for g in replayed_guests] == [(g['id'], g['statut']) for g in guests]
+
+        os.remove(key_path)
+        try:
+            supabase_replay.ReplayTransport(path)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("rejeu accepté sans la clé de l'enregistrement")
+        try:
+            supabase_replay.ReplayTransport(path, salt='mauvaise-cle')
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("rejeu accepté avec une autre clé")
+
+if __name__ == "__main__":
+    print("🧪 Test de l'enregistrement et du rejeu Supabase")
+    print("=" * 40)
+    test_private_tables_are_scrubbed_by_default()
+    print("✅ Tables privées pseudonymisées par défaut")
+    test_query_filters_are_scrubbed()
+    print("✅ Filtres des requêtes pseudonymisés")
+    test_request_keys_need_the_recording_key()
+    print("✅ Empreintes calculées avec la clé de l'enregistrement")
+    test_record_and_replay_with_key_file()
+    print("✅ Enregistrement rejoué avec sa clé, et seulement avec elle")